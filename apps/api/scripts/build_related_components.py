@@ -0,0 +1,122 @@
+import argparse
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from config.config import settings
+from services.component_search import iter_component_rows
+from services.change_feed import ChangeFeed
+from services.embedding_versions import ACTIVE, EmbeddingVersionStore
+from services.knn_graph import KnnGraph, NeighborStore, attach_to_change_feed
+from services.projection import load_projection
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+"""
+Batch build of the "related components" graph.
+
+Loads every component embedding, computes all top-k neighbor lists with a
+blocked matrix multiply and writes them to `component_neighbors`. With
+`--follow` it then keeps running and updates the lists incrementally from the
+change feed, whichever process wrote the components (ingest workers, the
+ingestion CLI, imports). Run exactly one follower: it is the only writer of the
+stored lists.
+
+Usage:
+    PYTHONPATH=src python -m scripts.build_related_components --k 10
+    PYTHONPATH=src python -m scripts.build_related_components --follow
+"""
+
+
+def load_related_graph(
+    client, k: Optional[int] = None, block_size: int = 1024, embedding_version: Optional[str] = None
+) -> KnnGraph:
+    """Builds the in-memory graph from every stored embedding, projected as configured for their version."""
+    graph = KnnGraph(k or settings.RELATED_COMPONENTS_K, block_size, projection=load_projection(embedding_version))
+    graph.build(iter_component_rows(client, columns="id,kit_id,name,embedding"))
+    return graph
+
+
+class RelatedComponentsFollower:
+    """
+    The owner of the stored neighbor lists: builds the graph, writes every list,
+    then keeps the lists current with the changes its feed delivers. When another
+    embedding version is activated, the graph is rebuilt from the new vectors
+    instead of mixing them with the retired model's.
+    """
+
+    def __init__(self, client, feed: ChangeFeed, k: Optional[int] = None, block_size: int = 1024):
+        """
+        Args:
+            feed: A primed change feed; lists change as it is polled. Following
+                `embedding_versions` too enables rebuilds on cutover.
+        """
+        self.client = client
+        self.feed = feed
+        self.k = k
+        self.block_size = block_size
+        self.store = NeighborStore(client)
+        self.graph: Optional[KnnGraph] = None
+        self.version: Optional[str] = None
+        self._on_upsert = None
+
+    def start(self) -> "RelatedComponentsFollower":
+        self.rebuild(EmbeddingVersionStore(self.client).active()["version"])
+        if "embedding_versions" in self.feed.tables:
+            self.feed.subscribe("embedding_versions", self._on_embedding_version)
+        return self
+
+    def rebuild(self, version: Optional[str]) -> None:
+        # Rows written while the graph loads are replayed from here.
+        since = self.feed.mark()
+        graph = load_related_graph(self.client, self.k, self.block_size, version)
+        written = self.store.save(graph, list(graph.neighbors))
+        if self._on_upsert is not None:
+            self.feed.unsubscribe("components", self._on_upsert)
+        self._on_upsert = attach_to_change_feed(self.feed, graph, self.store, since=since)
+        self.graph, self.version = graph, version
+        logger.info(f"Wrote {written} neighbor lists for embedding version {version}; following changes.")
+
+    def _on_embedding_version(self, row: Dict[str, Any]) -> None:
+        if row.get("status") == ACTIVE and row.get("version") != self.version:
+            self.rebuild(row["version"])
+
+
+def maintain_related_graph(
+    client, feed: ChangeFeed, k: Optional[int] = None, block_size: int = 1024
+) -> RelatedComponentsFollower:
+    """Starts a `RelatedComponentsFollower`; see its docstring."""
+    return RelatedComponentsFollower(client, feed, k, block_size).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute related components for every component.")
+    parser.add_argument("--k", type=int, default=settings.RELATED_COMPONENTS_K, help="Neighbors per component.")
+    parser.add_argument("--block-size", type=int, default=1024, help="Rows per matrix multiply.")
+    parser.add_argument("--follow", action="store_true", help="Keep the lists current until interrupted.")
+    args = parser.parse_args()
+
+    from db.db import supabase_client
+
+    if args.follow:
+        feed = ChangeFeed(
+            supabase_client,
+            tables=["components", "embedding_versions"],
+            poll_seconds=settings.CHANGE_FEED_POLL_SECONDS,
+            overlap_seconds=settings.CHANGE_FEED_OVERLAP_SECONDS,
+        )
+        feed.prime()
+        maintain_related_graph(supabase_client, feed, args.k, args.block_size)
+        feed.run()
+    else:
+        version = EmbeddingVersionStore(supabase_client).active()["version"]
+        started = time.perf_counter()
+        graph = load_related_graph(supabase_client, args.k, args.block_size, version)
+        built = time.perf_counter()
+        written = NeighborStore(supabase_client).save(graph, list(graph.neighbors))
+        logger.info(
+            f"Computed {len(graph)} neighbor lists in {built - started:.1f}s and wrote {written} "
+            f"in {time.perf_counter() - built:.1f}s."
+        )
@@ -0,0 +1,74 @@
+import argparse
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from config.config import settings
+from services.component_search import iter_component_rows
+from services.projection import EmbeddingProjection, load_projection
+from services.shared_vectors import publish_snapshot
+from services.vector_index import coerce_vector
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+"""
+Builds the memory-mapped embedding snapshot that API workers share.
+
+Reads every component embedding, applies the configured projection, and
+publishes a new snapshot generation into EMBEDDING_SNAPSHOT_DIR. Running API
+workers switch to it on their next search. Run it after ingestion (or on a
+schedule); only this process ever holds the whole matrix in private memory.
+
+Usage:
+    PYTHONPATH=src python -m scripts.build_vector_snapshot --dir data/embeddings
+"""
+
+
+def build_snapshot(
+    rows: Iterable[Dict[str, Any]],
+    directory: str,
+    projection: Optional[EmbeddingProjection] = None,
+    keep: int = 2,
+) -> str:
+    """Publishes the embeddings of `components` rows as a new generation. Returns its name."""
+    # `rows` is read lazily from here on, so every earlier write is in the snapshot.
+    as_of = time.time()
+    keys, vectors = [], []
+    for row in rows:
+        vector = coerce_vector(row.get("embedding"))
+        if vector is not None:
+            keys.append(str(row["id"]))
+            vectors.append(vector)
+    matrix = np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+    if projection is not None and keys:
+        matrix = projection.apply(matrix)
+    # Normalised after projecting, exactly as ComponentSearch indexes vectors.
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    version = projection.version if projection is not None else None
+    return publish_snapshot(directory, keys, matrix, projection=version, keep=keep, as_of=as_of)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish the shared embedding snapshot for API workers.")
+    parser.add_argument(
+        "--dir", default=settings.EMBEDDING_SNAPSHOT_DIR, help="Snapshot directory (EMBEDDING_SNAPSHOT_DIR)."
+    )
+    parser.add_argument("--keep", type=int, default=2, help="Generations to keep on disk.")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("Set EMBEDDING_SNAPSHOT_DIR or pass --dir.")
+
+    from db.db import supabase_client
+
+    from services.embedding_versions import EmbeddingVersionStore
+
+    version = EmbeddingVersionStore(supabase_client).active()["version"]
+    started = time.perf_counter()
+    generation = build_snapshot(
+        iter_component_rows(supabase_client, columns="id,embedding"), args.dir, load_projection(version), args.keep
+    )
+    logger.info(f"Published {generation} in {time.perf_counter() - started:.1f}s.")
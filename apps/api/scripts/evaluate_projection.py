@@ -0,0 +1,119 @@
+import argparse
+import logging
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from services.projection import PCA, RANDOM, EmbeddingProjection, fit_pca, random_projection
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+"""
+Evaluates embedding projections against full-dimension search on the catalog.
+
+For a sample of catalog components used as queries, the exact top-k neighbors
+by cosine similarity on full embeddings are compared with the top-k found on
+projected embeddings. Recall@k is the average overlap; the report also shows
+index size and the cost of one brute-force scan. With --save, the projection
+is written to disk for EMBEDDING_PROJECTION_PATH.
+
+Usage:
+    PYTHONPATH=src:. python -m scripts.evaluate_projection --method pca --dims 32 64 128
+    PYTHONPATH=src:. python -m scripts.evaluate_projection --dims 64 --save data/projection.npz
+    PYTHONPATH=src:. python -m scripts.evaluate_projection --vectors embeddings.npy --method random
+"""
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def _top_k(matrix: np.ndarray, queries: np.ndarray, query_rows: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ matrix.T
+    scores[np.arange(len(query_rows)), query_rows] = -np.inf  # a component is not its own neighbor
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def _scan_ms(matrix: np.ndarray, queries: np.ndarray) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        matrix @ query
+    return 1000 * (time.perf_counter() - started) / len(queries)
+
+
+def evaluate(vectors: np.ndarray, projection: EmbeddingProjection, k: int = 10, query_count: int = 200, seed: int = 0) -> Dict[str, Any]:
+    """
+    Measures how well a projection preserves each query's top-k neighbors.
+
+    Returns:
+        A report with recall@k, index sizes and per-query scan times.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    k = min(k, len(vectors) - 1)
+    rng = np.random.default_rng(seed)
+    query_rows = rng.choice(len(vectors), size=min(query_count, len(vectors)), replace=False)
+
+    full = _normalise(vectors)
+    reduced = _normalise(projection.apply(vectors))
+    expected = _top_k(full, full[query_rows], query_rows, k)
+    found = _top_k(reduced, reduced[query_rows], query_rows, k)
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(expected, found)])
+    return {
+        "version": projection.version,
+        "dim": projection.output_dim,
+        "k": k,
+        "queries": len(query_rows),
+        "recall": float(recall),
+        "full_mb": full.nbytes / 1e6,
+        "reduced_mb": reduced.nbytes / 1e6,
+        "full_scan_ms": _scan_ms(full, full[query_rows]),
+        "reduced_scan_ms": _scan_ms(reduced, reduced[query_rows]),
+    }
+
+
+def load_catalog_vectors() -> np.ndarray:
+    """Reads every stored component embedding from Supabase."""
+    from db.db import supabase_client
+    from services.component_search import iter_component_rows
+    from services.vector_index import coerce_vector
+
+    vectors: List[np.ndarray] = [
+        coerce_vector(row["embedding"])
+        for row in iter_component_rows(supabase_client, columns="id,embedding")
+        if row.get("embedding") is not None
+    ]
+    return np.stack(vectors)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report recall@k of embedding projections on the catalog.")
+    parser.add_argument("--vectors", help="A .npy file of embeddings to use instead of the Supabase catalog.")
+    parser.add_argument("--method", choices=[PCA, RANDOM], default=PCA)
+    parser.add_argument("--dims", type=int, nargs="+", default=[32, 64, 128], help="Output dimensions to evaluate.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="Number of catalog components used as queries.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write the projection to this .npz path (requires a single --dims value).")
+    args = parser.parse_args()
+    if args.save and len(args.dims) != 1:
+        parser.error("--save needs exactly one --dims value.")
+
+    vectors = np.load(args.vectors) if args.vectors else load_catalog_vectors()
+    logger.info(f"Evaluating on {len(vectors)} embeddings of dimension {vectors.shape[1]}.")
+    for dim in args.dims:
+        if args.method == PCA:
+            projection = fit_pca(vectors, dim)
+        else:
+            projection = random_projection(vectors.shape[1], dim, seed=args.seed)
+        report = evaluate(vectors, projection, args.k, args.queries, args.seed)
+        logger.info(
+            f"{report['version']}: recall@{report['k']} = {report['recall']:.3f} over {report['queries']} queries; "
+            f"index {report['full_mb']:.1f} MB -> {report['reduced_mb']:.1f} MB; "
+            f"scan {report['full_scan_ms']:.2f} ms -> {report['reduced_scan_ms']:.2f} ms"
+        )
+        if args.save:
+            projection.save(args.save)
@@ -0,0 +1,72 @@
+import argparse
+import logging
+import time
+
+from services.component_search import iter_component_rows
+from services.embedding_export import (
+    ARROW,
+    DEFAULT_CHUNK_ROWS,
+    EXPORT_COLUMNS,
+    EXPORT_FORMATS,
+    import_rows,
+    read_export,
+    stream_export,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+"""
+Bulk export and import of a kit's component embeddings and metadata.
+
+`export` writes an Arrow IPC stream (readable with pyarrow, polars or pandas)
+or a zip of .npy matrices with JSON Lines sidecars, paging rows from the
+database chunk by chunk. `import` loads either file back through the uploader
+in batched upserts, optionally into a different kit.
+
+Usage:
+    PYTHONPATH=src python -m scripts.export_embeddings export <kit_id> kit.arrows --format arrow
+    PYTHONPATH=src python -m scripts.export_embeddings import kit.arrows --kit-id <other_kit_id>
+"""
+
+
+def export_kit(client, kit_id: str, path: str, format: str = ARROW, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+    """Writes a kit's export to `path`. Returns the number of bytes written."""
+    rows = iter_component_rows(client, page_size=chunk_rows, columns=EXPORT_COLUMNS, kit_id=kit_id)
+    written = 0
+    with open(path, "wb") as f:
+        for chunk in stream_export(rows, format, chunk_rows):
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import component embeddings in bulk.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export one kit's components.")
+    export_parser.add_argument("kit_id", help="The design kit to export.")
+    export_parser.add_argument("path", help="Output file.")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default=ARROW)
+    export_parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per batch or part.")
+
+    import_parser = commands.add_parser("import", help="Load an export back into the components table.")
+    import_parser.add_argument("path", help="An .arrows or .zip export.")
+    import_parser.add_argument("--kit-id", help="Import into this kit instead of the exported one.")
+    import_parser.add_argument("--batch-size", type=int, default=500, help="Rows per upsert.")
+    args = parser.parse_args()
+
+    from db.db import supabase_client
+
+    started = time.perf_counter()
+    if args.command == "export":
+        size = export_kit(supabase_client, args.kit_id, args.path, args.format, args.chunk_rows)
+        logger.info(f"Wrote {size / 1e6:.1f} MB to {args.path} in {time.perf_counter() - started:.1f}s.")
+    else:
+        from services.supabase_uploader import SupabaseUploader
+
+        with open(args.path, "rb") as f:
+            count = import_rows(read_export(f), SupabaseUploader(supabase_client), args.kit_id, args.batch_size)
+        logger.info(f"Imported {count} components from {args.path} in {time.perf_counter() - started:.1f}s.")
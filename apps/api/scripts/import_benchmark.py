@@ -0,0 +1,110 @@
+import argparse
+import logging
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+"""
+Import-time benchmark for the API and worker entry points.
+
+Each module is imported in a fresh interpreter with `python -X importtime`, and
+its cumulative import time is compared to a budget. Heavy libraries (torch via
+sentence-transformers, dspy/litellm) must not be imported by these entry points
+at all; they are loaded on first use.
+
+Usage:
+    PYTHONPATH=src:. python -m scripts.import_benchmark
+    PYTHONPATH=src:. python -m scripts.import_benchmark main --repeat 5
+"""
+
+# Cumulative import time allowed per entry point, in milliseconds.
+IMPORT_BUDGETS_MS: Dict[str, float] = {
+    "main": 2500.0,
+    "scripts.ingest_worker": 750.0,
+}
+
+# Top-level packages that no entry point may import eagerly.
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "dspy", "litellm")
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+class ImportProfile(NamedTuple):
+    """The outcome of importing one module in a fresh interpreter."""
+    module: str
+    total_ms: float
+    # Cumulative import time of every module loaded along the way, in milliseconds.
+    modules: Dict[str, float]
+
+    def heavy_imports(self) -> List[str]:
+        return sorted({name.split(".")[0] for name in self.modules} & set(HEAVY_MODULES))
+
+
+def profile_import(module: str) -> ImportProfile:
+    """
+    Imports a module in a subprocess with `-X importtime` and parses the report.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    modules: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(2)) / 1000
+    if module not in modules:
+        raise RuntimeError(f"No import time reported for {module}; was it already imported?")
+    return ImportProfile(module, modules[module], modules)
+
+
+def check_budgets(modules: List[str], repeat: int = 3) -> bool:
+    """
+    Profiles each module `repeat` times and checks the fastest run against its budget.
+
+    Returns:
+        True if every module is within budget and imports no heavy library.
+    """
+    ok = True
+    for module in modules:
+        profiles = [profile_import(module) for _ in range(repeat)]
+        best = min(profiles, key=lambda p: p.total_ms)
+        budget = IMPORT_BUDGETS_MS.get(module)
+        heavy = best.heavy_imports()
+        slowest = sorted(
+            ((name, ms) for name, ms in best.modules.items() if "." not in name and name != module),
+            key=lambda item: item[1],
+            reverse=True,
+        )[:5]
+        logger.info(
+            f"{module}: {best.total_ms:.0f} ms (budget {budget or '-'} ms); "
+            f"largest: {', '.join(f'{name} {ms:.0f} ms' for name, ms in slowest)}"
+        )
+        if heavy:
+            logger.error(f"{module} imports heavy modules at import time: {', '.join(heavy)}")
+            ok = False
+        if budget is not None and best.total_ms > budget:
+            logger.error(f"{module} exceeds its import budget: {best.total_ms:.0f} ms > {budget:.0f} ms")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check import time of the API and worker entry points.")
+    parser.add_argument("modules", nargs="*", default=list(IMPORT_BUDGETS_MS), help="Modules to profile.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module; the fastest counts.")
+    args = parser.parse_args()
+    sys.exit(0 if check_budgets(args.modules, args.repeat) else 1)
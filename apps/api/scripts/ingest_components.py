@@ -1,9 +1,22 @@
+import argparse
 import os
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 from agents.ats_creator import ATSCreator, ATSModel
+from embedding import generate_embedding
+from config.config import settings
+from schemas.ats import dump_ats, validate_ats_batch
 from schemas.component import ComponentCreate
+from services.blob_store import RAW_CODE_HASH_KEY, content_hash
+from services.component_search import iter_component_rows
+from services.dependency_graph import COMPONENT_EXTENSIONS, DependencyGraph
+from services.embedding_versions import EmbeddingVersionStore, is_missing_column_error
+from services.near_duplicates import MINHASH_KEY, NearDuplicateIndex, minhash_signature
+from services.profiling import profile_stage
+from services.supabase_uploader import SupabaseUploader
+from services.vector_index import coerce_vector
+from services.write_buffer import WriteBehindBuffer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
@@ -50,18 +63,24 @@ def find_component_files(path: str) -> List[str]:
     logger.info(f"Total component files found: {len(component_files)}")
     return component_files
 
-def generate_ats_for_components(component_paths: List[str]) -> List[ATSModel]:
+def generate_ats_for_components(component_paths: List[str], pack: bool = False) -> List[ATSModel]:
     """
     For each component file path, generate its ATS using the ATSCreator agent.
     Logs the process and collects valid ATSModel objects.
 
     Args:
         component_paths: List of absolute paths to component files.
+        pack: Group small components into shared LLM calls (see ATSCreator.create_ats_for_files).
 
     Returns:
         List of valid ATSModel objects (one per successfully processed component).
     """
     ats_creator = ATSCreator()
+    if pack:
+        generated = ats_creator.create_ats_for_files(component_paths)
+        ats_results = [ats for ats in generated.values() if ats is not None]
+        logger.info(f"Total ATS objects generated: {len(ats_results)}")
+        return ats_results
     ats_results = []
     for path in component_paths:
         logger.info(f"Generating ATS for: {path}")
@@ -87,6 +106,9 @@ def validate_and_transform_ats(
     - Embeds the full ATS as the 'metadata' field.
     - Raises ValueError if validation fails.
 
+    The ATS is dumped and JSON-encoded exactly once; the resulting dict is reused
+    as the metadata so the upload does not need to dump it again.
+
     Args:
         ats: The ATSModel object from the ATS agent.
         kit_id: The UUID of the design kit this component belongs to.
@@ -99,28 +121,330 @@ def validate_and_transform_ats(
         raise ValueError("ATS output missing or invalid 'componentName'.")
     if not isinstance(kit_id, UUID):
         raise ValueError("kit_id must be a valid UUID.")
-    # Optionally, check that all ATS fields are JSON serializable (metadata)
-    import json
-    try:
-        json.dumps(ats.model_dump())
-    except Exception as e:
-        raise ValueError(f"ATS output is not JSON serializable: {e}")
+    payload = dump_ats(ats)
     return ComponentCreate(
         kit_id=kit_id,
         name=ats.componentName,
         category=category,
-        metadata=ats.model_dump(),
+        metadata=payload.data,
         embedding=None  # To be filled in later if needed
     )
 
+def validate_and_transform_ats_batch(
+    ats_list: List[ATSModel], kit_id: UUID, category: Optional[str] = None
+) -> List[ComponentCreate]:
+    """
+    Bulk variant of `validate_and_transform_ats` for large ingestion runs.
+    Each ATS is dumped and encoded once, and the encoded payloads are validated
+    together through the cached ATS TypeAdapter.
+
+    Args:
+        ats_list: The ATSModel objects from the ATS agent.
+        kit_id: The UUID of the design kit the components belong to.
+        category: Optional category applied to every component.
+
+    Returns:
+        ComponentCreate objects ready for upload, in input order.
+    """
+    if not isinstance(kit_id, UUID):
+        raise ValueError("kit_id must be a valid UUID.")
+    for ats in ats_list:
+        if not ats.componentName or not isinstance(ats.componentName, str):
+            raise ValueError("ATS output missing or invalid 'componentName'.")
+    payloads = [dump_ats(ats) for ats in ats_list]
+    try:
+        validate_ats_batch([payload.body for payload in payloads])
+    except Exception as e:
+        raise ValueError(f"ATS batch failed validation: {e}")
+    logger.info(f"Validated {len(payloads)} ATS payloads in one batch.")
+    return [
+        ComponentCreate.model_construct(
+            kit_id=kit_id,
+            name=payload.data["componentName"],
+            category=category,
+            metadata=payload.data,
+            embedding=None,
+        )
+        for payload in payloads
+    ]
+
+def load_duplicate_index(uploader) -> NearDuplicateIndex:
+    """Builds a near-duplicate index from the signatures of every stored component."""
+    duplicates = NearDuplicateIndex(settings.NEAR_DUPLICATE_THRESHOLD)
+    duplicates.load(iter_component_rows(uploader.client, columns="id,metadata"))
+    return duplicates
+
+def reuse_near_duplicate(
+    path: str, duplicates: NearDuplicateIndex, uploader, kit_id: Optional[str] = None
+) -> Optional[Tuple[ATSModel, List[float]]]:
+    """
+    Looks for an already-ingested component whose source is a near-duplicate of
+    the file and, if found, returns its ATS (with this file's rawCode) and its
+    embedding, so neither an LLM call nor an embedding is needed.
+
+    A reused ATS keeps the match's componentName, so a match in the same kit
+    would be overwritten by the upload; this is usually the file's own earlier
+    version, whose ATS is stale after an edit. Matches in `kit_id` are therefore
+    only reused when their source is byte-for-byte identical.
+
+    Returns:
+        (ATSModel, embedding), or None if there is no usable near-duplicate.
+    """
+    with open(path, "r") as f:
+        code = f.read()
+    digest = content_hash(code)
+    for component_id, similarity in duplicates.query(minhash_signature(code), limit=3):
+        row = uploader.get_component(component_id)
+        if not row or row.get("embedding") is None:
+            continue
+        if kit_id is not None and str(row.get("kit_id")) == str(kit_id):
+            if (row.get("metadata") or {}).get(RAW_CODE_HASH_KEY) != digest:
+                continue
+        metadata = {
+            key: value
+            for key, value in (row.get("metadata") or {}).items()
+            if key not in (RAW_CODE_HASH_KEY, MINHASH_KEY, "rawCode")
+        }
+        try:
+            ats = ATSModel(**metadata, rawCode=code)
+        except Exception as e:
+            logger.warning(f"Cannot reuse the ATS of component {component_id}: {e}")
+            continue
+        logger.info(f"{path} is a near-duplicate of {row.get('name')} ({similarity:.2f}); reusing its ATS and embedding.")
+        return ats, coerce_vector(row["embedding"]).tolist()
+    return None
+
+def resolve_embedding_targets(
+    uploader, versions: Optional[EmbeddingVersionStore] = None, refresh: bool = False
+) -> List[Tuple[Optional[str], str]]:
+    """
+    Returns the (model, column) pairs to embed new components with: the active
+    embedding version plus any version being migrated to.
+
+    Args:
+        uploader: The uploader whose client the versions are read with.
+        versions: A long-lived store, so its short-lived cache is shared across files.
+        refresh: Ignore the cache, e.g. after a cutover renamed the columns.
+    """
+    versions = versions or EmbeddingVersionStore(uploader.client)
+    if refresh:
+        versions.invalidate()
+    try:
+        return versions.write_targets()
+    except Exception as e:
+        logger.warning(f"Could not read embedding versions; embedding with the default model only: {e}")
+        return [(None, "embedding")]
+
+def check_write_behind(uploader, duplicates: Optional[NearDuplicateIndex], targets: List[Tuple[Optional[str], str]]) -> None:
+    """
+    Rejects combinations a write-behind uploader cannot honour. Its uploads
+    return no row and fail only when flushed, so the near-duplicate index would
+    not learn the new components, and an upload broken by an embedding cutover
+    could not be embedded again for the new version.
+
+    Raises:
+        ValueError: If the uploader buffers writes while `duplicates` is given or
+            an embedding migration is in progress.
+    """
+    if not isinstance(getattr(uploader, "buffer", None), WriteBehindBuffer):
+        return
+    if duplicates is not None:
+        raise ValueError("Near-duplicate reuse cannot be combined with write-behind uploads; disable one of them.")
+    if len(targets) > 1:
+        raise ValueError(
+            "An embedding migration is in progress; write-behind uploads cannot follow its cutover. "
+            "Upload without write-behind until it is activated."
+        )
+
+def embed_and_upload(
+    ats: ATSModel,
+    kit_id: str,
+    uploader,
+    targets: List[Tuple[Optional[str], str]],
+    embedding: Optional[List[float]] = None,
+):
+    """
+    Embeds an ATS for every target version and uploads it.
+
+    Args:
+        targets: (model, column) pairs from `resolve_embedding_targets`, active version first.
+        embedding: A vector of the active version to reuse instead of embedding again.
+
+    Returns:
+        The uploaded row, as returned by the uploader.
+    """
+    (active_model, _), *staging = targets
+    if embedding is None:
+        with profile_stage("embed"):
+            embedding = generate_embedding(ats.description, model_name=active_model)
+    # Versions being migrated to are written too, so the migration does not miss this row.
+    with profile_stage("embed"):
+        extra_columns: Dict[str, List[float]] = {
+            column: generate_embedding(ats.description, model_name=model) for model, column in staging
+        }
+    payload = dump_ats(ats)
+    with profile_stage("upload"):
+        return uploader.upload_ats(
+            ats, kit_id=kit_id, embedding=embedding, payload=payload, extra_columns=extra_columns or None
+        )
+
+def ingest_component_files(
+    component_paths: List[str],
+    kit_id: str,
+    uploader,
+    ats_creator: Optional[ATSCreator] = None,
+    pack: bool = False,
+    duplicates: Optional[NearDuplicateIndex] = None,
+    versions: Optional[EmbeddingVersionStore] = None,
+) -> List[str]:
+    """
+    Runs ATS generation, embedding and upload for each file, in the given order.
+    Failures are logged and do not stop the remaining files.
+
+    Args:
+        component_paths: Component files to process.
+        kit_id: The design kit the components belong to.
+        uploader: A SupabaseUploader (or compatible) used for the upload.
+        ats_creator: Optional ATSCreator to reuse.
+        pack: Generate the ATSs up front, packing small components into shared LLM calls.
+        duplicates: Index of existing components' source signatures. Files that are
+            near-duplicates of an indexed component reuse its ATS and embedding, and
+            every uploaded component is added to the index.
+        versions: Embedding version store to reuse across calls. The embedding
+            targets are resolved for every file, so a cutover during a long run is
+            picked up; an upload that fails because the cutover renamed a column
+            is embedded again for the new targets and retried once.
+
+    Returns:
+        The paths that were ingested successfully.
+
+    Raises:
+        ValueError: If `uploader` writes behind while `duplicates` is given or an
+            embedding migration is in progress (see `check_write_behind`).
+    """
+    ats_creator = ats_creator or ATSCreator()
+    versions = versions or EmbeddingVersionStore(uploader.client)
+    check_write_behind(uploader, duplicates, resolve_embedding_targets(uploader, versions))
+    reused = {}
+    if duplicates is not None:
+        for path in component_paths:
+            try:
+                match = reuse_near_duplicate(path, duplicates, uploader, kit_id)
+            except Exception as e:
+                logger.warning(f"Near-duplicate lookup failed for {path}: {e}")
+                match = None
+            if match is not None:
+                reused[path] = match
+    to_generate = [path for path in component_paths if path not in reused]
+    if pack:
+        with profile_stage("ats"):
+            packed = ats_creator.create_ats_for_files(to_generate)
+    else:
+        packed = None
+    ingested = []
+    for path in component_paths:
+        logger.info(f"Ingesting: {path}")
+        try:
+            embedding = None
+            if path in reused:
+                ats, embedding = reused[path]
+            elif packed is not None:
+                ats = packed[path]
+            else:
+                with profile_stage("ats"):
+                    ats = ats_creator.create_ats_from_file(path)
+            if ats is None:
+                logger.warning(f"ATS generation failed for: {path}")
+                continue
+            targets = resolve_embedding_targets(uploader, versions)
+            # A migration may have started since the run began.
+            check_write_behind(uploader, duplicates, targets)
+            try:
+                row = embed_and_upload(ats, kit_id, uploader, targets, embedding)
+            except Exception as e:
+                if not is_missing_column_error(e):
+                    raise
+                # An embedding version was activated since the targets were read: the
+                # staging column was renamed to `embedding`. A reused vector may be of
+                # the retired version too, so everything is embedded again.
+                logger.info(f"Embedding columns changed while ingesting {path}; retrying with the new versions.")
+                row = embed_and_upload(ats, kit_id, uploader, resolve_embedding_targets(uploader, versions, refresh=True))
+            if duplicates is not None and isinstance(row, dict):
+                duplicates.upsert_row(row)
+            ingested.append(path)
+        except Exception as e:
+            logger.error(f"Exception during ingestion of {path}: {e}")
+    logger.info(
+        f"Ingested {len(ingested)} of {len(component_paths)} component files "
+        f"({len(reused)} reused from near-duplicates)."
+    )
+    logger.info(f"Model tier stats: {ats_creator.router.summary()}")
+    return ingested
+
+def reingest_changed_files(
+    graph: DependencyGraph,
+    changed_paths: List[str],
+    kit_id: str,
+    uploader,
+    ats_creator: Optional[ATSCreator] = None,
+    duplicates: Optional[NearDuplicateIndex] = None,
+    versions: Optional[EmbeddingVersionStore] = None,
+) -> List[str]:
+    """
+    Re-ingests only what a change can affect: the changed component files and
+    every component that imports them, directly or transitively. Components are
+    processed in topological order so dependencies are refreshed first.
+    Non-component files (e.g. `lib/utils.ts`) propagate the change but are not
+    ingested themselves.
+
+    Args:
+        graph: The kit's dependency graph; it is updated in place.
+        changed_paths: Files that were added, edited or deleted.
+        kit_id: The design kit the components belong to.
+        uploader: A SupabaseUploader (or compatible) used for the upload.
+        ats_creator: Optional ATSCreator to reuse.
+        duplicates: Optional near-duplicate index, see `ingest_component_files`.
+        versions: Optional embedding version store, see `ingest_component_files`.
+
+    Returns:
+        The component files that were re-ingested successfully.
+    """
+    affected = graph.apply_changes(changed_paths)
+    targets = [path for path in affected if path.endswith(COMPONENT_EXTENSIONS) and os.path.isfile(path)]
+    logger.info(
+        f"{len(changed_paths)} changed file(s) affect {len(affected)} file(s); "
+        f"re-ingesting {len(targets)} component(s)."
+    )
+    if not targets:
+        return []
+    return ingest_component_files(targets, kit_id, uploader, ats_creator, duplicates=duplicates, versions=versions)
+
 if __name__ == "__main__":
-    # For demonstration, assuming components are in supacharged/packages/ui/components/ui/
-    components_base_path = "/Users/atango/Documents/supacharged/supacharged/packages/ui/components/ui/"
-    logger.info(f"Searching for components in: {components_base_path}")
-    found_components = find_component_files(components_base_path)
-    if found_components:
+    parser = argparse.ArgumentParser(description="Generate ATS for React components and optionally upload them.")
+    parser.add_argument("path", help="A component file or a directory of components, e.g. packages/ui/components/ui")
+    parser.add_argument("--kit-id", help="Upload the results to this design kit (ATS only if omitted).")
+    parser.add_argument("--pack", action="store_true", help="Pack small components into shared LLM calls.")
+    parser.add_argument("--no-dedupe", action="store_true", help="Do not reuse ATSs of near-duplicate components.")
+    parser.add_argument(
+        "--write-behind", action="store_true",
+        help="Buffer uploads and write them in batches in the background (not during an embedding migration).",
+    )
+    args = parser.parse_args()
+
+    logger.info(f"Searching for components in: {args.path}")
+    found_components = find_component_files(args.path)
+    if not found_components:
+        logger.info("No component files found.")
+    elif args.kit_id:
+        if args.write_behind and not args.no_dedupe:
+            parser.error("--write-behind requires --no-dedupe: reuse needs each upload's row.")
+        uploader = SupabaseUploader(write_behind=args.write_behind)
+        duplicates = None if args.no_dedupe else load_duplicate_index(uploader)
+        try:
+            ingest_component_files(found_components, args.kit_id, uploader, pack=args.pack, duplicates=duplicates)
+        finally:
+            uploader.close()
+    else:
         logger.info("Generating ATS for discovered components...")
-        ats_list = generate_ats_for_components(found_components)
+        ats_list = generate_ats_for_components(found_components, pack=args.pack)
         logger.info(f"ATS generation complete. {len(ats_list)} ATS objects created.")
-    else:
-        logger.info("No component files found.")
\ No newline at end of file
@@ -0,0 +1,181 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from config.config import settings
+from services.job_queue import JobQueue
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(processName)s %(message)s')
+logger = logging.getLogger(__name__)
+
+"""
+Worker process for background ingestion jobs.
+
+Workers claim jobs from the SQLite queue that `POST /api/v1/kits/{id}/ingest`
+writes to, ingest each component file (ATS -> embedding -> upload) and checkpoint
+every file as it completes. A background thread renews the job's lease; if a
+worker dies, the lease expires and another worker resumes from the last
+checkpoint.
+
+Each worker keeps its own near-duplicate index; components ingested by other
+workers reach it through the change feed (CHANGE_FEED_MODE), so reuse covers
+every worker's uploads. Workers do not write related-component lists: a single
+`scripts/build_related_components.py --follow` process owns them.
+
+The ingestion pipeline (dspy, sentence-transformers, Supabase) is imported only
+once a worker claims its first job, so spawning workers and polling an empty
+queue stay cheap.
+
+Usage:
+    PYTHONPATH=src python -m scripts.ingest_worker --processes 4
+"""
+
+LEASE_SECONDS = 120.0
+
+
+class LeaseKeeper(threading.Thread):
+    """Renews a job lease in the background until stopped or the lease is lost."""
+
+    def __init__(self, queue: JobQueue, job_id: str, worker_id: str, lease_seconds: float):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(self.job_id, self.worker_id, self.lease_seconds):
+                logger.warning(f"Lost lease on job {self.job_id}.")
+                self.lost.set()
+                return
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+def run_job(
+    queue: JobQueue,
+    job: dict,
+    worker_id: str,
+    uploader,
+    ats_creator,
+    lease_seconds: float = LEASE_SECONDS,
+    duplicates=None,
+    versions=None,
+) -> None:
+    """
+    Executes one claimed job, skipping files already checkpointed by an earlier attempt.
+    `duplicates` is an optional NearDuplicateIndex and `versions` an optional
+    EmbeddingVersionStore, both shared across the worker's jobs.
+    """
+    from scripts.ingest_components import find_component_files, ingest_component_files
+
+    job_id = job["id"]
+    keeper = LeaseKeeper(queue, job_id, worker_id, lease_seconds)
+    keeper.start()
+    try:
+        queue.register_files(job_id, find_component_files(job["path"]))
+        pending = queue.pending_files(job_id)
+        logger.info(f"Job {job_id}: {len(pending)} file(s) left to ingest.")
+        for path in pending:
+            if keeper.lost.is_set():
+                # Another worker owns the job now; stop without touching its state.
+                return
+            ok = bool(ingest_component_files(
+                [path], job["kit_id"], uploader, ats_creator, duplicates=duplicates, versions=versions
+            ))
+            queue.checkpoint_file(job_id, path, ok, None if ok else "Ingestion failed; see worker logs.")
+    finally:
+        keeper.stop()
+
+    job = queue.get(job_id)
+    if job["failed_files"]:
+        queue.finish(job_id, ok=False, error=f"{job['failed_files']} of {job['total_files']} file(s) failed.")
+    else:
+        queue.finish(job_id, ok=True)
+
+
+def attach_indexes(uploader, feed=None):
+    """
+    Loads the worker's near-duplicate index and keeps it current with every
+    other writer's uploads through the change feed; ingestion adds the
+    worker's own.
+
+    Returns:
+        The near-duplicate index, for `run_job`.
+    """
+    from scripts.ingest_components import load_duplicate_index
+
+    # Rows written by other workers while the index loads are replayed from here.
+    since = feed.mark() if feed is not None else None
+    duplicates = load_duplicate_index(uploader)
+    if feed is not None:
+        feed.subscribe("components", duplicates.upsert_row, duplicates.remove, since=since)
+    else:
+        logger.warning(
+            "CHANGE_FEED_MODE is off: this worker will not see components ingested by other workers."
+        )
+    return duplicates
+
+
+def work(queue_path: str, poll_interval: float = 2.0, once: bool = False, lease_seconds: float = LEASE_SECONDS) -> None:
+    """
+    Claims and runs jobs until interrupted (or until the queue is empty with `once`).
+    """
+    queue = JobQueue(queue_path)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    uploader = None
+    ats_creator = None
+    duplicates = None
+    versions = None
+    logger.info(f"Worker {worker_id} polling {queue_path}.")
+    while True:
+        job = queue.claim(worker_id, lease_seconds)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        # Clients are created lazily, inside the worker process, on the first job.
+        if uploader is None:
+            from agents.ats_creator import ATSCreator
+            from services.change_feed import get_change_feed
+            from services.embedding_versions import EmbeddingVersionStore
+            from services.supabase_uploader import SupabaseUploader
+
+            uploader, ats_creator = SupabaseUploader(), ATSCreator()
+            versions = EmbeddingVersionStore(uploader.client)
+            duplicates = attach_indexes(uploader, get_change_feed())
+        try:
+            run_job(queue, job, worker_id, uploader, ats_creator, lease_seconds, duplicates, versions)
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {e}")
+            queue.finish(job["id"], ok=False, error=str(e))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background ingestion workers.")
+    parser.add_argument("--queue", default=settings.INGEST_QUEUE_PATH, help="Path to the job queue database.")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes to run.")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between polls when idle.")
+    parser.add_argument("--once", action="store_true", help="Exit when no job is available.")
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        work(args.queue, args.poll_interval, args.once)
+    else:
+        processes = [
+            multiprocessing.Process(target=work, args=(args.queue, args.poll_interval, args.once), name=f"worker-{i}")
+            for i in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
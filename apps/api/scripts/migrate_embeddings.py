@@ -0,0 +1,265 @@
+import argparse
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from config.config import settings
+from services.component_search import iter_component_rows
+from services.embedding_versions import EmbeddingVersionStore, staging_column
+from services.projection import load_projection, projection_path, refit_projection
+from services.vector_index import coerce_vector
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+"""
+Re-embeds every component for a new embedding version, from stored ATS metadata only.
+
+Components are streamed with keyset pagination, embedded in large batches (across
+several CPU processes with --processes) and bulk-upserted into the version's
+staging column while the next batch is being encoded. Progress is checkpointed
+in `embedding_versions` after every batch, so an interrupted run resumes where it
+stopped. Rows that appeared behind the cursor during the run are caught up, the
+configured projection (EMBEDDING_PROJECTION_PATH) is refit on the new vectors,
+then the version is activated in one transaction (see services.embedding_versions)
+and the shared snapshot is rebuilt. The related-components follower
+(`build_related_components --follow`) rebuilds its graph when it sees the activation.
+
+The staging column must exist first:
+    alter table components add column embedding_<version> vector(<dim>);
+Vectors are written with the `set_component_embeddings` function, which only
+updates existing rows, so a component deleted mid-run is not re-created.
+
+Usage:
+    PYTHONPATH=src python -m scripts.migrate_embeddings --version mpnet-v1 --model all-mpnet-base-v2 --processes 4
+"""
+
+MIGRATION_COLUMNS = "id,kit_id,name,metadata"
+ACTIVATION_ATTEMPTS = 3
+
+Encoder = Callable[[Sequence[str]], np.ndarray]
+
+
+def embedding_text(row: Dict[str, Any]) -> str:
+    """The text a component is embedded from; the same field ingestion embeds."""
+    metadata = row.get("metadata") or {}
+    return metadata.get("description") or metadata.get("componentName") or row["name"]
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _missing_rows(client, column: str, page_size: int) -> Iterator[Dict[str, Any]]:
+    """Streams components that have no vector in `column` yet."""
+    last_id = None
+    while True:
+        query = (
+            client.table("components").select(MIGRATION_COLUMNS).is_(column, "null").order("id").limit(page_size)
+        )
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+class EmbeddingMigration:
+    """Writes one embedding version's vectors for every component."""
+
+    def __init__(
+        self,
+        client,
+        version: str,
+        model: str,
+        encode: Optional[Encoder] = None,
+        batch_size: int = 512,
+        page_size: int = 1000,
+        processes: int = 1,
+    ):
+        """
+        Args:
+            client: A Supabase client.
+            version: Name of the embedding version, e.g. "mpnet-v1".
+            model: sentence-transformers model of the version.
+            encode: Batch encoder; defaults to `embedding.generate_embeddings` with `model`.
+            batch_size: Rows encoded and upserted together.
+            page_size: Rows per keyset page read from the database.
+            processes: CPU processes used by the default encoder. They are started
+                once per `run` and reused by every batch.
+        """
+        self.client = client
+        self.version = version
+        self.model = model
+        self.column = staging_column(version)
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.store = EmbeddingVersionStore(client)
+        self.processes = processes if encode is None else 1
+        self._pool = None
+        if encode is None:
+            from embedding import generate_embeddings
+
+            def encode(texts: Sequence[str]) -> np.ndarray:
+                return generate_embeddings(texts, model, batch_size=batch_size, pool=self._pool)
+
+        self.encode = encode
+        self.rows_done = 0
+        self.rows_this_run = 0
+        self.started_at = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.perf_counter() - self.started_at
+        return self.rows_this_run / elapsed if elapsed > 0 else 0.0
+
+    def run(self, restart: bool = False, activate: bool = True) -> Dict[str, Any]:
+        """
+        Migrates every component, resuming a previous run unless `restart`.
+
+        Returns:
+            A report with the rows written, elapsed seconds, rows/sec and whether
+            the version was activated.
+        """
+        if self.processes <= 1:
+            return self._run(restart, activate)
+        from embedding import start_embedding_pool, stop_embedding_pool
+
+        self._pool = start_embedding_pool(self.model, self.processes)
+        try:
+            return self._run(restart, activate)
+        finally:
+            stop_embedding_pool(self.model, self._pool)
+            self._pool = None
+
+    def _run(self, restart: bool, activate: bool) -> Dict[str, Any]:
+        record = self.store.start(self.version, self.model, restart=restart)
+        self.rows_done = record.get("rows_done") or 0
+        cursor = record.get("cursor")
+        if cursor:
+            logger.info(f"Resuming {self.version} after component {cursor} ({self.rows_done} rows done).")
+        self.rows_this_run = 0
+        self.started_at = time.perf_counter()
+
+        rows = iter_component_rows(self.client, self.page_size, MIGRATION_COLUMNS, after=cursor)
+        self._write_all(rows, checkpoint=True)
+
+        if activate:
+            self._refit_projection()
+        activated = False
+        for attempt in range(1, ACTIVATION_ATTEMPTS + 1):
+            # Rows inserted behind the cursor without the staging vector, e.g. by a
+            # worker that had not yet noticed the migration.
+            self._write_all(_missing_rows(self.client, self.column, self.page_size), checkpoint=False)
+            if not activate:
+                break
+            try:
+                self.store.activate(self.version)
+                activated = True
+                break
+            except Exception as e:
+                logger.warning(f"Activation attempt {attempt} of {self.version} failed: {e}")
+
+        elapsed = time.perf_counter() - self.started_at
+        report = {
+            "version": self.version,
+            "rows": self.rows_this_run,
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "activated": activated,
+        }
+        logger.info(
+            f"Re-embedded {report['rows']} components for {self.version} in {report['seconds']}s "
+            f"({report['rows_per_second']} rows/s); activated: {activated}."
+        )
+        return report
+
+    def _refit_projection(self) -> None:
+        """
+        Fits the configured projection to this version's vectors, before readers
+        switch to them: the existing one was fit on the previous model and may
+        not even have its dimension.
+        """
+        projection = load_projection()
+        if projection is None:
+            return
+        vectors = [
+            vector
+            for row in iter_component_rows(self.client, self.page_size, f"id,{self.column}")
+            if (vector := coerce_vector(row.get(self.column))) is not None
+        ]
+        if not vectors:
+            logger.warning(f"{self.version}: no vectors to fit the projection to; the version will not use one.")
+            return
+        refit = refit_projection(projection, np.stack(vectors))
+        refit.save(projection_path(self.version))
+        logger.info(f"{self.version}: refit projection {projection.version} as {refit.version}.")
+
+    def _write_all(self, rows: Iterable[Dict[str, Any]], checkpoint: bool) -> None:
+        # One upsert stays in flight while the next batch is encoded.
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            pending: Optional[Future] = None
+            for batch in _batches(rows, self.batch_size):
+                vectors = np.asarray(self.encode([embedding_text(row) for row in batch]), dtype=np.float32)
+                ids = [row["id"] for row in batch]
+                if pending is not None:
+                    pending.result()
+                pending = writer.submit(self._write, ids, vectors, ids[-1] if checkpoint else None)
+            if pending is not None:
+                pending.result()
+
+    def _write(self, ids: List[str], vectors: np.ndarray, cursor: Optional[str]) -> None:
+        updated = self.store.set_vectors(self.column, ids, vectors)
+        if updated < len(ids):
+            logger.info(f"{self.version}: {len(ids) - updated} components were deleted before their vectors were written.")
+        self.rows_done += len(ids)
+        self.rows_this_run += len(ids)
+        if cursor is not None:
+            self.store.save_progress(self.version, cursor, self.rows_done)
+        logger.info(f"{self.version}: {self.rows_done} rows embedded ({self.rows_per_second:.0f} rows/s).")
+
+
+def refresh_derived_indexes(client, version: str) -> None:
+    """Rebuilds the shared snapshot from the activated version's vectors, with its own projection."""
+    if settings.EMBEDDING_SNAPSHOT_DIR:
+        from scripts.build_vector_snapshot import build_snapshot
+
+        build_snapshot(
+            iter_component_rows(client, columns="id,embedding"), settings.EMBEDDING_SNAPSHOT_DIR,
+            load_projection(version),
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed all components for a new embedding version.")
+    parser.add_argument("--version", required=True, help="Embedding version name, e.g. mpnet-v1.")
+    parser.add_argument("--model", required=True, help="sentence-transformers model for the version.")
+    parser.add_argument("--batch-size", type=int, default=512, help="Rows encoded and upserted together.")
+    parser.add_argument("--page-size", type=int, default=1000, help="Rows per database page.")
+    parser.add_argument("--processes", type=int, default=1, help="CPU processes for encoding.")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved progress and start over.")
+    parser.add_argument("--no-activate", action="store_true", help="Fill the staging column but do not cut over.")
+    args = parser.parse_args()
+
+    from db.db import supabase_client
+
+    migration = EmbeddingMigration(
+        supabase_client, args.version, args.model, batch_size=args.batch_size,
+        page_size=args.page_size, processes=args.processes,
+    )
+    report = migration.run(restart=args.restart, activate=not args.no_activate)
+    if report["activated"]:
+        refresh_derived_indexes(supabase_client, args.version)
@@ -1,4 +1,5 @@
 # Standard library imports
+import argparse
 import logging
 import os
 import sys
@@ -13,6 +14,7 @@ if project_root not in sys.path:
 from agents.ats_creator import ATSCreator
 from services.supabase_uploader import SupabaseUploader
 from embedding import generate_embedding 
+from services.profiling import profile_stage
 
 # Configure basic logging
 logging.basicConfig(level=logging.INFO)
@@ -32,12 +34,14 @@ def process_and_upload(file_path: str):
 
         # 2. Generate ATS from the component file
         logger.info("Generating ATS from component file...")
-        ats_data = ats_creator.create_ats_from_file(file_path)
+        with profile_stage("ats"):
+            ats_data = ats_creator.create_ats_from_file(file_path)
         logger.info(f"Successfully generated ATS for: {ats_data.componentName}")
 
         # 4. Generate Embedding
         logger.info("Generating embedding from component description...")
-        embedding = generate_embedding(ats_data.description)
+        with profile_stage("embed"):
+            embedding = generate_embedding(ats_data.description)
         logger.info(f"Generated embedding of dimension: {len(embedding)}")
 
         # 5. Upload to Supabase
@@ -48,7 +52,8 @@ def process_and_upload(file_path: str):
         logger.info(f"Using kit_id: {kit_id}")
 
         logger.info("Uploading component data and embedding to Supabase...")
-        supabase_uploader.upload_ats(ats_data=ats_data, kit_id=kit_id, embedding=embedding)
+        with profile_stage("upload"):
+            supabase_uploader.upload_ats(ats_data=ats_data, kit_id=kit_id, embedding=embedding)
 
         logger.info("\n✅ --- Component processing and upload completed successfully! ---")
 
@@ -58,7 +63,7 @@ def process_and_upload(file_path: str):
         logger.error(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
-    # We will replace this with the actual path to the reel component
-    # Set the full path to the component we want to process.
-    component_file_path = "/Users/atango/Documents/supacharged/supacharged/packages/ui/components/ui/button.tsx" 
-    process_and_upload(component_file_path)
+    parser = argparse.ArgumentParser(description="Process a single component file and upload it to Supabase.")
+    parser.add_argument("file_path", help="Path to the component file, e.g. packages/ui/components/ui/button.tsx")
+    args = parser.parse_args()
+    process_and_upload(args.file_path)
@@ -1,22 +1,18 @@
 import dspy
 import json
-import os
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+from agents.model_router import ESCALATING_ERRORS, ModelRouter
+from agents.source_analysis import extract_static_fields
+from agents.source_minifier import MinifyResult, estimate_tokens, fit_to_budget
+from config.config import settings
 from schemas.ats import ATSModel
 
-# --- 1. Configuration (from your code) ---
-# Make sure to replace "YOUR_GEMINI_API_KEY" or load it from a .env file
-# from config.config import settings
-# lm = dspy.LM("google/gemini-1.5-flash", api_key=settings.GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
 
-# For demonstration purposes, let's configure it directly
-try:
-    api_key = os.environ["GEMINI_API_KEY"]
-except KeyError:
-    print("Please set the GEMINI_API_KEY environment variable.")
-    exit()
-
-lm = dspy.LM("gemini/gemini-2.5-flash", api_key=api_key)
-dspy.configure(lm=lm)
+# --- 1. Configuration ---
+# Nothing is configured at import time. LMs are built from config.Settings by
+# the ModelRouter (see agents.model_router.get_lm) when the first prediction runs.
 
 
 # --- 2. Define the DSPy Signature ---
@@ -26,7 +22,7 @@ class ATSSignature(dspy.Signature):
 
     # --- Input Field ---
     component_code = dspy.InputField(
-        desc="The full source code of the React/TypeScript component."
+        desc="The React/TypeScript component source, minified: comments removed, whitespace collapsed and long string literals shortened with '…'."
     )
 
     # --- Output Fields (each key of our JSON) ---
@@ -48,16 +44,85 @@ class ATSSignature(dspy.Signature):
     tags = dspy.OutputField(
         desc='A JSON-formatted list of 3-5 relevant, lowercase keywords (e.g., ["button", "ui", "interaction"]).'
     )
-    rawCode = dspy.OutputField(
-        desc="The complete, unmodified source code from the input, formatted as a single JSON string."
+    # rawCode is deliberately not an output field: it is the input verbatim, so we
+    # take it from the file instead of paying for the model to echo it back.
+
+
+class PackedATSSignature(dspy.Signature):
+    """Analyze several independent React components and extract the Abstract Technical Specification (ATS) of each one. Treat every component separately; never mix fields between components."""
+
+    components = dspy.InputField(
+        desc="Several minified React/TypeScript component sources. Each starts with a header line '=== component <id> ==='."
     )
+    specs: List[Dict[str, Any]] = dspy.OutputField(
+        desc=(
+            "One object per input component, in input order. Keys: id (the integer from the header), "
+            "componentName, description, dependencies (list of external packages), internalDependencies "
+            "(list of alias-based imports), propsInterface (object: prop name -> {type, optional, options}) "
+            "and tags (3-5 lowercase keywords)."
+        )
+    )
+
+
+# Output fields streamed to clients as the model generates them.
+STREAMED_FIELDS = (
+    "componentName",
+    "description",
+    "dependencies",
+    "internalDependencies",
+    "propsInterface",
+    "tags",
+)
+
+
+def _load_json_field(value: Any) -> Any:
+    """Decodes a JSON-formatted output field; packed outputs arrive already decoded."""
+    return json.loads(value) if isinstance(value, str) else value
 
 
 # --- 4. The ATSCreator Class ---
 class ATSCreator:
-    def __init__(self):
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        elide_strings: Optional[bool] = None,
+        max_string_length: Optional[int] = None,
+        router: Optional[ModelRouter] = None,
+    ):
+        """
+        Args:
+            token_budget: Estimated input tokens allowed per component. Defaults to settings.
+            elide_strings: Shorten long string literals before submission. Defaults to settings.
+            max_string_length: Longest string literal kept verbatim. Defaults to settings.
+            router: Chooses the LM tier per component. Built from settings if omitted.
+        """
         # The predictor is a simple dspy.Module that uses our signature.
         self.predictor = dspy.Predict(ATSSignature)
+        self.token_budget = token_budget or settings.ATS_TOKEN_BUDGET
+        self.elide_strings = settings.ATS_ELIDE_STRINGS if elide_strings is None else elide_strings
+        self.max_string_length = max_string_length or settings.ATS_MAX_STRING_LENGTH
+        # Minification outcome per submitted source, for reporting tokens saved.
+        self.minify_results: Dict[str, MinifyResult] = {}
+        self.packed_predictor = dspy.Predict(PackedATSSignature)
+        self.router = router or ModelRouter.from_settings()
+
+    def prepare_code(self, code: str, label: str = "<input>") -> str:
+        """
+        Minifies a source and fits it to the token budget before it is sent to the LLM.
+        The outcome is logged and kept in `minify_results` under `label`.
+        """
+        result = fit_to_budget(
+            code,
+            self.token_budget,
+            elide_strings=self.elide_strings,
+            max_string_length=self.max_string_length,
+        )
+        self.minify_results[label] = result
+        logger.info(
+            f"Prepared {label}: ~{result.original_tokens} -> ~{result.tokens} tokens "
+            f"({result.tokens_saved} saved{', truncated' if result.truncated else ''})."
+        )
+        return result.code
 
     def create_ats_from_file(self, file_path: str) -> ATSModel | None:
         """
@@ -71,43 +136,187 @@ class ATSCreator:
             print(f"Error: File not found at {file_path}")
             return None
 
-        # 2. Pass it to the dspy agent (predictor)
-        prediction = self.predictor(component_code=code)
-
-        # 3. Get the output and parse it
+        # 2. Pass the minified source to the dspy agent (predictor) and
+        # 3. parse the output, escalating to a stronger model if it is invalid
+        prepared = self.prepare_code(code, file_path)
         try:
-            # Combine the string outputs into a single JSON-like structure
-            # DSPy outputs each field as a string, so we need to construct a valid JSON string
-            # and then parse it.
-
-            # Since propsInterface and dependencies are complex, we ask the LLM
-            # to format them as JSON strings directly in the signature.
-
-            # Pre-process the props to align with the Pydantic model
-            props_interface_raw = json.loads(prediction.propsInterface)
-            processed_props = {}
-            for prop_name, prop_details in props_interface_raw.items():
-                processed_props[prop_name] = {
-                    "type": prop_details.get("type"),
-                    "isOptional": prop_details.get("optional", False),
-                    "options": prop_details.get("options"),
-                }
+            return self._predict_single(prepared, code, file_path)
+        except ESCALATING_ERRORS as e:
+            print(f"Error parsing or validating the AI's output: {e}")
+            return None
 
-            output_dict = {
-                "componentName": prediction.componentName,
-                "description": prediction.description,
-                "dependencies": json.loads(prediction.dependencies),
-                "internalDependencies": json.loads(prediction.internalDependencies),
-                "propsInterface": processed_props,
-                "tags": json.loads(prediction.tags),
-                "rawCode": prediction.rawCode,
-            }
+    def create_ats_for_files(
+        self,
+        file_paths: List[str],
+        pack_token_budget: Optional[int] = None,
+        max_pack_size: Optional[int] = None,
+    ) -> Dict[str, ATSModel | None]:
+        """
+        Generates ATSs for many files, packing small components into shared LLM calls.
+
+        Sources are grouped in order until a group reaches the pack token budget or
+        size; each group of two or more is sent as a single prediction and split back
+        into per-component ATSModels. Components missing from the packed answer or
+        failing validation are retried with a single-file call.
+
+        Args:
+            file_paths: Component files to process.
+            pack_token_budget: Estimated input tokens per packed call. Defaults to settings.
+            max_pack_size: Most components per packed call. Defaults to settings.
+
+        Returns:
+            Mapping of every input path to its ATSModel, or None if generation failed.
+        """
+        pack_token_budget = pack_token_budget or settings.ATS_PACK_TOKEN_BUDGET
+        max_pack_size = max_pack_size or settings.ATS_PACK_MAX_COMPONENTS
+
+        results: Dict[str, ATSModel | None] = {}
+        packs: List[List[Dict[str, Any]]] = []
+        pack_tokens = 0
+        for path in file_paths:
+            try:
+                with open(path, "r") as f:
+                    code = f.read()
+            except FileNotFoundError:
+                print(f"Error: File not found at {path}")
+                results[path] = None
+                continue
+            prepared = self.prepare_code(code, path)
+            tokens = estimate_tokens(prepared)
+            if not packs or len(packs[-1]) >= max_pack_size or pack_tokens + tokens > pack_token_budget:
+                packs.append([])
+                pack_tokens = 0
+            packs[-1].append({"path": path, "code": code, "prepared": prepared})
+            pack_tokens += tokens
+
+        for pack in packs:
+            if len(pack) == 1:
+                item = pack[0]
+                results[item["path"]] = self._predict_single_or_none(item)
+                continue
+            packed = self._predict_packed(pack)
+            for item in pack:
+                ats = packed.get(item["path"])
+                if ats is None:
+                    logger.info(f"Falling back to a single-file call for {item['path']}.")
+                    ats = self._predict_single_or_none(item)
+                results[item["path"]] = ats
 
-            # Validate the dictionary with our Pydantic model
-            validated_ats = ATSModel(**output_dict)
-            return validated_ats
-        except (json.JSONDecodeError, Exception) as e:
+        # Preserve the caller's order.
+        return {path: results.get(path) for path in file_paths}
+
+    def _predict_single(self, prepared: str, code: str, label: str) -> ATSModel:
+        return self.router.run(
+            prepared,
+            lambda lm: self.build_ats(self.predictor(component_code=prepared, lm=lm), code),
+            label=label,
+        )
+
+    def _predict_single_or_none(self, item: Dict[str, Any]) -> ATSModel | None:
+        try:
+            return self._predict_single(item["prepared"], item["code"], item["path"])
+        except Exception as e:
             print(f"Error parsing or validating the AI's output: {e}")
-            print("--- Raw Prediction ---")
-            print(prediction)
             return None
+
+    def _predict_packed(self, pack: List[Dict[str, Any]]) -> Dict[str, ATSModel]:
+        """
+        Runs one prediction for a pack of components and returns the ATSs that
+        validated, keyed by path. Anything else is left for the single-file fallback.
+        """
+        components = "\n".join(
+            f"=== component {index} ===\n{item['prepared']}" for index, item in enumerate(pack)
+        )
+        try:
+            # Packs only hold small components, so they always use the first tier.
+            specs = self.packed_predictor(components=components, lm=self.router.lm(0)).specs
+        except Exception as e:
+            logger.warning(f"Packed ATS call for {len(pack)} components failed: {e}")
+            return {}
+
+        results: Dict[str, ATSModel] = {}
+        for spec in specs if isinstance(specs, list) else []:
+            try:
+                item = pack[int(spec["id"])]
+                results[item["path"]] = self.build_ats(dspy.Prediction(**spec), item["code"])
+            except Exception as e:
+                logger.warning(f"Discarding packed ATS entry {spec.get('id') if isinstance(spec, dict) else spec!r}: {e}")
+        logger.info(f"Packed ATS call produced {len(results)} of {len(pack)} components.")
+        return results
+
+    def build_ats(self, prediction: Any, code: str) -> ATSModel:
+        """
+        Parses a prediction's string fields and validates them as an ATSModel.
+
+        Raises:
+            json.JSONDecodeError: If a JSON-formatted field cannot be parsed.
+            pydantic.ValidationError: If the result does not match ATSModel.
+        """
+        # DSPy outputs each field as a string. Since propsInterface and dependencies
+        # are complex, we ask the LLM to format them as JSON strings directly in the
+        # signature and parse them here.
+
+        # Pre-process the props to align with the Pydantic model
+        props_interface_raw = _load_json_field(prediction.propsInterface)
+        processed_props = {}
+        for prop_name, prop_details in props_interface_raw.items():
+            processed_props[prop_name] = {
+                "type": prop_details.get("type"),
+                "isOptional": prop_details.get("optional", False),
+                "options": prop_details.get("options"),
+            }
+
+        output_dict = {
+            "componentName": prediction.componentName,
+            "description": prediction.description,
+            "dependencies": _load_json_field(prediction.dependencies),
+            "internalDependencies": _load_json_field(prediction.internalDependencies),
+            "propsInterface": processed_props,
+            "tags": _load_json_field(prediction.tags),
+            "rawCode": code,
+        }
+
+        # Validate the dictionary with our Pydantic model
+        return ATSModel(**output_dict)
+
+    def _streaming_program(self):
+        listeners = [dspy.streaming.StreamListener(signature_field_name=name) for name in STREAMED_FIELDS]
+        return dspy.streamify(self.predictor, stream_listeners=listeners)
+
+    async def stream_ats(self, code: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generates an ATS incrementally, yielding events as soon as data is available:
+
+        - "static": fields computed without the LLM (name guess, imports, rawCode).
+        - "delta": a chunk of one LLM output field as the provider streams it.
+        - "final": the validated ATSModel, always last on success.
+        - "error": parsing or validation failed; no "final" event follows.
+        """
+        yield {"event": "static", "data": extract_static_fields(code)}
+
+        # Deltas are already sent when the output turns out invalid, so streaming
+        # uses the routed tier without escalation.
+        prepared = self.prepare_code(code)
+        lm = self.router.lm(self.router.choose_tier(prepared))
+        prediction = None
+        async for message in self._streaming_program()(component_code=prepared, lm=lm):
+            if isinstance(message, dspy.Prediction):
+                prediction = message
+            elif isinstance(message, dspy.streaming.StreamResponse):
+                yield {
+                    "event": "delta",
+                    "data": {
+                        "field": message.signature_field_name,
+                        "chunk": message.chunk,
+                        "done": message.is_last_chunk,
+                    },
+                }
+
+        try:
+            if prediction is None:
+                raise ValueError("The model returned no prediction.")
+            ats = self.build_ats(prediction, code)
+        except Exception as e:
+            yield {"event": "error", "data": {"detail": f"Error parsing or validating the AI's output: {e}"}}
+            return
+        yield {"event": "final", "data": ats.model_dump()}
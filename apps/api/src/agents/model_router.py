@@ -0,0 +1,154 @@
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import dspy
+from dspy.utils.exceptions import AdapterParseError
+from pydantic import ValidationError
+
+from agents.source_analysis import component_complexity
+from agents.source_minifier import estimate_tokens
+from config.config import settings
+
+logger = logging.getLogger(__name__)
+
+"""
+Routing of ATS predictions across LM tiers.
+
+Tiers are ordered from cheapest and fastest to strongest. A component starts on
+the cheapest tier its size and complexity allow, and moves up a tier only when
+the model's output cannot be parsed as JSON or fails ATSModel validation. Other
+errors (network, quota) are not retried on a stronger model. Every attempt is
+recorded per tier so the thresholds can be tuned from real success rates.
+"""
+
+# Output problems that a stronger model is likely to fix.
+ESCALATING_ERRORS = (json.JSONDecodeError, ValidationError, AdapterParseError, AttributeError, KeyError, TypeError)
+
+
+@dataclass
+class TierStats:
+    """Counters for one tier."""
+    attempts: int = 0
+    successes: int = 0
+    escalations: int = 0
+    errors: int = 0
+    total_latency: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "escalations": self.escalations,
+            "errors": self.errors,
+            "success_rate": self.successes / self.attempts if self.attempts else None,
+            "avg_latency_ms": 1000 * self.total_latency / self.attempts if self.attempts else None,
+        }
+
+
+def get_lm(model: str) -> dspy.LM:
+    """Builds an LM for a model name with the provider key from settings."""
+    return dspy.LM(model, api_key=settings.GEMINI_API_KEY)
+
+
+class ModelRouter:
+    """Chooses an LM tier per component and escalates on invalid output."""
+
+    def __init__(
+        self,
+        models: Sequence[str],
+        fast_max_tokens: int = 1500,
+        fast_max_complexity: int = 10,
+        lm_factory: Optional[Callable[[str], Any]] = None,
+    ):
+        """
+        Args:
+            models: LiteLLM model names, cheapest first.
+            fast_max_tokens: Largest (minified) source routed to the first tier.
+            fast_max_complexity: Highest `component_complexity` routed to the first tier.
+            lm_factory: Builds an LM from a model name; defaults to get_lm.
+        """
+        if not models:
+            raise ValueError("ModelRouter needs at least one model tier.")
+        self.models = list(models)
+        self.fast_max_tokens = fast_max_tokens
+        self.fast_max_complexity = fast_max_complexity
+        self._lm_factory = lm_factory or get_lm
+        self._lms: Dict[int, Any] = {}
+        self.stats: List[TierStats] = [TierStats() for _ in self.models]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "ModelRouter":
+        return cls(
+            settings.ATS_MODEL_TIERS,
+            fast_max_tokens=settings.ATS_FAST_TIER_MAX_TOKENS,
+            fast_max_complexity=settings.ATS_FAST_TIER_MAX_COMPLEXITY,
+        )
+
+    def choose_tier(self, code: str) -> int:
+        """Returns the first tier to try for a source: 0 for small, simple components, else 1."""
+        if len(self.models) == 1:
+            return 0
+        if estimate_tokens(code) <= self.fast_max_tokens and component_complexity(code) <= self.fast_max_complexity:
+            return 0
+        return 1
+
+    def lm(self, tier: int) -> Any:
+        """Returns the tier's LM, constructing it on first use."""
+        with self._lock:
+            if tier not in self._lms:
+                self._lms[tier] = self._lm_factory(self.models[tier])
+            return self._lms[tier]
+
+    def run(self, code: str, attempt: Callable[[Any], Any], label: str = "<input>") -> Any:
+        """
+        Calls `attempt` with the chosen tier's LM, escalating to the next tier
+        when it raises one of ESCALATING_ERRORS.
+
+        Args:
+            code: The source sent to the model, used for the routing decision.
+            attempt: Performs the prediction with the given LM and parses it.
+            label: Name used in log messages.
+
+        Returns:
+            The first successful result.
+
+        Raises:
+            The last tier's error if every tier failed, or any non-escalating error.
+        """
+        tier = self.choose_tier(code)
+        while True:
+            started = time.perf_counter()
+            try:
+                result = attempt(self.lm(tier))
+            except ESCALATING_ERRORS as e:
+                last_tier = tier == len(self.models) - 1
+                self._record(tier, started, escalated=not last_tier)
+                if last_tier:
+                    raise
+                logger.info(f"Escalating {label} from {self.models[tier]} to {self.models[tier + 1]}: {e}")
+                tier += 1
+                continue
+            except Exception:
+                self._record(tier, started, error=True)
+                raise
+            self._record(tier, started, success=True)
+            return result
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tier counters, keyed by model name."""
+        with self._lock:
+            return {model: stats.as_dict() for model, stats in zip(self.models, self.stats)}
+
+    def _record(self, tier: int, started: float, success: bool = False, escalated: bool = False, error: bool = False) -> None:
+        with self._lock:
+            stats = self.stats[tier]
+            stats.attempts += 1
+            stats.successes += success
+            stats.escalations += escalated
+            stats.errors += error
+            stats.total_latency += time.perf_counter() - started
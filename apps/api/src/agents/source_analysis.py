@@ -0,0 +1,120 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+"""
+Lightweight static analysis of React/TypeScript component sources.
+
+These helpers work on the raw text with regular expressions. They do not need a
+TypeScript toolchain and are cheap enough to run on every file of a kit before any
+LLM call is made.
+"""
+
+# Aliases treated as internal imports when no tsconfig is available (shadcn default).
+DEFAULT_INTERNAL_PREFIXES = ("@/", "~/")
+
+_IMPORT_RE = re.compile(
+    r"""
+    (?:^|[;\s])
+    (?:
+        import\s+(?:type\s+)?(?:[\w$*{}\s,]+?\s+from\s+)?  # import x from / import "x"
+      | export\s+(?:type\s+)?(?:[\w$*{}\s,]+?\s+from\s+)   # export { x } from
+    )
+    (["'])(?P<spec>[^"'\n]+)\1
+    |
+    (?:\bimport|\brequire)\s*\(\s*(["'])(?P<dyn>[^"'\n]+)\3\s*\)  # import("x") / require("x")
+    """,
+    re.VERBOSE | re.MULTILINE,
+)
+
+
+_DEFAULT_EXPORT_RE = re.compile(r"export\s+default\s+(?:async\s+)?(?:function|class)\s+([A-Z][\w$]*)")
+_NAMED_EXPORT_RE = re.compile(r"export\s+(?:const|let|var|function|class)\s+([A-Z][\w$]*)")
+_EXPORT_LIST_RE = re.compile(r"export\s*{([^}]*)}")
+_DECLARATION_RE = re.compile(r"(?:^|\s)(?:const|function|class)\s+([A-Z][\w$]*)")
+
+
+def parse_imports(code: str) -> List[str]:
+    """
+    Returns the module specifiers imported by a source file, in first-seen order.
+    Covers static imports, side-effect imports, re-exports, dynamic `import()`
+    and `require()`.
+    """
+    specs = []
+    for match in _IMPORT_RE.finditer(code):
+        spec = match.group("spec") or match.group("dyn")
+        if spec and spec not in specs:
+            specs.append(spec)
+    return specs
+
+
+def package_name(spec: str) -> str:
+    """Reduces a bare import specifier to its package, e.g. "@radix-ui/react-slot/dist" -> "@radix-ui/react-slot"."""
+    parts = spec.split("/")
+    return "/".join(parts[:2]) if spec.startswith("@") else parts[0]
+
+
+def split_imports(
+    specs: Sequence[str], internal_prefixes: Sequence[str] = DEFAULT_INTERNAL_PREFIXES
+) -> Tuple[List[str], List[str]]:
+    """
+    Splits import specifiers into (external packages, internal imports).
+    Relative imports and alias imports (e.g. "@/lib/utils") are internal.
+    """
+    external, internal = [], []
+    for spec in specs:
+        if spec.startswith(".") or spec.startswith(tuple(internal_prefixes)):
+            if spec not in internal:
+                internal.append(spec)
+        else:
+            name = package_name(spec)
+            if name not in external:
+                external.append(name)
+    return external, internal
+
+
+def guess_component_name(code: str) -> Optional[str]:
+    """
+    Guesses the main component's name from its exports: a PascalCase default
+    export, then named exports, then the first PascalCase declaration.
+    """
+    match = _DEFAULT_EXPORT_RE.search(code) or _NAMED_EXPORT_RE.search(code)
+    if match:
+        return match.group(1)
+    for export_list in _EXPORT_LIST_RE.findall(code):
+        for item in export_list.split(","):
+            name = item.split(" as ")[-1].strip()
+            if name[:1].isupper():
+                return name
+    match = _DECLARATION_RE.search(code)
+    return match.group(1) if match else None
+
+
+def extract_static_fields(code: str) -> Dict[str, Any]:
+    """
+    Computes the ATS fields that need no LLM: a best-effort component name,
+    the external and internal imports, and the unmodified source.
+    """
+    dependencies, internal_dependencies = split_imports(parse_imports(code))
+    return {
+        "componentName": guess_component_name(code),
+        "dependencies": dependencies,
+        "internalDependencies": internal_dependencies,
+        "rawCode": code,
+    }
+
+
+_COMPLEXITY_MARKERS_RE = re.compile(
+    r"\bcva\s*\(|\bforwardRef\b|\bcreateContext\b|\buse(?:Reducer|Effect|LayoutEffect|Imperative\w*)\b|\w\?:"
+)
+
+
+def component_complexity(code: str) -> int:
+    """
+    Scores how much structure a component has for the ATS to describe: exported
+    components, optional props, cva variant definitions, refs, context and effects.
+    A typical single-export shadcn primitive scores below 10.
+    """
+    exports = len(set(_NAMED_EXPORT_RE.findall(code)))
+    for export_list in _EXPORT_LIST_RE.findall(code):
+        exports += sum(1 for item in export_list.split(",") if item.split(" as ")[-1].strip()[:1].isupper())
+    return exports + len(_COMPLEXITY_MARKERS_RE.findall(code))
@@ -0,0 +1,380 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+"""
+Pre-processing of component sources before they are sent to the LLM.
+
+The ATS only depends on a component's structure: its imports, prop types, cva
+variants and exports. Comments, license headers, indentation and long Tailwind
+class strings cost input tokens without informing any ATS field, so they are
+removed or shortened here. The pass is a single left-to-right scan that
+tracks whether it is in code, a string, a template literal (and the code of its
+`${...}` expressions), a regex literal or JSX text and attributes. Only text in
+code is ever treated as a comment, so `//` in a URL or an apostrophe in JSX text
+is kept as written.
+"""
+
+# Characters after which a "/" starts a regex literal rather than a division.
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%~^")
+_REGEX_KEYWORD_RE = re.compile(r"\b(?:return|typeof|case|do|else|in|of|void|yield|await)$")
+
+# Strings following these tokens are module specifiers and must be kept intact.
+_SPECIFIER_CONTEXT_RE = re.compile(r"(?:\bfrom|\bimport|\brequire\s*\(|\bimport\s*\()\s*$")
+
+_TOKEN_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+ELISION = "…"
+TRUNCATION_MARKER = "\n/* …truncated to fit the token budget */"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the BPE token count of source code without a tokenizer.
+
+    Code tokenizes into roughly one token per punctuation character and one per
+    short word; long words split into about one token per six characters.
+    """
+    return sum(
+        math.ceil(len(piece) / 6) if piece[0].isalnum() else 1
+        for piece in _TOKEN_PIECE_RE.findall(text)
+    )
+
+
+@dataclass
+class MinifyResult:
+    """A minified source and what it saved."""
+    code: str
+    original_tokens: int
+    tokens: int
+    truncated: bool = False
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+def minify_source(code: str, elide_strings: bool = True, max_string_length: int = 48) -> str:
+    """
+    Strips comments, collapses whitespace and optionally shortens long string literals.
+
+    Args:
+        code: The component source.
+        elide_strings: Shorten string literals longer than `max_string_length`,
+            including JSX attribute values. Module specifiers are never shortened.
+        max_string_length: Longest string literal (including quotes) kept verbatim.
+    """
+    return _Minifier(code, elide_strings, max_string_length).run()
+
+
+class _NotJsx(Exception):
+    """Raised when a "<" that looked like the start of a JSX element is not one."""
+
+
+class _Minifier:
+    """
+    One left-to-right pass over a source. Code, string, template and JSX
+    contexts are scanned by separate methods that call each other for nested
+    contexts (a template's `${...}`, a JSX `{...}` or a child element), so
+    only text that is code in its context is ever treated as a comment.
+    """
+
+    def __init__(self, code: str, elide_strings: bool, max_string_length: int):
+        self.code = code
+        self.length = len(code)
+        self.elide_strings = elide_strings
+        self.max_string_length = max_string_length
+        self.i = 0
+        self.out: List[str] = []
+        self.pending_space = ""
+
+    def run(self) -> str:
+        self._code(in_braces=False)
+        return "".join(self.out).strip() + "\n"
+
+    def _last_significant(self) -> str:
+        for chunk in reversed(self.out):
+            stripped = chunk.rstrip()
+            if stripped:
+                return stripped
+        return ""
+
+    def _emit(self, text: str) -> None:
+        if self.pending_space and self.out:
+            self.out.append(self.pending_space)
+        self.pending_space = ""
+        self.out.append(text)
+
+    def _raw(self, text: str) -> None:
+        # Inside templates, where whitespace is content.
+        self.pending_space = ""
+        self.out.append(text)
+
+    def _whitespace(self) -> None:
+        # Remember whether the run contained a newline, emit lazily.
+        start = self.i
+        while self.i < self.length and self.code[self.i].isspace():
+            self.i += 1
+        newline = "\n" in self.code[start : self.i] or self.pending_space == "\n"
+        self.pending_space = "\n" if newline else " "
+
+    def _elide(self, literal: str) -> str:
+        if not self.elide_strings or len(literal) <= self.max_string_length:
+            return literal
+        keep = max(self.max_string_length - 3, 8)
+        return literal[:keep] + ELISION + literal[0]
+
+    def _code(self, in_braces: bool) -> None:
+        """Scans code up to the end, or up to the unmatched "}" closing an enclosing `{` if `in_braces`."""
+        code, depth = self.code, 0
+        while self.i < self.length:
+            char = code[self.i]
+            nxt = code[self.i + 1] if self.i + 1 < self.length else ""
+
+            if char.isspace():
+                self._whitespace()
+                continue
+
+            # Comments.
+            if char == "/" and nxt == "/":
+                end = code.find("\n", self.i)
+                self.i = self.length if end == -1 else end
+                continue
+            if char == "/" and nxt == "*":
+                end = code.find("*/", self.i + 2)
+                self.i = self.length if end == -1 else end + 2
+                if not self.pending_space:
+                    self.pending_space = " "
+                continue
+
+            if char == "`":
+                self._template()
+                continue
+            if char in "\"'":
+                end = _skip_string(code, self.i)
+                literal = code[self.i : end]
+                context = "".join(self.out[-4:]) + self.pending_space
+                self._emit(literal if _SPECIFIER_CONTEXT_RE.search(context) else self._elide(literal))
+                self.i = end
+                continue
+
+            if char in "/<" and self._expression_start():
+                # Regex literals, which may contain quotes or "//".
+                if char == "/":
+                    end = _skip_regex(code, self.i)
+                    if end is not None:
+                        self._emit(code[self.i : end])
+                        self.i = end
+                        continue
+                # JSX elements, whose text may contain quotes or "//".
+                elif nxt.isalpha() or nxt == ">":
+                    state = (self.i, len(self.out), self.pending_space)
+                    try:
+                        self._jsx_element()
+                        continue
+                    except _NotJsx:
+                        # E.g. a generic arrow function in a .ts file.
+                        self.i, size, self.pending_space = state
+                        del self.out[size:]
+
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                if depth == 0 and in_braces:
+                    return
+                depth = max(depth - 1, 0)
+
+            # Plain code: copy up to the next character that needs special handling.
+            start = self.i
+            while self.i < self.length and not code[self.i].isspace() and code[self.i] not in "\"'`/<{}":
+                self.i += 1
+            if self.i == start:
+                self.i += 1
+            self._emit(code[start : self.i])
+
+    def _expression_start(self) -> bool:
+        """Whether the scanner is where an operand is expected, so "/" and "<" cannot be operators."""
+        previous = self._last_significant()
+        return (
+            not previous
+            or previous[-1] in _REGEX_PRECEDERS
+            or previous.endswith("=>")
+            or bool(_REGEX_KEYWORD_RE.search(previous))
+        )
+
+    def _braced_expression(self) -> None:
+        self._emit("{")
+        self.i += 1
+        self._code(in_braces=True)
+        if self.i >= self.length:
+            raise _NotJsx()
+        self.pending_space = ""
+        self._emit("}")
+        self.i += 1
+
+    def _template(self) -> None:
+        """Copies a template literal verbatim, minifying the code in its `${...}` expressions."""
+        code = self.code
+        self._emit("`")
+        self.i += 1
+        start = self.i
+        while self.i < self.length:
+            char = code[self.i]
+            if char == "\\":
+                self.i += 2
+            elif char == "`":
+                self.i += 1
+                self._raw(code[start : self.i])
+                return
+            elif char == "$" and code[self.i + 1 : self.i + 2] == "{":
+                self.i += 2
+                self._raw(code[start : self.i])
+                self._code(in_braces=True)
+                self._raw("}")
+                self.i += 1
+                start = self.i
+            else:
+                self.i += 1
+        self._raw(code[start:])
+        self.i = self.length
+
+    def _jsx_element(self) -> None:
+        """
+        Scans a JSX element or fragment starting at "<". Its text is kept as
+        written, with whitespace collapsed as JSX itself does.
+
+        Raises:
+            _NotJsx: If the "<" does not start a well-formed element.
+        """
+        code = self.code
+        self._emit("<")
+        self.i += 1
+        start = self.i
+        while self.i < self.length and (code[self.i].isalnum() or code[self.i] in "_$.:-"):
+            self.i += 1
+        self.out.append(code[start : self.i])
+
+        # Attributes, up to ">" or "/>".
+        while True:
+            if self.i >= self.length:
+                raise _NotJsx()
+            char = code[self.i]
+            if char.isspace():
+                self._whitespace()
+            elif char == ">":
+                self.pending_space = ""
+                self._emit(">")
+                self.i += 1
+                break
+            elif char == "/" and code[self.i + 1 : self.i + 2] == ">":
+                self._emit("/>")
+                self.i += 2
+                return
+            elif char == "{":
+                self._braced_expression()
+            elif char in "\"'":
+                end = code.find(char, self.i + 1)
+                if end == -1:
+                    raise _NotJsx()
+                self._emit(self._elide(code[self.i : end + 1]))
+                self.i = end + 1
+            elif char == "," or code.startswith("extends", self.i) or not (char.isalpha() or char in "_$=-:"):
+                # `<T,>` and `<T extends U>` are type parameters, not elements.
+                raise _NotJsx()
+            else:
+                start = self.i
+                while self.i < self.length and (code[self.i].isalnum() or code[self.i] in "_$-:="):
+                    self.i += 1
+                self._emit(code[start : self.i])
+
+        # Children, up to the closing tag.
+        while self.i < self.length:
+            char = code[self.i]
+            if char == "<" and code[self.i + 1 : self.i + 2] == "/":
+                end = code.find(">", self.i)
+                if end == -1:
+                    raise _NotJsx()
+                if self.pending_space == "\n":
+                    # JSX drops whitespace that contains a line break, but not a trailing space.
+                    self.pending_space = ""
+                self._emit("</" + code[self.i + 2 : end].strip() + ">")
+                self.i = end + 1
+                return
+            if char == "<":
+                self._jsx_element()
+            elif char == "{":
+                self._braced_expression()
+            elif char.isspace():
+                self._whitespace()
+            else:
+                start = self.i
+                while self.i < self.length and not code[self.i].isspace() and code[self.i] not in "<{":
+                    self.i += 1
+                self._emit(code[start : self.i])
+        raise _NotJsx()
+
+
+def fit_to_budget(code: str, budget: int, elide_strings: bool = True, max_string_length: int = 48) -> MinifyResult:
+    """
+    Minifies a source and, if it still exceeds the token budget, truncates it.
+
+    Truncation keeps whole lines from the top of the file, where imports, prop
+    types and cva variant definitions normally live, and appends a marker so the
+    model knows the source is incomplete.
+    """
+    original_tokens = estimate_tokens(code)
+    minified = minify_source(code, elide_strings=elide_strings, max_string_length=max_string_length)
+    tokens = estimate_tokens(minified)
+    if tokens <= budget:
+        return MinifyResult(minified, original_tokens, tokens)
+
+    kept: List[str] = []
+    used = estimate_tokens(TRUNCATION_MARKER)
+    for line in minified.splitlines(keepends=True):
+        line_tokens = estimate_tokens(line)
+        if used + line_tokens > budget:
+            break
+        kept.append(line)
+        used += line_tokens
+    truncated = "".join(kept) + TRUNCATION_MARKER
+    return MinifyResult(truncated, original_tokens, estimate_tokens(truncated), truncated=True)
+
+
+def _skip_string(code: str, start: int) -> int:
+    """Returns the index just past the quoted string literal starting at `start`."""
+    quote = code[start]
+    i = start + 1
+    while i < len(code):
+        char = code[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == quote or char == "\n":
+            return i + 1
+        i += 1
+    return len(code)
+
+
+def _skip_regex(code: str, start: int) -> Optional[int]:
+    """Returns the index just past a regex literal, or None if it is not one."""
+    i = start + 1
+    in_class = False
+    while i < len(code):
+        char = code[i]
+        if char == "\n":
+            return None
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            while i < len(code) and code[i].isalpha():
+                i += 1
+            return i
+        i += 1
+    return None
@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,6 +13,70 @@ class Settings(BaseSettings):
     GITHUB_CLIENT_ID: str
     GITHUB_CLIENT_SECRET: str
 
+    # --- Background ingestion ---
+    # SQLite file backing the ingestion job queue, shared by the API and workers.
+    INGEST_QUEUE_PATH: str = "data/ingest_jobs.sqlite3"
+    # Ingestion paths submitted through the API are resolved inside this directory.
+    KITS_ROOT: str = "."
+
+    # --- ATS generation ---
+    # Estimated input-token budget per component; larger sources are truncated.
+    ATS_TOKEN_BUDGET: int = 6000
+    # Shorten long string literals (e.g. Tailwind class lists) before LLM submission.
+    ATS_ELIDE_STRINGS: bool = True
+    ATS_MAX_STRING_LENGTH: int = 48
+    # Packed mode: small components share one LLM call up to this many input tokens.
+    ATS_PACK_TOKEN_BUDGET: int = 4000
+    ATS_PACK_MAX_COMPONENTS: int = 8
+    # LM tiers, cheapest first. Invalid output escalates to the next tier.
+    ATS_MODEL_TIERS: List[str] = [
+        "gemini/gemini-2.5-flash-lite",
+        "gemini/gemini-2.5-flash",
+        "gemini/gemini-2.5-pro",
+    ]
+    # Components within both limits start on the first tier; others on the second.
+    ATS_FAST_TIER_MAX_TOKENS: int = 1500
+    ATS_FAST_TIER_MAX_COMPLEXITY: int = 10
+    # Sources at least this similar (estimated Jaccard) reuse an existing component's ATS and embedding.
+    NEAR_DUPLICATE_THRESHOLD: float = 0.9
+    # Neighbors precomputed per component for "related components".
+    RELATED_COMPONENTS_K: int = 10
+    # Optional .npz projection (see scripts/evaluate_projection.py) applied to embeddings in
+    # the in-memory indexes. Stored embeddings keep their full dimension.
+    EMBEDDING_PROJECTION_PATH: str = ""
+    # Directory of the memory-mapped embedding snapshot shared by all API workers
+    # (see scripts/build_vector_snapshot.py). Empty keeps a private index per worker.
+    EMBEDDING_SNAPSHOT_DIR: str = ""
+    # Write-behind uploads (SupabaseUploader(write_behind=True)): rows per batch, longest
+    # wait before a flush, buffered rows before uploads block, and failed writes of a
+    # batch before its rows are written one by one and those still failing are dropped.
+    UPLOAD_BATCH_ROWS: int = 200
+    UPLOAD_FLUSH_SECONDS: float = 1.0
+    UPLOAD_MAX_PENDING: int = 2000
+    UPLOAD_MAX_ATTEMPTS: int = 5
+    # Search result cache (LRU + TTL, invalidated by kit revisions) and query-embedding cache sizes.
+    SEARCH_CACHE_ENTRIES: int = 1024
+    SEARCH_CACHE_TTL_SECONDS: float = 300.0
+    QUERY_EMBEDDING_CACHE_ENTRIES: int = 4096
+
+    # --- Cache consistency ---
+    # How in-process indexes learn about writes from other processes: "poll" follows
+    # `updated_at` watermarks, "realtime" adds Supabase Realtime events, "off" disables both.
+    CHANGE_FEED_MODE: str = "poll"
+    CHANGE_FEED_POLL_SECONDS: float = 5.0
+    # Each poll re-reads this many seconds before its watermark, for transactions that
+    # committed after later ones (updated_at is the transaction start time).
+    CHANGE_FEED_OVERLAP_SECONDS: float = 10.0
+
+    # --- Profiling (off unless PROFILE_DIR is set) ---
+    # Directory receiving collapsed-stack (flamegraph) files, one per route or stage.
+    PROFILE_DIR: str = ""
+    # Fraction of API requests profiled, 0..1.
+    PROFILE_REQUEST_RATE: float = 0.0
+    # Comma-separated pipeline stages to profile ("ats,embed,upload"), or "*" for all.
+    PROFILE_STAGES: str = ""
+    PROFILE_INTERVAL_MS: float = 5.0
+
 
 # Create a single, reusable instance of the settings
 settings = Settings()
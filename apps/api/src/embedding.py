@@ -1,35 +1,50 @@
 import logging
-from typing import List
-
-try:
-    from sentence_transformers import SentenceTransformer
-except ImportError:
-    raise ImportError("sentence-transformers must be installed. Run 'pip install sentence-transformers'.")
+from typing import Dict, List, Optional, Sequence
 
 logger = logging.getLogger(__name__)
 
-# Module-level cache for the model
-_model = None
+# sentence-transformers pulls in torch, which takes seconds to import. It is
+# imported on first use so that importing this module stays cheap.
+SentenceTransformer = None
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# Module-level cache for the models, by name
+_models: Dict[str, object] = {}
+
 
+def _sentence_transformer_class():
+    global SentenceTransformer
+    if SentenceTransformer is None:
+        try:
+            from sentence_transformers import SentenceTransformer as cls
+        except ImportError:
+            raise ImportError("sentence-transformers must be installed. Run 'pip install sentence-transformers'.")
+        SentenceTransformer = cls
+    return SentenceTransformer
 
-def get_model():
+
+def get_model(model_name: Optional[str] = None):
     """
-    Loads and caches the sentence-transformers/all-MiniLM-L6-v2 model.
+    Loads and caches a sentence-transformers model.
+    Args:
+        model_name: The model to load. Defaults to all-MiniLM-L6-v2.
     Returns:
         SentenceTransformer model instance.
     """
-    global _model
-    if _model is None:
-        logger.info("Loading sentence-transformers/all-MiniLM-L6-v2 model...")
-        _model = SentenceTransformer("all-MiniLM-L6-v2")
-    return _model
+    model_name = model_name or DEFAULT_MODEL
+    if model_name not in _models:
+        logger.info(f"Loading sentence-transformers/{model_name} model...")
+        _models[model_name] = _sentence_transformer_class()(model_name)
+    return _models[model_name]
 
 
-def generate_embedding(text: str) -> List[float]:
+def generate_embedding(text: str, model_name: Optional[str] = None) -> List[float]:
     """
-    Generates an embedding for the given text using all-MiniLM-L6-v2.
+    Generates an embedding for the given text with a sentence-transformers model.
     Args:
         text: The input string to embed.
+        model_name: The model to use, e.g. the active embedding version's. Defaults to all-MiniLM-L6-v2.
     Returns:
         List of floats representing the embedding vector.
     Raises:
@@ -39,9 +54,50 @@ def generate_embedding(text: str) -> List[float]:
         logger.warning("Empty or invalid text provided for embedding.")
         raise ValueError("Text for embedding must be a non-empty string.")
     try:
-        model = get_model()
+        model = get_model(model_name)
         embedding = model.encode(text, show_progress_bar=False)
         return embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
     except Exception as e:
         logger.error(f"Embedding generation failed: {e}")
-        raise ValueError(f"Embedding generation failed: {e}")
\ No newline at end of file
+        raise ValueError(f"Embedding generation failed: {e}")
+
+def generate_embeddings(
+    texts: Sequence[str],
+    model_name: Optional[str] = None,
+    batch_size: int = 256,
+    processes: int = 1,
+    pool: Optional[dict] = None,
+):
+    """
+    Embeds many texts at once, which is far faster than one call per text.
+    Args:
+        texts: Non-empty strings to embed.
+        model_name: The model to use. Defaults to all-MiniLM-L6-v2.
+        batch_size: Texts per forward pass.
+        processes: Encode with this many CPU worker processes. The pool is started
+            and stopped for this call only; pass `pool` to reuse one across calls.
+        pool: A pool from `start_embedding_pool` for the same model.
+    Returns:
+        A float32 numpy array with one row per text.
+    """
+    model = get_model(model_name)
+    if pool is not None:
+        return model.encode(list(texts), batch_size=batch_size, show_progress_bar=False, pool=pool)
+    if processes <= 1:
+        return model.encode(list(texts), batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
+    pool = start_embedding_pool(model_name, processes)
+    try:
+        return model.encode(list(texts), batch_size=batch_size, show_progress_bar=False, pool=pool)
+    finally:
+        stop_embedding_pool(model_name, pool)
+
+def start_embedding_pool(model_name: Optional[str], processes: int) -> dict:
+    """
+    Starts `processes` CPU worker processes, each loading the model, for
+    `generate_embeddings(..., pool=...)`. Stop it with `stop_embedding_pool`.
+    """
+    logger.info(f"Starting {processes} embedding processes for {model_name or DEFAULT_MODEL}...")
+    return get_model(model_name).start_multi_process_pool(target_devices=["cpu"] * processes)
+
+def stop_embedding_pool(model_name: Optional[str], pool: dict) -> None:
+    get_model(model_name).stop_multi_process_pool(pool)
@@ -1,10 +1,20 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from db.db import supabase_client
 from config.config import settings
-from routers import auth
+from routers import ats, auth, components, kits, themes
+from services.component_search import start_component_search
 
-app = FastAPI(title="Supacharged API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the search index in the background instead of in the first request.
+    start_component_search()
+    yield
+
+
+app = FastAPI(title="Supacharged API", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -18,6 +28,10 @@ app.add_middleware(
 
 # Include routers
 app.include_router(auth.router, prefix="/api/v1", tags=["Authentication"])
+app.include_router(components.router, prefix="/api/v1", tags=["Components"])
+app.include_router(kits.router, prefix="/api/v1", tags=["Ingestion"])
+app.include_router(ats.router, prefix="/api/v1", tags=["ATS"])
+app.include_router(themes.router, prefix="/api/v1", tags=["Themes"])
 
 # Health check endpoint
 @app.get("/health")
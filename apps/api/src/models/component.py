@@ -9,7 +9,9 @@ class DesignKit(BaseModel):
     name: str
     description: Optional[str] = None
     personality_tags: Optional[List[str]] = None
+    theme: Optional[Dict[str, Any]] = None  # Default CSS variables for the kit's user themes
     created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
 
 # Pydantic model for the 'components' table
 class Component(BaseModel):
@@ -20,6 +22,7 @@ class Component(BaseModel):
     metadata: Dict[str, Any]  # This will hold the rich JSONB data from our AST analysis
     embedding: Optional[List[float]] = None
     created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
 
 # Pydantic model for the 'user_themes' table
 class UserTheme(BaseModel):
@@ -27,4 +30,7 @@ class UserTheme(BaseModel):
     user_id: UUID
     name: str
     config: Dict[str, Any] # This will hold the theme's CSS variables etc.
+    kit_id: Optional[UUID] = None  # Kit whose default theme the config is merged over
+    css: Optional[str] = None  # Minified CSS compiled from the config on save
+    css_hash: Optional[str] = None  # Content hash of `css`, used in its URL and ETag
     created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
\ No newline at end of file
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from schemas.ats import ATSStreamRequest
+from services.sse import SSE_HEADERS, SSE_MEDIA_TYPE, format_sse
+from services.profiling import ProfiledRoute
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# Upper bound on submitted source size; larger files belong in a background ingestion job.
+MAX_CODE_LENGTH = 200_000
+
+_ats_creator = None
+
+
+def get_ats_creator():
+    """Returns the shared ATSCreator, created on first use."""
+    global _ats_creator
+    if _ats_creator is None:
+        # Imported here so that starting the API does not configure the LLM client.
+        from agents.ats_creator import ATSCreator
+
+        _ats_creator = ATSCreator()
+    return _ats_creator
+
+
+@router.post("/ats/stream")
+async def stream_ats(body: ATSStreamRequest, ats_creator=Depends(get_ats_creator)):
+    """
+    Generates a component's ATS and streams it as Server-Sent Events: statically
+    computed fields first, then LLM fields as they are generated, then the
+    validated ATS as the final event.
+    """
+    if not body.code.strip():
+        raise HTTPException(status_code=400, detail="Component code must not be empty.")
+    if len(body.code) > MAX_CODE_LENGTH:
+        raise HTTPException(status_code=413, detail="Component code is too large for interactive generation.")
+
+    async def event_stream():
+        try:
+            async for event in ats_creator.stream_ats(body.code):
+                yield format_sse(event["data"], event=event["event"])
+        except Exception as e:
+            logger.error(f"Streaming ATS generation failed: {e}")
+            yield format_sse({"detail": "ATS generation failed."}, event="error")
+
+    return StreamingResponse(event_stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
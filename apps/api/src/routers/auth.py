@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Response, HTTPException
 from starlette.responses import RedirectResponse
 from config.config import settings 
+from services.profiling import ProfiledRoute
 import httpx
 import logging
 
 # It's good practice to get the logger for the current module
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/auth/github/login")
 async def login():
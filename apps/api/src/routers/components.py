@@ -0,0 +1,106 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, List, Optional
+from schemas.component import (
+    CacheStats,
+    ComponentListResponse,
+    ComponentSearchResult,
+    DuplicateCluster,
+    RelatedComponent,
+)
+from services.component_search import ComponentSearch, get_component_search
+from services.knn_graph import NeighborStore, get_neighbor_store
+from services.profiling import ProfiledRoute
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def facet_filters(
+    kit_id: Optional[str] = Query(None, description="Only components in this design kit."),
+    tag: List[str] = Query([], description="Required tags; repeat for several."),
+    dependency: List[str] = Query([], description="Required external packages, e.g. @radix-ui/react-slot."),
+    internal_dependency: List[str] = Query([], description="Required alias imports, e.g. @/lib/utils."),
+) -> Dict[str, List[str]]:
+    """Collects the facet query parameters shared by listing and search."""
+    filters = {
+        "tag": tag,
+        "dependency": dependency,
+        "internalDependency": internal_dependency,
+    }
+    if kit_id:
+        filters["kit"] = [kit_id]
+    return {facet: values for facet, values in filters.items() if values}
+
+
+@router.get("/components", response_model=ComponentListResponse)
+def list_components(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    filters: Dict[str, List[str]] = Depends(facet_filters),
+    search: ComponentSearch = Depends(get_component_search),
+):
+    """
+    Lists components matching all given facet filters, with facet counts for the matching set.
+    """
+    try:
+        return search.list_components(filters, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Declared as a plain `def` so FastAPI runs it in the threadpool: embedding the
+# query and scoring the indexes are CPU-bound.
+@router.get("/components/search", response_model=List[ComponentSearchResult])
+def search_components(
+    q: str = Query(..., min_length=1, description="Free-text query, e.g. a prop or package name."),
+    limit: int = Query(10, ge=1, le=100),
+    filters: Dict[str, List[str]] = Depends(facet_filters),
+    search: ComponentSearch = Depends(get_component_search),
+):
+    """
+    Hybrid lexical + semantic search over components, fused with reciprocal rank fusion.
+    Facet filters restrict the candidates before ranking.
+    """
+    try:
+        return search.search(q, limit=limit, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/components/search/metrics", response_model=Dict[str, CacheStats])
+def search_cache_metrics(search: ComponentSearch = Depends(get_component_search)):
+    """
+    Hit rates of this worker's search result cache and query-embedding cache.
+    """
+    return search.cache_stats()
+
+
+@router.get("/components/duplicates", response_model=List[DuplicateCluster])
+def list_duplicate_clusters(
+    kit_id: Optional[str] = Query(None, description="Only clusters with a member in this design kit."),
+    limit: int = Query(50, ge=1, le=500),
+    search: ComponentSearch = Depends(get_component_search),
+):
+    """
+    Lists clusters of near-identical components (e.g. the same shadcn component
+    vendored into several kits), found with MinHash/LSH over their source code.
+    """
+    return search.duplicate_clusters(kit_id=kit_id, limit=limit)
+
+
+@router.get("/components/{component_id}/related", response_model=List[RelatedComponent])
+def related_components(
+    component_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    store: NeighborStore = Depends(get_neighbor_store),
+):
+    """
+    Returns the components most similar to this one, from the precomputed
+    neighbor list (a single primary-key lookup).
+    """
+    neighbors = store.get(component_id)
+    if neighbors is None:
+        raise HTTPException(status_code=404, detail="No related components for this component.")
+    return neighbors[:limit]
@@ -0,0 +1,174 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from functools import lru_cache
+from typing import Optional
+from config.config import settings
+from schemas.job import IngestJobCreate, IngestJobPublic
+from services.blob_store import BlobStore
+from services.component_search import iter_component_rows
+from services.embedding_export import (
+    ARROW,
+    EXPORT_COLUMNS,
+    EXPORT_FORMATS,
+    FILE_EXTENSIONS,
+    MEDIA_TYPES,
+    require_pyarrow,
+    stream_export,
+)
+from services.kit_bundle import (
+    BUNDLE_COLUMNS,
+    BUNDLE_FORMATS,
+    MEDIA_TYPES as BUNDLE_MEDIA_TYPES,
+    ZIP,
+    bundle_entries,
+    stream_bundle,
+)
+from services.job_queue import FINISHED_STATUSES, JobQueue
+from services.sse import SSE_HEADERS, SSE_MEDIA_TYPE, format_sse
+from services.profiling import ProfiledRoute
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# How often the event stream checks the queue for new progress.
+EVENT_POLL_SECONDS = 0.5
+EVENT_BATCH_SIZE = 500
+
+
+@lru_cache(maxsize=1)
+def get_job_queue() -> JobQueue:
+    """Returns the ingestion job queue configured in settings."""
+    return JobQueue(settings.INGEST_QUEUE_PATH)
+
+
+def get_supabase_client():
+    """Returns the shared Supabase client. Used as a FastAPI dependency."""
+    from db.db import supabase_client
+
+    return supabase_client
+
+
+def resolve_kit_path(path: str) -> str:
+    """
+    Resolves a submitted path inside KITS_ROOT.
+
+    Raises:
+        HTTPException: If the path escapes KITS_ROOT or does not exist.
+    """
+    root = os.path.realpath(settings.KITS_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise HTTPException(status_code=400, detail="Path must be inside the configured kits root.")
+    if not os.path.exists(resolved):
+        raise HTTPException(status_code=404, detail=f"Path not found: {path}")
+    return resolved
+
+
+@router.post("/kits/{kit_id}/ingest", response_model=IngestJobPublic, status_code=202)
+async def start_ingestion(kit_id: str, body: IngestJobCreate, queue: JobQueue = Depends(get_job_queue)):
+    """
+    Enqueues a background ingestion job for a kit and returns immediately.
+    The job is executed by `scripts/ingest_worker.py` processes, not the API.
+    """
+    path = resolve_kit_path(body.path)
+    return await run_in_threadpool(queue.enqueue, kit_id, path)
+
+
+@router.get("/jobs/{job_id}", response_model=IngestJobPublic)
+async def get_job(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """Returns a job's status and per-file progress counts."""
+    job = await run_in_threadpool(queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    request: Request,
+    last_event_id: Optional[int] = Header(None),
+    queue: JobQueue = Depends(get_job_queue),
+):
+    """
+    Streams a job's progress as Server-Sent Events until it finishes.
+    Reconnecting clients send `Last-Event-ID` and continue where they left off.
+    """
+    if await run_in_threadpool(queue.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    async def event_stream():
+        cursor = last_event_id or 0
+        while not await request.is_disconnected():
+            # Read the status before the events: once a job is finished its final
+            # event has been written, so draining after this read is complete.
+            job = await run_in_threadpool(queue.get, job_id)
+            events = await run_in_threadpool(queue.events, job_id, cursor, EVENT_BATCH_SIZE)
+            for event in events:
+                cursor = event["id"]
+                yield format_sse(event["data"], event=event["type"], id=event["id"])
+            if len(events) == EVENT_BATCH_SIZE:
+                continue
+            if job["status"] in FINISHED_STATUSES:
+                return
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+
+    return StreamingResponse(event_stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+@router.get("/kits/{kit_id}/embeddings")
+def export_kit_embeddings(
+    kit_id: str,
+    format: str = Query(ARROW, description=f"One of: {', '.join(EXPORT_FORMATS)}."),
+    chunk_rows: int = Query(1000, ge=1, le=10000, description="Rows per record batch or .npy part."),
+    client=Depends(get_supabase_client),
+):
+    """
+    Streams a kit's component ids, names, tags, metadata and embeddings for
+    offline analysis, as an Arrow IPC stream or a zip of .npy parts with JSON
+    Lines sidecars. Rows are paged from the database and encoded one chunk at a
+    time, so the kit is never held in memory.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}.")
+    if format == ARROW:
+        try:
+            require_pyarrow()
+        except ImportError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+    rows = iter_component_rows(client, page_size=chunk_rows, columns=EXPORT_COLUMNS, kit_id=kit_id)
+    filename = f"{kit_id}-embeddings.{FILE_EXTENSIONS[format]}"
+    return StreamingResponse(
+        stream_export(rows, format, chunk_rows),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/kits/{kit_id}/bundle")
+def download_kit_bundle(
+    kit_id: str,
+    format: str = Query(ZIP, description=f"One of: {', '.join(BUNDLE_FORMATS)}."),
+    client=Depends(get_supabase_client),
+):
+    """
+    Streams a kit's component sources and an ATS manifest as one archive.
+    Rows are paged from the database and compressed in a worker thread while
+    the response is being sent, so memory use does not depend on the kit size.
+    """
+    if format not in BUNDLE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(BUNDLE_FORMATS)}.")
+    exists = client.table("components").select("id").eq("kit_id", kit_id).limit(1).execute()
+    if not exists.data:
+        raise HTTPException(status_code=404, detail="Design kit has no components.")
+    rows = iter_component_rows(client, columns=BUNDLE_COLUMNS, kit_id=kit_id)
+    return StreamingResponse(
+        stream_bundle(bundle_entries(rows, BlobStore(client)), format, root=kit_id),
+        media_type=BUNDLE_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{kit_id}.{format}"'},
+    )
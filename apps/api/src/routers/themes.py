@@ -0,0 +1,106 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from typing import Optional
+from schemas.theme import ThemeCompile, ThemePublic, ThemeSave
+from services.theme_css import CompiledTheme, ThemeStore, get_theme_store
+from services.profiling import ProfiledRoute
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=ProfiledRoute)
+
+CSS_MEDIA_TYPE = "text/css; charset=utf-8"
+# Hash-addressed CSS never changes, so browsers and CDNs may keep it for a year without revalidating.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# A theme id can point at new CSS after a save, so it is revalidated (cheaply, via the ETag) on every use.
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header already names this ETag."""
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison: W/"x" matches "x".
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def css_response(compiled: CompiledTheme, cache_control: str, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": compiled.etag, "Cache-Control": cache_control}
+    if etag_matches(if_none_match, compiled.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=compiled.css, media_type=CSS_MEDIA_TYPE, headers=headers)
+
+
+@router.put("/themes/{theme_id}", response_model=ThemePublic)
+def save_theme(
+    theme_id: str,
+    body: ThemeSave,
+    request: Request,
+    store: ThemeStore = Depends(get_theme_store),
+):
+    """
+    Creates or updates a user theme. Its CSS is compiled here, once, and stored
+    with the theme; the returned `css_url` serves it with immutable caching.
+    """
+    try:
+        row = store.save(theme_id, body.user_id, body.name, body.config, body.kit_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return ThemePublic(
+        id=str(row["id"]),
+        name=row["name"],
+        kit_id=row.get("kit_id"),
+        css_hash=row["css_hash"],
+        css_url=request.url_for("theme_css_by_hash", css_hash=row["css_hash"]).path,
+    )
+
+
+@router.post("/themes/compile")
+def compile_theme(
+    body: ThemeCompile,
+    if_none_match: Optional[str] = Header(None),
+    store: ThemeStore = Depends(get_theme_store),
+):
+    """Compiles a theme config (over a kit's defaults) to minified CSS without saving it, e.g. for previews."""
+    try:
+        compiled = store.compile(body.config, body.kit_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return css_response(compiled, REVALIDATE_CACHE_CONTROL, if_none_match)
+
+
+@router.get("/themes/css/{css_hash}.css", name="theme_css_by_hash")
+def theme_css_by_hash(
+    css_hash: str,
+    if_none_match: Optional[str] = Header(None),
+    store: ThemeStore = Depends(get_theme_store),
+):
+    """Serves compiled theme CSS by content hash, cacheable forever."""
+    compiled = store.css(css_hash)
+    if compiled is None:
+        raise HTTPException(status_code=404, detail="Theme CSS not found.")
+    return css_response(compiled, IMMUTABLE_CACHE_CONTROL, if_none_match)
+
+
+@router.get("/themes/{theme_id}.css")
+def theme_css(
+    theme_id: str,
+    if_none_match: Optional[str] = Header(None),
+    store: ThemeStore = Depends(get_theme_store),
+):
+    """
+    Serves a theme's current CSS. Prefer the hash URL returned on save; this one
+    always needs a (conditional) request to notice later saves.
+    """
+    css_hash = store.theme_hash(theme_id)
+    if css_hash is None:
+        raise HTTPException(status_code=404, detail="Theme not found.")
+    compiled = store.css(css_hash)
+    if compiled is None:
+        raise HTTPException(status_code=404, detail="Theme CSS not found.")
+    return css_response(compiled, REVALIDATE_CACHE_CONTROL, if_none_match)
@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import List, Dict
+import orjson
+from functools import lru_cache
+from pydantic import BaseModel, TypeAdapter
+from typing import Any, List, Dict, NamedTuple, Sequence, Union
 
 # --- Pydantic Models for ATS Data Structure ---
 # These models define the shape of the data returned by the ATSCreator agent.
@@ -20,3 +22,53 @@ class ATSModel(BaseModel):
     propsInterface: Dict[str, PropDetail]
     tags: List[str]
     rawCode: str
+
+
+class ATSStreamRequest(BaseModel):
+    """A single component submitted for interactive, streamed ATS generation."""
+    code: str
+
+
+# --- Serialization Fast Path ---
+# An ATS is dumped to a dict exactly once and encoded to JSON bytes exactly once.
+# Both forms travel together so later stages never re-dump the model.
+
+class ATSPayload(NamedTuple):
+    """An ATS dumped once: the plain dict and its JSON encoding."""
+    data: Dict[str, Any]
+    body: bytes
+
+
+def dump_ats(ats: ATSModel) -> ATSPayload:
+    """
+    Dumps an ATS to a dict and encodes it to JSON bytes with orjson.
+
+    Raises:
+        ValueError: If the dumped ATS is not JSON serializable.
+    """
+    data = ats.model_dump()
+    try:
+        body = orjson.dumps(data)
+    except TypeError as e:
+        raise ValueError(f"ATS output is not JSON serializable: {e}")
+    return ATSPayload(data, body)
+
+
+@lru_cache(maxsize=None)
+def ats_list_adapter() -> TypeAdapter:
+    """Returns the cached TypeAdapter used to validate lists of ATS objects."""
+    return TypeAdapter(List[ATSModel])
+
+
+def validate_ats_batch(items: Sequence[Union[bytes, Dict[str, Any]]]) -> List[ATSModel]:
+    """
+    Validates many ATS objects in a single adapter call.
+
+    Encoded payloads are joined into one JSON array and validated directly from
+    bytes, which skips building intermediate Python dicts.
+    """
+    if all(isinstance(item, (bytes, bytearray)) for item in items):
+        return ats_list_adapter().validate_json(b"[" + b",".join(items) + b"]")
+    return ats_list_adapter().validate_python(
+        [orjson.loads(item) if isinstance(item, (bytes, bytearray)) else item for item in items]
+    )
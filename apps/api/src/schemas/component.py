@@ -37,4 +37,42 @@ class ComponentPublic(BaseModel):
     metadata: Dict[str, Any] # For now, we expose all metadata
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- Search Schemas ---
+
+# The minimal identifying fields of an indexed component
+class ComponentSummary(BaseModel):
+    id: str
+    kit_id: Optional[str] = None
+    name: str
+
+# A single hit from the hybrid component search
+class ComponentSearchResult(ComponentSummary):
+    score: float  # Reciprocal rank fusion score
+    lexical_rank: Optional[int] = None  # 1-based rank in the BM25 results, if matched
+    vector_rank: Optional[int] = None  # 1-based rank in the vector results, if matched
+
+# A page of components matching facet filters, with counts for further narrowing
+class ComponentListResponse(BaseModel):
+    total: int
+    items: List[ComponentSummary]
+    facets: Dict[str, Dict[str, int]]  # facet -> value -> number of matching components
+
+# Components whose sources are near-identical (estimated Jaccard similarity of code shingles)
+class DuplicateCluster(BaseModel):
+    similarity: float  # Lowest estimated similarity between linked members
+    components: List[ComponentSummary]
+
+# A precomputed nearest neighbor of a component by embedding similarity
+class RelatedComponent(ComponentSummary):
+    score: float  # Cosine similarity of the two embeddings
+
+# Counters of one in-process query cache
+class CacheStats(BaseModel):
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float  # hits / (hits + misses), 0 before the first lookup
+    evictions: int  # Entries dropped by the LRU size bound
+    expirations: int  # Entries found past their TTL
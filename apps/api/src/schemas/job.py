@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Optional
+
+# --- Ingestion Job Schemas ---
+
+# Data required to start ingesting a design kit
+class IngestJobCreate(BaseModel):
+    path: str  # Directory or file of components, relative to the configured KITS_ROOT
+
+# Data returned to the user when fetching an ingestion job
+class IngestJobPublic(BaseModel):
+    id: str
+    kit_id: str
+    path: str
+    status: str  # queued | running | succeeded | failed
+    attempts: int
+    error: Optional[str] = None
+    total_files: int
+    done_files: int
+    failed_files: int
+    created_at: float
+    updated_at: float
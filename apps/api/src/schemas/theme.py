@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+# --- Theme Schemas ---
+
+# Data required to save a user's theme
+class ThemeSave(BaseModel):
+    user_id: str
+    name: str
+    config: Dict[str, Any]  # CSS variables, flat or split into light/dark (see services.theme_css)
+    kit_id: Optional[str] = None  # Merge the config over this design kit's default theme
+
+# Data required to compile a theme without saving it
+class ThemeCompile(BaseModel):
+    config: Dict[str, Any]
+    kit_id: Optional[str] = None
+
+# Data returned after saving a theme
+class ThemePublic(BaseModel):
+    id: str
+    name: str
+    kit_id: Optional[str] = None
+    css_hash: str  # Content hash of the compiled CSS
+    css_url: str  # Immutable URL of the compiled CSS
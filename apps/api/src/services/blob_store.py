@@ -0,0 +1,162 @@
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    raise ImportError("zstandard must be installed. Run 'pip install zstandard'.")
+
+logger = logging.getLogger(__name__)
+
+"""
+Content-addressed storage for component source code.
+
+Instead of nesting the full `rawCode` in every `components.metadata` row, the
+source is compressed with zstd and stored once in the `component_blobs` table,
+keyed by the SHA-256 of the uncompressed text. Identical files across kits
+therefore share a single blob. The expected table layout is:
+
+    create table component_blobs (
+        hash text primary key,       -- hex SHA-256 of the UTF-8 source
+        codec text not null,         -- compression codec, currently 'zstd'
+        size integer not null,       -- uncompressed size in bytes
+        data text not null           -- base64 of the compressed bytes
+    );
+"""
+
+# Key under which the blob hash is stored in a component's metadata.
+RAW_CODE_HASH_KEY = "rawCodeHash"
+
+BLOB_TABLE = "component_blobs"
+CODEC = "zstd"
+
+
+def content_hash(text: str) -> str:
+    """Returns the hex SHA-256 digest of the UTF-8 encoded text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BlobStore:
+    """Stores and lazily fetches zstd-compressed source blobs by content hash."""
+
+    def __init__(self, client, max_cached: int = 512, compression_level: int = 10):
+        """
+        Args:
+            client: A Supabase client used to read and write the blob table.
+            max_cached: Maximum number of decompressed blobs kept in the LRU cache.
+            compression_level: zstd compression level used for new blobs.
+        """
+        self.client = client
+        self.max_cached = max_cached
+        self._compressor = zstandard.ZstdCompressor(level=compression_level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        # Hashes we know already exist remotely, so repeated puts skip the round trip.
+        self._stored: set = set()
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        """
+        Stores the text if it is not already present and returns its hash.
+
+        Raises:
+            Exception: If the write to Supabase fails.
+        """
+        return self.put_many([text])[0]
+
+    def put_many(self, texts: Iterable[str]) -> List[str]:
+        """
+        Stores several texts with a single write and returns their hashes, in order.
+        Texts already known to be stored are skipped.
+
+        Raises:
+            Exception: If the write to Supabase fails.
+        """
+        texts = list(texts)
+        digests = [content_hash(text) for text in texts]
+        new: Dict[str, str] = {}
+        with self._lock:
+            for digest, text in zip(digests, texts):
+                if digest in self._stored:
+                    self._remember(digest, text)
+                else:
+                    new[digest] = text
+        if not new:
+            return digests
+
+        rows = []
+        for digest, text in new.items():
+            raw = text.encode("utf-8")
+            compressed = self._compressor.compress(raw)
+            rows.append({
+                "hash": digest,
+                "codec": CODEC,
+                "size": len(raw),
+                "data": base64.b64encode(compressed).decode("ascii"),
+            })
+            logger.debug(f"Storing blob {digest[:12]} ({len(raw)} -> {len(compressed)} bytes).")
+        # ignore_duplicates makes the write idempotent: an existing blob is left untouched.
+        self.client.table(BLOB_TABLE).upsert(
+            rows[0] if len(rows) == 1 else rows, on_conflict="hash", ignore_duplicates=True
+        ).execute()
+
+        with self._lock:
+            for digest, text in new.items():
+                self._stored.add(digest)
+                self._remember(digest, text)
+        return digests
+
+    def get(self, digest: str) -> Optional[str]:
+        """Returns the source for a hash, fetching and caching it on a miss."""
+        return self.get_many([digest]).get(digest)
+
+    def get_many(self, digests: Iterable[str]) -> Dict[str, str]:
+        """
+        Returns the sources for several hashes, fetching all misses in one query.
+        Hashes that do not exist remotely are omitted from the result.
+        """
+        found: Dict[str, str] = {}
+        missing = []
+        with self._lock:
+            for digest in dict.fromkeys(digests):
+                if digest in self._cache:
+                    self._cache.move_to_end(digest)
+                    found[digest] = self._cache[digest]
+                else:
+                    missing.append(digest)
+        if not missing:
+            return found
+
+        response = (
+            self.client.table(BLOB_TABLE)
+            .select("hash,codec,data")
+            .in_("hash", missing)
+            .execute()
+        )
+        for row in response.data or []:
+            text = self._decode(row)
+            with self._lock:
+                self._stored.add(row["hash"])
+                self._remember(row["hash"], text)
+            found[row["hash"]] = text
+        return found
+
+    def _decode(self, row: dict) -> str:
+        if row.get("codec", CODEC) != CODEC:
+            raise ValueError(f"Unsupported blob codec: {row.get('codec')}")
+        raw = self._decompressor.decompress(base64.b64decode(row["data"]))
+        text = raw.decode("utf-8")
+        if content_hash(text) != row["hash"]:
+            raise ValueError(f"Blob {row['hash']} failed integrity check.")
+        return text
+
+    def _remember(self, digest: str, text: str) -> None:
+        # Caller must hold the lock.
+        self._cache[digest] = text
+        self._cache.move_to_end(digest)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
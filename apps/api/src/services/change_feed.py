@@ -0,0 +1,428 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+"""
+A change feed that keeps in-process indexes and caches consistent with writes
+made by other replicas, ingestion workers and scripts.
+
+Subscribers register per table and receive row-level deltas: upserted rows and
+the ids of deleted rows. Two sources feed them:
+
+- Polling: each table is read in (updated_at, id) order from a watermark, so a
+  poll returns only rows written since the last one. `updated_at` is set by
+  `now()`, the start time of the writing transaction, so a long transaction can
+  commit rows stamped before the watermark after it has moved on. Each poll
+  therefore re-reads `overlap_seconds` before the watermark and skips rows it
+  has already applied at the same `updated_at`; a transaction open for longer
+  than the overlap can still be missed. Deletions leave no row to poll, so a
+  trigger records each one in the `row_deletions` table, which is read from its
+  own watermark the same way every `reconcile_every` polls. Without that table,
+  the feed falls back to comparing all of a table's ids with the ids seen so far.
+- Supabase Realtime (optional): INSERT/UPDATE/DELETE events are applied as they
+  arrive. Realtime does not guarantee delivery, so polling keeps running as a
+  safety net; applying the same row twice is harmless.
+
+Polling needs an indexed `updated_at` column maintained by the database:
+
+    alter table components add column updated_at timestamptz not null default now();
+    create index components_updated_at_id on components (updated_at, id);
+    create or replace function touch_updated_at() returns trigger as $$
+    begin new.updated_at = now(); return new; end $$ language plpgsql;
+    create trigger components_touch before update on components
+        for each row execute function touch_updated_at();
+
+and the same for `design_kits` and `embedding_versions`. Deletions are recorded by:
+
+    create table row_deletions (
+        id bigint generated always as identity primary key,
+        table_name text not null,
+        row_id text not null,
+        deleted_at timestamptz not null default now()
+    );
+    create index row_deletions_deleted_at_id on row_deletions (deleted_at, id);
+    create or replace function record_deletion() returns trigger as $$
+    begin insert into row_deletions (table_name, row_id) values (TG_TABLE_NAME, old.id::text); return old; end $$
+    language plpgsql;
+    create trigger components_record_deletion after delete on components
+        for each row execute function record_deletion();
+
+again for each followed table. Old entries can be pruned once every consumer has
+polled past them, e.g. `delete from row_deletions where deleted_at < now() - interval '1 day'`.
+"""
+
+CHANGE_TABLES = ("components", "design_kits", "embedding_versions")
+WATERMARK_COLUMN = "updated_at"
+DELETIONS_TABLE = "row_deletions"
+DELETED_AT_COLUMN = "deleted_at"
+
+Watermark = Tuple[str, str]
+UpsertHandler = Callable[[Dict[str, Any]], None]
+DeleteHandler = Callable[[str], None]
+
+
+class ChangeFeed:
+    """Applies row-level changes from Supabase to registered subscribers."""
+
+    def __init__(
+        self,
+        client,
+        tables: Iterable[str] = CHANGE_TABLES,
+        page_size: int = 500,
+        poll_seconds: float = 5.0,
+        reconcile_every: int = 12,
+        overlap_seconds: float = 10.0,
+    ):
+        """
+        Args:
+            client: A Supabase client (or the test stand-in).
+            tables: Tables to follow.
+            page_size: Rows fetched per poll request.
+            poll_seconds: Interval between polls in `run`.
+            reconcile_every: Polls between reads of the deletions; 0 disables them.
+            overlap_seconds: How far before its watermark each poll starts reading,
+                to catch rows from transactions that committed late.
+        """
+        self.client = client
+        self.tables = list(tables)
+        self.page_size = page_size
+        self.poll_seconds = poll_seconds
+        self.reconcile_every = reconcile_every
+        self.overlap_seconds = overlap_seconds
+        self.watermarks: Dict[str, Optional[Watermark]] = {table: None for table in self.tables}
+        # updated_at of the rows applied within the overlap window, by id, to skip them when re-read.
+        self._recent: Dict[str, Dict[str, str]] = {table: {} for table in [*self.tables, DELETIONS_TABLE]}
+        self._subscribers: Dict[str, List[Tuple[UpsertHandler, Optional[DeleteHandler]]]] = {
+            table: [] for table in self.tables
+        }
+        # Whether deletions are read from DELETIONS_TABLE; otherwise found by scanning ids.
+        self._tombstones = False
+        self._known_ids: Dict[str, Set[str]] = {table: set() for table in self.tables}
+        self._polls = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(
+        self,
+        table: str,
+        on_upsert: UpsertHandler,
+        on_delete: Optional[DeleteHandler] = None,
+        since: Optional[Dict[str, Optional[Watermark]]] = None,
+    ) -> None:
+        """
+        Registers handlers for a table's upserted rows and deleted ids.
+
+        Args:
+            table: A followed table.
+            on_upsert: Called with every inserted or updated row.
+            on_delete: Called with the id of every deleted row.
+            since: Watermarks from `mark()` taken before the subscriber loaded its
+                initial state. Rows written and deleted since then are replayed to
+                it, so nothing changed during its load is missed.
+
+        Raises:
+            ValueError: If the table is not followed.
+        """
+        if table not in self._subscribers:
+            raise ValueError(f"Table {table!r} is not followed by this feed.")
+        self._subscribers[table].append((on_upsert, on_delete))
+        if since is not None:
+            for rows in self._pages(table, since.get(table), self.overlap_seconds):
+                for row in rows:
+                    on_upsert(row)
+            if on_delete is not None and self._tombstones:
+                watermark = since.get(DELETIONS_TABLE)
+                for rows in self._pages(DELETIONS_TABLE, watermark, self.overlap_seconds, DELETED_AT_COLUMN):
+                    for row in rows:
+                        if row["table_name"] == table:
+                            on_delete(str(row["row_id"]))
+
+    def unsubscribe(self, table: str, on_upsert: UpsertHandler) -> None:
+        """Removes the handlers registered with `on_upsert`."""
+        self._subscribers[table] = [entry for entry in self._subscribers[table] if entry[0] != on_upsert]
+
+    def mark(self) -> Dict[str, Optional[Watermark]]:
+        """Returns the current watermarks, for `subscribe(since=...)`."""
+        with self._lock:
+            return dict(self.watermarks)
+
+    def prime(self) -> None:
+        """
+        Starts following from the current state without replaying it, for
+        subscribers that were just loaded in full. Call it before that load:
+        rows written during the load are then replayed by the first poll.
+        """
+        if self.reconcile_every:
+            try:
+                deletions = self._latest(DELETIONS_TABLE, DELETED_AT_COLUMN)
+                with self._lock:
+                    self.watermarks[DELETIONS_TABLE] = deletions
+                self._tombstones = True
+            except Exception as e:
+                logger.warning(f"Cannot read {DELETIONS_TABLE}; detecting deletions by scanning ids: {e}")
+                self._tombstones = False
+        for table in list(self.tables):
+            try:
+                latest = self._latest(table, WATERMARK_COLUMN)
+                known = self._all_ids(table) if self.reconcile_every and not self._tombstones else set()
+            except Exception as e:
+                # E.g. the table or its updated_at column does not exist in this deployment.
+                logger.warning(f"Not following {table}: {e}")
+                self.tables.remove(table)
+                continue
+            with self._lock:
+                self.watermarks[table] = latest
+                self._known_ids[table] = known
+
+    def poll(self) -> int:
+        """Fetches and applies every row written since the last poll. Returns the number applied."""
+        applied = 0
+        for table in self.tables:
+            recent = self._recent[table]
+            for rows in self._pages(table, self.watermarks[table], self.overlap_seconds):
+                for row in rows:
+                    key, stamp = str(row["id"]), row[WATERMARK_COLUMN]
+                    if recent.get(key) == stamp:
+                        continue
+                    recent[key] = stamp
+                    self.apply(table, "UPDATE", row)
+                    applied += 1
+                with self._lock:
+                    self.watermarks[table] = (rows[-1][WATERMARK_COLUMN], str(rows[-1]["id"]))
+            self._forget_before_overlap(table)
+
+        self._polls += 1
+        if self.reconcile_every and self._polls % self.reconcile_every == 0:
+            applied += self.reconcile()
+        if applied:
+            logger.info(f"Applied {applied} change(s) from the change feed.")
+        return applied
+
+    def reconcile(self) -> int:
+        """Applies rows deleted since the last call. Returns the number of deletions applied."""
+        if self._tombstones:
+            return self._apply_deletions()
+        deleted = 0
+        for table in self.tables:
+            current = self._all_ids(table)
+            with self._lock:
+                gone = self._known_ids[table] - current
+            for key in sorted(gone):
+                self.apply(table, "DELETE", None, {"id": key})
+            deleted += len(gone)
+        return deleted
+
+    def apply(
+        self,
+        table: str,
+        event: str,
+        record: Optional[Dict[str, Any]],
+        old_record: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Dispatches one change to the table's subscribers.
+
+        Args:
+            table: The changed table.
+            event: "INSERT", "UPDATE" or "DELETE", as in Realtime payloads.
+            record: The new row, for inserts and updates.
+            old_record: The old row (at least its id), for deletes.
+        """
+        if event == "DELETE":
+            key = str((old_record or {}).get("id"))
+            with self._lock:
+                self._known_ids[table].discard(key)
+        else:
+            key = str(record["id"])
+            with self._lock:
+                if self.reconcile_every and not self._tombstones:
+                    self._known_ids[table].add(key)
+        for on_upsert, on_delete in self._subscribers.get(table, []):
+            try:
+                if event != "DELETE":
+                    on_upsert(record)
+                elif on_delete is not None:
+                    on_delete(key)
+            except Exception as e:
+                # One failing cache must not stop the others from receiving the change.
+                logger.error(f"Change-feed subscriber failed on {event} of {table}/{key}: {e}")
+
+    def run(self) -> None:
+        """Polls until `stop` is called."""
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Change-feed poll failed: {e}")
+            self._stop_event.wait(self.poll_seconds)
+
+    def start(self) -> None:
+        """Starts polling in a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="change-feed", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def start_realtime(self, url: str, key: str) -> None:
+        """
+        Subscribes to Supabase Realtime in a daemon thread with its own event loop.
+        If the subscription fails, changes keep arriving through polling.
+        """
+        threading.Thread(
+            target=lambda: asyncio.run(self._listen_realtime(url, key)), name="change-feed-realtime", daemon=True
+        ).start()
+
+    async def _listen_realtime(self, url: str, key: str) -> None:
+        try:
+            from supabase import acreate_client
+
+            client = await acreate_client(url, key)
+            channel = client.channel("change-feed")
+            for table in self.tables:
+                channel.on_postgres_changes("*", schema="public", table=table, callback=self._on_realtime)
+            await channel.subscribe()
+            logger.info(f"Subscribed to realtime changes of {', '.join(self.tables)}.")
+            while not self._stop_event.is_set():
+                await asyncio.sleep(1.0)
+            await client.remove_all_channels()
+        except Exception as e:
+            logger.error(f"Realtime subscription failed, relying on polling: {e}")
+
+    def _on_realtime(self, payload: Dict[str, Any]) -> None:
+        data = payload["data"]
+        self.apply(data["table"], data["type"], data.get("record"), data.get("old_record"))
+
+    def _apply_deletions(self) -> int:
+        """Applies the deletions recorded since the deletions watermark."""
+        deleted = 0
+        recent = self._recent[DELETIONS_TABLE]
+        watermark = self.watermarks.get(DELETIONS_TABLE)
+        for rows in self._pages(DELETIONS_TABLE, watermark, self.overlap_seconds, DELETED_AT_COLUMN):
+            for row in rows:
+                key, stamp = str(row["id"]), row[DELETED_AT_COLUMN]
+                if recent.get(key) == stamp:
+                    continue
+                recent[key] = stamp
+                if row["table_name"] in self.tables:
+                    self.apply(row["table_name"], "DELETE", None, {"id": row["row_id"]})
+                    deleted += 1
+            with self._lock:
+                self.watermarks[DELETIONS_TABLE] = (rows[-1][DELETED_AT_COLUMN], str(rows[-1]["id"]))
+        self._forget_before_overlap(DELETIONS_TABLE)
+        return deleted
+
+    def _latest(self, table: str, column: str) -> Optional[Watermark]:
+        """Returns the watermark of a table's most recent row, or None if it is empty."""
+        response = (
+            self.client.table(table)
+            .select(f"id,{column}")
+            .order(column, desc=True)
+            .order("id", desc=True)
+            .limit(1)
+            .execute()
+        )
+        latest = response.data[0] if response.data else None
+        return (latest[column], str(latest["id"])) if latest else None
+
+    def _forget_before_overlap(self, table: str) -> None:
+        watermark = self.watermarks[table]
+        if watermark is None:
+            return
+        start = _parse_stamp(watermark[0]) - timedelta(seconds=self.overlap_seconds)
+        recent = self._recent[table]
+        for key in [key for key, stamp in recent.items() if _parse_stamp(stamp) < start]:
+            del recent[key]
+
+    def _pages(
+        self,
+        table: str,
+        watermark: Optional[Watermark],
+        overlap_seconds: float = 0.0,
+        column: str = WATERMARK_COLUMN,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yields the rows written after a (`column`, id) watermark, page by page
+        in that order. With `overlap_seconds`, reading starts that long before
+        the watermark instead.
+        """
+        after, start = watermark, None
+        if watermark is not None and overlap_seconds > 0:
+            after = None
+            start = (_parse_stamp(watermark[0]) - timedelta(seconds=overlap_seconds)).isoformat(timespec="microseconds")
+        while True:
+            query = (
+                self.client.table(table).select("*").order(column).order("id").limit(self.page_size)
+            )
+            if after is not None:
+                stamp, last_id = after
+                query = query.or_(
+                    f"and({column}.eq.{stamp},id.gt.{last_id}),{column}.gt.{stamp}"
+                )
+            elif start is not None:
+                query = query.gte(column, start)
+            rows = query.execute().data or []
+            if rows:
+                yield rows
+            if len(rows) < self.page_size:
+                return
+            after = (rows[-1][column], str(rows[-1]["id"]))
+
+    def _all_ids(self, table: str) -> Set[str]:
+        ids: Set[str] = set()
+        last_id = None
+        while True:
+            query = self.client.table(table).select("id").order("id").limit(self.page_size)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = query.execute().data or []
+            ids.update(str(row["id"]) for row in rows)
+            if len(rows) < self.page_size:
+                return ids
+            last_id = rows[-1]["id"]
+
+
+def _parse_stamp(stamp: str) -> datetime:
+    return datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+
+
+_change_feed: Optional[ChangeFeed] = None
+_change_feed_lock = threading.Lock()
+
+
+def get_change_feed() -> Optional[ChangeFeed]:
+    """
+    Returns the process-wide change feed, primed and running, or None if
+    CHANGE_FEED_MODE is "off". Subscribers take `mark()` before loading their
+    state and pass it to `subscribe`.
+    """
+    global _change_feed
+    from config.config import settings
+
+    if settings.CHANGE_FEED_MODE == "off":
+        return None
+    if _change_feed is None:
+        with _change_feed_lock:
+            if _change_feed is None:
+                from db.db import supabase_client
+
+                feed = ChangeFeed(
+                    supabase_client,
+                    poll_seconds=settings.CHANGE_FEED_POLL_SECONDS,
+                    overlap_seconds=settings.CHANGE_FEED_OVERLAP_SECONDS,
+                )
+                feed.prime()
+                feed.start()
+                if settings.CHANGE_FEED_MODE == "realtime":
+                    feed.start_realtime(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+                _change_feed = feed
+    return _change_feed
@@ -0,0 +1,501 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from fastapi import HTTPException
+
+from config.config import settings
+from services.change_feed import get_change_feed
+from services.embedding_versions import ACTIVE, EmbeddingVersionStore
+from schemas.component import ComponentListResponse, ComponentSearchResult, ComponentSummary, DuplicateCluster
+from services.facet_index import FacetIndex, component_facets
+from services.lexical_index import LexicalIndex
+from services.near_duplicates import NearDuplicateIndex
+from services.projection import EmbeddingProjection, load_projection
+from services.query_cache import KitRevisions, QueryCache, filters_key, normalize_query
+from services.shared_vectors import SharedVectorIndex
+from services.vector_index import VectorIndex, coerce_vector
+
+logger = logging.getLogger(__name__)
+
+"""
+Hybrid component search.
+
+Lexical (BM25) and semantic (embedding) results are computed independently and
+combined with reciprocal rank fusion, which only needs each side's ranking and so
+does not have to reconcile BM25 scores with cosine similarities. Facet filters
+(kit, tag, dependency, internal dependency) are resolved against bitmap indexes
+first and restrict both sides of the search.
+
+Search and listing results are cached per (query, filters, kit revisions), and
+query embeddings separately, see services.query_cache. Search results also key
+on the vectors they were ranked with: the embedding version, the projection and
+the shared snapshot generation, so none of them can change under a cached result.
+"""
+
+# Columns needed to index a component row.
+INDEX_COLUMNS = "id,kit_id,name,metadata,embedding"
+# The same without embeddings, for workers whose vectors come from a shared snapshot.
+METADATA_COLUMNS = "id,kit_id,name,metadata"
+
+# Standard RRF damping constant; larger values flatten the contribution of top ranks.
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = RRF_K
+) -> List[Tuple[str, float]]:
+    """
+    Fuses several ranked key lists into one.
+
+    Each key scores sum(1 / (k + rank)) over the lists it appears in, ranks starting at 1.
+
+    Returns:
+        (key, fused score) pairs, best first.
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def document_fields(name: str, metadata: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Extracts the searchable fields from a component's ATS metadata."""
+    return {
+        "name": [metadata.get("componentName") or name or ""],
+        "description": [metadata.get("description") or ""],
+        "tags": list(metadata.get("tags") or []),
+        "props": list((metadata.get("propsInterface") or {}).keys()),
+        "dependencies": list(metadata.get("dependencies") or [])
+        + list(metadata.get("internalDependencies") or []),
+    }
+
+
+def _default_embed(text: str, model_name: Optional[str] = None) -> List[float]:
+    # Imported lazily: the embedding model pulls in torch, which we only want
+    # to pay for once a semantic query is actually made.
+    from embedding import generate_embedding
+
+    return generate_embedding(text, model_name=model_name)
+
+
+class ComponentSearch:
+    """Keeps lexical, vector, facet and near-duplicate indexes over components in sync and queries them."""
+
+    def __init__(
+        self,
+        embed: Optional[Callable[[str], List[float]]] = None,
+        duplicate_threshold: Optional[float] = None,
+        projection: Optional[EmbeddingProjection] = None,
+        vectors: Optional[Union[VectorIndex, SharedVectorIndex]] = None,
+        cache_entries: Optional[int] = None,
+        cache_ttl_seconds: Optional[float] = None,
+        embedding_version: Optional[str] = None,
+    ):
+        """
+        Args:
+            embed: Function turning query text into an embedding. Defaults to the
+                all-MiniLM model from `embedding.generate_embedding`.
+            duplicate_threshold: Similarity for near-duplicate clusters. Defaults to settings.
+            projection: Optional dimensionality reduction applied to stored and query
+                embeddings before they reach the vector index.
+            vectors: The vector index to use, e.g. a `SharedVectorIndex` mapped by
+                every API worker. Defaults to a private in-memory index.
+            cache_entries: Size of the result cache; 0 disables it. Defaults to settings.
+            cache_ttl_seconds: Lifetime of cached results. Defaults to settings.
+            embedding_version: The embedding version of the indexed vectors, for cache keys.
+        """
+        self.embed = embed or _default_embed
+        self.embedding_version = embedding_version
+        self.projection = projection
+        self.lexical = LexicalIndex()
+        self.vectors = vectors if vectors is not None else VectorIndex()
+        self.facets = FacetIndex()
+        self.duplicates = NearDuplicateIndex(duplicate_threshold or settings.NEAR_DUPLICATE_THRESHOLD)
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self.revisions = KitRevisions()
+        self.results = QueryCache(
+            settings.SEARCH_CACHE_ENTRIES if cache_entries is None else cache_entries,
+            settings.SEARCH_CACHE_TTL_SECONDS if cache_ttl_seconds is None else cache_ttl_seconds,
+        )
+        # Embeddings depend only on the text and the model, which is fixed per instance.
+        self.query_embeddings = QueryCache(settings.QUERY_EMBEDDING_CACHE_ENTRIES, ttl_seconds=None)
+
+    def __len__(self) -> int:
+        return len(self._components)
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """
+        Indexes or re-indexes a single `components` row.
+        Suitable as a `SupabaseUploader` listener.
+        """
+        vector = coerce_vector(row.get("embedding"))
+        if vector is not None and self.projection is not None:
+            vector = self._project([vector])[0]
+        self._index_row(row, vector)
+
+    def _index_row(self, row: Dict[str, Any], vector: Optional[np.ndarray]) -> None:
+        key = str(row["id"])
+        metadata = row.get("metadata") or {}
+        with self._lock:
+            previous = self._components.get(key)
+            self._components[key] = {
+                "id": key,
+                "kit_id": str(row["kit_id"]) if row.get("kit_id") is not None else None,
+                "name": row.get("name") or metadata.get("componentName", ""),
+            }
+            self.lexical.upsert(key, document_fields(row.get("name", ""), metadata))
+            self.facets.upsert(key, component_facets(row.get("kit_id"), metadata))
+            self.duplicates.upsert_row(row)
+            self.revisions.bump([self._components[key]["kit_id"], previous["kit_id"] if previous else None])
+            # Rows selected without the embedding column leave the vector index as it is.
+            if "embedding" not in row:
+                return
+            if vector is not None:
+                self.vectors.upsert(key, vector)
+            else:
+                self.vectors.remove(key)
+
+    def remove(self, component_id: str) -> None:
+        """Drops a component from every index."""
+        key = str(component_id)
+        with self._lock:
+            previous = self._components.pop(key, None)
+            if previous is not None:
+                self.revisions.bump([previous["kit_id"]])
+            self.lexical.remove(key)
+            self.facets.remove(key)
+            self.duplicates.remove(key)
+            self.vectors.remove(key)
+
+    def load(self, rows: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+        """
+        Indexes many rows. Embeddings are projected a batch at a time.
+        Returns the number of rows indexed.
+        """
+        count = 0
+        batch: List[Dict[str, Any]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                count += self._load_batch(batch)
+                batch = []
+        count += self._load_batch(batch)
+        version = f" (projection {self.projection.version})" if self.projection is not None else ""
+        logger.info(f"Indexed {count} components for search{version}.")
+        return count
+
+    def _load_batch(self, rows: List[Dict[str, Any]]) -> int:
+        vectors: List[Optional[np.ndarray]] = [coerce_vector(row.get("embedding")) for row in rows]
+        if self.projection is not None:
+            present = [i for i, vector in enumerate(vectors) if vector is not None]
+            if present:
+                projected = self._project([vectors[i] for i in present])
+                for i, vector in zip(present, projected):
+                    vectors[i] = vector
+        for row, vector in zip(rows, vectors):
+            self._index_row(row, vector)
+        return len(rows)
+
+    def _project(self, vectors: List[np.ndarray]) -> List[Optional[np.ndarray]]:
+        try:
+            return list(self.projection.apply(np.stack(vectors)))
+        except ValueError as e:
+            # Keep the components searchable lexically rather than failing the load.
+            logger.warning(f"Not indexing embeddings of {len(vectors)} component(s): {e}")
+            return [None] * len(vectors)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        filters: Optional[Mapping[str, Sequence[str]]] = None,
+    ) -> List[ComponentSearchResult]:
+        """
+        Runs the query against both indexes and fuses the rankings.
+
+        The vector side is skipped (and lexical results returned alone) when no
+        component has an embedding or the query cannot be embedded.
+
+        Args:
+            query: Free-text query.
+            limit: Maximum number of results.
+            filters: Optional facet filters; only matching components are ranked.
+
+        Raises:
+            ValueError: If a filter names an unknown facet.
+        """
+        query = normalize_query(query)
+        # The revision is read before searching, so a result never outlives a write it missed.
+        cache_key = (
+            "search", query, filters_key(filters), limit, self.revisions.token((filters or {}).get("kit")),
+            self._vectors_token(),
+        )
+        cached = self.results.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        results = self._search(query, limit, filters)
+        self.results.put(cache_key, results)
+        return list(results)
+
+    def _search(
+        self, query: str, limit: int, filters: Optional[Mapping[str, Sequence[str]]]
+    ) -> List[ComponentSearchResult]:
+        candidates = max(limit * 4, 50)
+        with self._lock:
+            allowed = set(self.facets.keys(self.facets.match(filters))) if filters else None
+            if allowed is not None and not allowed:
+                return []
+            lexical = [key for key, _ in self.lexical.search(query, candidates, allowed)]
+        semantic: List[str] = []
+        if len(self.vectors):
+            try:
+                vector = self.embed_query(query)
+                if self.projection is not None:
+                    vector = self.projection.apply(vector)
+                semantic = [key for key, _ in self.vectors.search(vector, candidates, allowed)]
+            except ValueError as e:
+                logger.warning(f"Skipping vector search for query {query!r}: {e}")
+
+        lexical_rank = {key: rank for rank, key in enumerate(lexical, start=1)}
+        vector_rank = {key: rank for rank, key in enumerate(semantic, start=1)}
+        results = []
+        with self._lock:
+            for key, score in reciprocal_rank_fusion([lexical, semantic]):
+                component = self._components.get(key)
+                if component is None:
+                    continue
+                results.append(
+                    ComponentSearchResult(
+                        **component,
+                        score=score,
+                        lexical_rank=lexical_rank.get(key),
+                        vector_rank=vector_rank.get(key),
+                    )
+                )
+                if len(results) == limit:
+                    break
+        return results
+
+    def _vectors_token(self) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Identifies the vectors queries are ranked against; a shared index attaches to a newer snapshot first."""
+        refresh = getattr(self.vectors, "refresh", None)
+        if refresh is not None:
+            refresh()
+        return (
+            self.embedding_version,
+            self.projection.version if self.projection is not None else None,
+            getattr(self.vectors, "generation", None),
+        )
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embeds query text, reusing the embedding of an identical earlier query."""
+        vector = self.query_embeddings.get(query)
+        if vector is None:
+            vector = self.embed(query)
+            self.query_embeddings.put(query, vector)
+        return vector
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """Hit rates and sizes of the result and query-embedding caches."""
+        return {"results": self.results.stats(), "query_embeddings": self.query_embeddings.stats()}
+
+    def list_components(
+        self,
+        filters: Optional[Mapping[str, Sequence[str]]] = None,
+        limit: int = 50,
+        offset: int = 0,
+        facet_limit: int = 20,
+    ) -> ComponentListResponse:
+        """
+        Lists components matching the facet filters, ordered by name, together
+        with per-facet value counts over the full matching set.
+
+        Raises:
+            ValueError: If a filter names an unknown facet.
+        """
+        cache_key = (
+            "list", filters_key(filters), limit, offset, facet_limit, self.revisions.token((filters or {}).get("kit"))
+        )
+        cached = self.results.get(cache_key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            bitmap = self.facets.match(filters)
+            matched = [self._components[key] for key in self.facets.keys(bitmap)]
+            facet_counts = self.facets.counts(bitmap, limit=facet_limit)
+        matched.sort(key=lambda component: (component["name"].lower(), component["id"]))
+        response = ComponentListResponse(
+            total=len(matched),
+            items=[ComponentSummary(**component) for component in matched[offset : offset + limit]],
+            facets=facet_counts,
+        )
+        self.results.put(cache_key, response)
+        return response
+
+    def duplicate_clusters(self, kit_id: Optional[str] = None, limit: int = 50) -> List[DuplicateCluster]:
+        """
+        Lists clusters of near-identical components, largest first.
+
+        Args:
+            kit_id: Only clusters with at least one member in this kit.
+            limit: Maximum number of clusters.
+        """
+        clusters = []
+        with self._lock:
+            for keys, similarity in self.duplicates.clusters():
+                members = [self._components[key] for key in keys if key in self._components]
+                if len(members) < 2 or (kit_id and not any(m["kit_id"] == kit_id for m in members)):
+                    continue
+                clusters.append(
+                    DuplicateCluster(similarity=similarity, components=[ComponentSummary(**m) for m in members])
+                )
+                if len(clusters) == limit:
+                    break
+        return clusters
+
+
+def iter_component_rows(
+    client,
+    page_size: int = 500,
+    columns: str = INDEX_COLUMNS,
+    kit_id: Optional[str] = None,
+    after: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams every `components` row, or one kit's, using keyset pagination on `id`.
+    With `after`, streaming resumes after that id.
+    """
+    last_id = after
+    while True:
+        query = client.table("components").select(columns).order("id").limit(page_size)
+        if kit_id is not None:
+            query = query.eq("kit_id", kit_id)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+_component_search: Optional[ComponentSearch] = None
+_component_search_version: Optional[str] = None
+_component_search_lock = threading.Lock()
+_component_search_thread: Optional[threading.Thread] = None
+
+
+def _build_component_search(client, feed) -> ComponentSearch:
+    """Builds a search index for the active embedding version and subscribes it to the feed."""
+    global _component_search_version
+    since = feed.mark() if feed is not None else None
+    try:
+        version = EmbeddingVersionStore(client).active()
+    except Exception as e:
+        logger.warning(f"Could not read the active embedding version; assuming the default model: {e}")
+        version = {"version": None, "model": None}
+    projection = load_projection(version["version"])
+
+    def embed(text: str) -> List[float]:
+        return _default_embed(text, version["model"])
+
+    if settings.EMBEDDING_SNAPSHOT_DIR:
+        vectors = SharedVectorIndex(
+            settings.EMBEDDING_SNAPSHOT_DIR,
+            projection=projection.version if projection is not None else None,
+        )
+        search = ComponentSearch(
+            embed=embed, projection=projection, vectors=vectors, embedding_version=version["version"]
+        )
+        search.load(iter_component_rows(client, columns=METADATA_COLUMNS))
+    else:
+        search = ComponentSearch(embed=embed, projection=projection, embedding_version=version["version"])
+        search.load(iter_component_rows(client))
+    if feed is not None:
+        feed.subscribe("components", search.upsert, search.remove, since=since)
+    _component_search_version = version["version"]
+    return search
+
+
+def _on_embedding_version(row: Dict[str, Any]) -> None:
+    """Rebuilds the index in the background when another embedding version is activated."""
+    if row.get("status") != ACTIVE or row.get("version") == _component_search_version:
+        return
+
+    def rebuild() -> None:
+        global _component_search
+        from db.db import supabase_client
+
+        feed = get_change_feed()
+        with _component_search_lock:
+            previous = _component_search
+            # Requests keep using the previous index until the new one is complete.
+            _component_search = _build_component_search(supabase_client, feed)
+            if previous is not None and feed is not None:
+                feed.unsubscribe("components", previous.upsert)
+        logger.info(f"Switched component search to embedding version {row.get('version')}.")
+
+    threading.Thread(target=rebuild, name="search-rebuild", daemon=True).start()
+
+
+def start_component_search() -> None:
+    """
+    Builds the process-wide search index in a background thread, unless it is
+    built or being built. Called at application startup, so that no request
+    has to wait for the initial load.
+    """
+    global _component_search_thread
+    with _component_search_lock:
+        if _component_search is not None:
+            return
+        if _component_search_thread is not None and _component_search_thread.is_alive():
+            return
+        _component_search_thread = threading.Thread(target=_prime_component_search, name="search-prime", daemon=True)
+        _component_search_thread.start()
+
+
+def _prime_component_search() -> None:
+    global _component_search
+    try:
+        from db.db import supabase_client
+
+        feed = get_change_feed()
+        search = _build_component_search(supabase_client, feed)
+        if feed is not None and "embedding_versions" in feed.tables:
+            feed.subscribe("embedding_versions", _on_embedding_version)
+    except Exception as e:
+        # The next request starts another attempt.
+        logger.error(f"Could not build the component search index: {e}")
+        return
+    with _component_search_lock:
+        _component_search = search
+    logger.info(f"Component search index ready with {len(search)} components.")
+
+
+def get_component_search() -> ComponentSearch:
+    """
+    Returns the process-wide search index. Used as a FastAPI dependency.
+
+    The index is built from Supabase in the background (see
+    `start_component_search`); until it is ready, requests get a 503 with a
+    Retry-After header rather than building it themselves.
+
+    With EMBEDDING_SNAPSHOT_DIR set, embeddings are not fetched: the vector side
+    maps the snapshot shared by all workers (see scripts/build_vector_snapshot.py).
+    Afterwards the index follows writes made elsewhere through the change feed,
+    and is rebuilt and swapped in when a new embedding version is activated.
+
+    Raises:
+        HTTPException: 503 while the index is loading.
+    """
+    search = _component_search
+    if search is None:
+        start_component_search()
+        raise HTTPException(
+            status_code=503, detail="The component search index is loading.", headers={"Retry-After": "5"}
+        )
+    return search
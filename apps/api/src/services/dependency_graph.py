@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from agents.source_analysis import parse_imports
+
+logger = logging.getLogger(__name__)
+
+"""
+File-level dependency graph for a design kit.
+
+Alias imports such as "@/lib/utils" (the strings recorded in
+`ATSModel.internalDependencies`) and relative imports are resolved to files on
+disk using the kit's tsconfig `paths`. The graph answers which files must be
+re-processed when a file changes: the file itself plus everything that imports
+it, directly or transitively, ordered so dependencies come before dependents.
+"""
+
+SOURCE_EXTENSIONS = (".tsx", ".ts", ".jsx", ".js")
+COMPONENT_EXTENSIONS = (".tsx", ".jsx")
+IGNORED_DIRECTORIES = {"node_modules", "dist", "build", ".next", ".turbo", ".git"}
+
+_JSONC_NOISE_RE = re.compile(
+    r'(?P<string>"(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/|,(?=\s*[}\]])',
+    re.DOTALL,
+)
+
+
+def load_aliases(root: str) -> Dict[str, List[str]]:
+    """
+    Reads import aliases from the kit's tsconfig.json `compilerOptions.paths`.
+
+    Returns:
+        Mapping of alias prefix (e.g. "@/") to absolute target directories.
+        Falls back to shadcn's default of "@/" -> kit root.
+    """
+    aliases: Dict[str, List[str]] = {}
+    config_path = os.path.join(root, "tsconfig.json")
+    try:
+        with open(config_path, "r") as f:
+            # tsconfig allows comments and trailing commas; strip them outside strings.
+            text = _JSONC_NOISE_RE.sub(lambda m: m.group("string") or "", f.read())
+        options = json.loads(text).get("compilerOptions", {})
+        base = os.path.join(root, options.get("baseUrl", "."))
+        for pattern, targets in options.get("paths", {}).items():
+            prefix = pattern[:-1] if pattern.endswith("*") else pattern
+            aliases[prefix] = [
+                os.path.normpath(os.path.join(base, target[:-1] if target.endswith("*") else target))
+                for target in targets
+            ]
+    except FileNotFoundError:
+        pass
+    except (ValueError, AttributeError) as e:
+        logger.warning(f"Could not read import aliases from {config_path}: {e}")
+    return aliases or {"@/": [os.path.abspath(root)]}
+
+
+class DependencyGraph:
+    """Import graph over the source files of one kit."""
+
+    def __init__(self, root: str, aliases: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            root: The kit's root directory.
+            aliases: Alias prefix to target directories. Read from tsconfig.json if omitted.
+        """
+        self.root = os.path.abspath(root)
+        self.aliases = aliases if aliases is not None else load_aliases(self.root)
+        self.files: Set[str] = set()
+        self.dependencies: Dict[str, Set[str]] = {}
+        self.dependents: Dict[str, Set[str]] = {}
+        # Internal-looking imports that did not resolve to a file, per importer.
+        self.unresolved: Dict[str, List[str]] = {}
+
+    @classmethod
+    def build(cls, root: str, aliases: Optional[Dict[str, List[str]]] = None) -> "DependencyGraph":
+        """Scans every source file under the root and resolves its imports."""
+        graph = cls(root, aliases)
+        for directory, subdirectories, files in os.walk(graph.root):
+            subdirectories[:] = [d for d in subdirectories if d not in IGNORED_DIRECTORIES]
+            for file in files:
+                if file.endswith(SOURCE_EXTENSIONS):
+                    graph.files.add(os.path.join(directory, file))
+        for path in sorted(graph.files):
+            graph._index_file(path)
+        logger.info(
+            f"Built dependency graph for {graph.root}: {len(graph.files)} files, "
+            f"{sum(len(d) for d in graph.dependencies.values())} edges."
+        )
+        return graph
+
+    def resolve(self, spec: str, importer: str) -> Optional[str]:
+        """Resolves an alias or relative import to a file in the graph, or None for packages."""
+        if spec.startswith("."):
+            bases = [os.path.normpath(os.path.join(os.path.dirname(importer), spec))]
+        else:
+            bases = []
+            # Longest alias prefix wins, matching TypeScript's resolution.
+            for prefix in sorted(self.aliases, key=len, reverse=True):
+                if spec.startswith(prefix):
+                    rest = spec[len(prefix):]
+                    bases = [os.path.normpath(os.path.join(target, rest)) for target in self.aliases[prefix]]
+                    break
+        for base in bases:
+            candidates = [base] + [base + ext for ext in SOURCE_EXTENSIONS]
+            candidates += [os.path.join(base, "index" + ext) for ext in SOURCE_EXTENSIONS]
+            for candidate in candidates:
+                if candidate in self.files:
+                    return candidate
+        return None
+
+    def update_file(self, path: str) -> None:
+        """Re-reads one file's imports after it was added, edited or deleted."""
+        path = os.path.abspath(path)
+        existed = path in self.files
+        exists = os.path.isfile(path)
+        self._unindex_file(path)
+        if exists:
+            self.files.add(path)
+            self._index_file(path)
+        else:
+            self.files.discard(path)
+        if exists != existed:
+            # Adding or deleting a file changes how other files' imports resolve.
+            stale = set(self.unresolved) | self.dependents.get(path, set())
+            for importer in stale - {path}:
+                self._unindex_file(importer)
+                self._index_file(importer)
+
+    def apply_changes(self, changed: Iterable[str]) -> List[str]:
+        """
+        Updates the graph for a set of changed files and returns every file that
+        needs re-processing, in topological order.
+
+        Dependents are collected before the update so that importers of a deleted
+        file are still reported.
+        """
+        changed = [os.path.abspath(path) for path in changed]
+        affected = set(self.affected_by(changed))
+        for path in changed:
+            self.update_file(path)
+        return self.affected_by(affected | set(changed))
+
+    def find_cycles(self) -> List[List[str]]:
+        """Returns every import cycle as a list of files (strongly connected components)."""
+        return [
+            sorted(component)
+            for component in self._strongly_connected_components()
+            if len(component) > 1 or component[0] in self.dependencies.get(component[0], ())
+        ]
+
+    def affected_by(self, changed: Iterable[str]) -> List[str]:
+        """
+        Returns the changed files plus all their transitive dependents, in
+        topological order (every file after the files it imports). Files in an
+        import cycle are grouped together in an arbitrary order.
+        """
+        pending = [os.path.abspath(path) for path in changed]
+        affected: Set[str] = set()
+        while pending:
+            path = pending.pop()
+            if path in affected:
+                continue
+            affected.add(path)
+            pending.extend(self.dependents.get(path, ()))
+        # Deleted files are no longer in the graph but still count as changed;
+        # nothing can depend on them any more, so they go first.
+        order = sorted(affected - self.files)
+        for component in self._strongly_connected_components():
+            order.extend(sorted(path for path in component if path in affected))
+        return order
+
+    def _unindex_file(self, path: str) -> None:
+        for dependency in self.dependencies.pop(path, set()):
+            self.dependents.get(dependency, set()).discard(path)
+        self.unresolved.pop(path, None)
+
+    def _index_file(self, path: str) -> None:
+        try:
+            with open(path, "r") as f:
+                specs = parse_imports(f.read())
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"Could not read {path}: {e}")
+            return
+        dependencies = set()
+        for spec in specs:
+            target = self.resolve(spec, path)
+            if target is not None:
+                dependencies.add(target)
+                self.dependents.setdefault(target, set()).add(path)
+            elif spec.startswith(".") or any(spec.startswith(prefix) for prefix in self.aliases):
+                self.unresolved.setdefault(path, []).append(spec)
+        self.dependencies[path] = dependencies
+
+    def _strongly_connected_components(self) -> List[List[str]]:
+        """
+        Iterative Tarjan's algorithm. Components are returned in reverse topological
+        order of the import edges, i.e. dependencies before the files that import them.
+        """
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        components: List[List[str]] = []
+        counter = 0
+
+        for start in sorted(self.files):
+            if start in index:
+                continue
+            work = [(start, iter(sorted(self.dependencies.get(start, ()))))]
+            index[start] = lowlink[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack.add(start)
+            while work:
+                node, neighbours = work[-1]
+                advanced = False
+                for neighbour in neighbours:
+                    if neighbour not in index:
+                        index[neighbour] = lowlink[neighbour] = counter
+                        counter += 1
+                        stack.append(neighbour)
+                        on_stack.add(neighbour)
+                        work.append((neighbour, iter(sorted(self.dependencies.get(neighbour, ())))))
+                        advanced = True
+                        break
+                    if neighbour in on_stack:
+                        lowlink[node] = min(lowlink[node], index[neighbour])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+        return components
@@ -0,0 +1,273 @@
+import io
+import logging
+import zipfile
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import orjson
+
+from services.vector_index import coerce_vector
+
+logger = logging.getLogger(__name__)
+
+"""
+Binary bulk export and import of component embeddings with their metadata.
+
+Two formats are produced from a stream of `components` rows, one chunk of rows
+at a time, so memory stays bounded by the chunk size whatever the kit size:
+
+- "arrow": an Arrow IPC stream with columns id, kit_id, name, tags, metadata
+  (JSON text) and embedding (fixed-size list of float32; a plain list of
+  all-null embeddings when no component has one, as the size is unknown).
+  pyarrow is optional and only needed for this format.
+- "npy": a zip archive of `part-NNNNN.npy` float32 matrices, each with a
+  `part-NNNNN.jsonl` sidecar whose line i describes row i of the matrix.
+  Components without an embedding are a row of NaNs.
+
+`read_export` reads either format back into rows for `SupabaseUploader.upsert_rows`.
+"""
+
+ARROW = "arrow"
+NPY = "npy"
+EXPORT_FORMATS = (ARROW, NPY)
+MEDIA_TYPES = {ARROW: "application/vnd.apache.arrow.stream", NPY: "application/zip"}
+FILE_EXTENSIONS = {ARROW: "arrows", NPY: "zip"}
+
+# Columns read from `components` for an export.
+EXPORT_COLUMNS = "id,kit_id,name,metadata,embedding"
+DEFAULT_CHUNK_ROWS = 1000
+
+
+def require_pyarrow():
+    """
+    Returns the pyarrow module.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ImportError("pyarrow must be installed for Arrow export. Run 'pip install pyarrow'.")
+    return pyarrow
+
+
+class _ChunkSink(io.RawIOBase):
+    """A write-only, unseekable file that hands out what was written since the last drain."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _embedding_matrix(rows: List[Dict[str, Any]], dim: int) -> np.ndarray:
+    """Stacks a chunk's embeddings into a float32 matrix, NaN rows where missing."""
+    matrix = np.full((len(rows), dim), np.nan, dtype=np.float32)
+    for i, row in enumerate(rows):
+        vector = coerce_vector(row.get("embedding"))
+        if vector is not None:
+            if vector.shape != (dim,):
+                raise ValueError(f"Component {row['id']} has a {vector.shape[0]}-dim embedding, expected {dim}.")
+            matrix[i] = vector
+    return matrix
+
+
+def _peek_dim(chunks: Iterator[List[Dict[str, Any]]]) -> tuple:
+    """Returns (embedding dimension, buffered chunks) by reading until an embedding is found."""
+    buffered = []
+    for chunk in chunks:
+        buffered.append(chunk)
+        for row in chunk:
+            vector = coerce_vector(row.get("embedding"))
+            if vector is not None:
+                return len(vector), buffered
+    return 0, buffered
+
+
+def _resume(buffered: List[List[Dict[str, Any]]], chunks: Iterator[List[Dict[str, Any]]]):
+    yield from buffered
+    yield from chunks
+
+
+def stream_arrow(rows: Iterable[Dict[str, Any]], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """Encodes rows as an Arrow IPC stream, one record batch per chunk."""
+    pa = require_pyarrow()
+    chunks = _chunks(rows, chunk_rows)
+    dim, buffered = _peek_dim(chunks)
+    schema = pa.schema([
+        ("id", pa.string()),
+        ("kit_id", pa.string()),
+        ("name", pa.string()),
+        ("tags", pa.list_(pa.string())),
+        ("metadata", pa.string()),
+        # Arrow has no zero-size lists: without any embedding the size is unknown.
+        ("embedding", pa.list_(pa.float32(), dim) if dim else pa.list_(pa.float32())),
+    ])
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.drain()
+        for chunk in _resume(buffered, chunks):
+            if dim:
+                matrix = _embedding_matrix(chunk, dim)
+                embeddings = pa.FixedSizeListArray.from_arrays(
+                    pa.array(np.nan_to_num(matrix).reshape(-1)), dim, mask=pa.array(np.isnan(matrix).all(axis=1))
+                )
+            else:
+                embeddings = pa.nulls(len(chunk), schema.field("embedding").type)
+            batch = pa.record_batch([
+                pa.array([str(row["id"]) for row in chunk]),
+                pa.array([str(row["kit_id"]) if row.get("kit_id") is not None else None for row in chunk]),
+                pa.array([row.get("name") for row in chunk]),
+                pa.array([list((row.get("metadata") or {}).get("tags") or []) for row in chunk], pa.list_(pa.string())),
+                pa.array([orjson.dumps(row.get("metadata") or {}).decode() for row in chunk]),
+                embeddings,
+            ], schema=schema)
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_npy_zip(rows: Iterable[Dict[str, Any]], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """Encodes rows as a zip of .npy matrices with JSON Lines sidecars, one pair per chunk."""
+    chunks = _chunks(rows, chunk_rows)
+    dim, buffered = _peek_dim(chunks)
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for part, chunk in enumerate(_resume(buffered, chunks)):
+            # Float vectors barely compress; only the sidecar is deflated.
+            with archive.open(f"part-{part:05d}.npy", "w", force_zip64=True) as member:
+                np.lib.format.write_array(member, _embedding_matrix(chunk, dim), allow_pickle=False)
+            sidecar = b"".join(
+                orjson.dumps({
+                    "id": str(row["id"]),
+                    "kit_id": str(row["kit_id"]) if row.get("kit_id") is not None else None,
+                    "name": row.get("name"),
+                    "tags": list((row.get("metadata") or {}).get("tags") or []),
+                    "metadata": row.get("metadata") or {},
+                }) + b"\n"
+                for row in chunk
+            )
+            archive.writestr(f"part-{part:05d}.jsonl", sidecar, compress_type=zipfile.ZIP_DEFLATED)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_export(rows: Iterable[Dict[str, Any]], format: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Encodes rows in the given export format as a stream of byte chunks.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if format == ARROW:
+        return stream_arrow(rows, chunk_rows)
+    if format == NPY:
+        return stream_npy_zip(rows, chunk_rows)
+    raise ValueError(f"Unknown export format {format!r}; expected one of {', '.join(EXPORT_FORMATS)}.")
+
+
+def read_export(file: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """
+    Reads an export in either format back into `components` rows (id, kit_id,
+    name, metadata, embedding), one chunk at a time. The format is detected
+    from the file's first bytes.
+    """
+    magic = file.read(4)
+    file.seek(0)
+    if magic == b"PK\x03\x04":
+        yield from _read_npy_zip(file)
+    else:
+        yield from _read_arrow(file)
+
+
+def _read_arrow(file: BinaryIO) -> Iterator[Dict[str, Any]]:
+    pa = require_pyarrow()
+    reader = pa.ipc.open_stream(file)
+    for batch in reader:
+        columns = batch.to_pydict()
+        for i in range(batch.num_rows):
+            yield {
+                "id": columns["id"][i],
+                "kit_id": columns["kit_id"][i],
+                "name": columns["name"][i],
+                "metadata": orjson.loads(columns["metadata"][i]),
+                "embedding": columns["embedding"][i],
+            }
+
+
+def _read_npy_zip(file: BinaryIO) -> Iterator[Dict[str, Any]]:
+    with zipfile.ZipFile(file) as archive:
+        parts = sorted(name[: -len(".npy")] for name in archive.namelist() if name.endswith(".npy"))
+        for part in parts:
+            with archive.open(f"{part}.npy") as member:
+                matrix = np.lib.format.read_array(io.BytesIO(member.read()), allow_pickle=False)
+            sidecar = archive.read(f"{part}.jsonl").splitlines()
+            if len(sidecar) != len(matrix):
+                raise ValueError(f"{part}: {len(sidecar)} sidecar lines for {len(matrix)} embeddings.")
+            for line, vector in zip(sidecar, matrix):
+                entry = orjson.loads(line)
+                yield {
+                    "id": entry["id"],
+                    "kit_id": entry["kit_id"],
+                    "name": entry["name"],
+                    "metadata": entry["metadata"],
+                    "embedding": None if np.isnan(vector).all() else vector.tolist(),
+                }
+
+
+def import_rows(rows: Iterable[Dict[str, Any]], uploader, kit_id: Optional[str] = None, batch_size: int = 500) -> int:
+    """
+    Bulk-loads exported rows through the uploader, a batch per request.
+
+    Rows are matched on (kit_id, name) rather than their exported id, so an
+    export can be loaded into another database or copied into another kit.
+    `metadata.rawCodeHash` is kept as-is: the referenced blobs must exist in the
+    target database's blob store for the sources to resolve.
+
+    Args:
+        rows: Rows from `read_export`.
+        uploader: A SupabaseUploader (or compatible).
+        kit_id: Override the kit of every row, e.g. to copy a kit.
+        batch_size: Rows per upsert request.
+
+    Returns:
+        The number of rows written.
+    """
+    written = 0
+    for chunk in _chunks(rows, batch_size):
+        chunk = [
+            {
+                "name": row["name"],
+                "kit_id": kit_id if kit_id is not None else row["kit_id"],
+                "metadata": row["metadata"],
+                "embedding": row["embedding"],
+            }
+            for row in chunk
+        ]
+        written += uploader.upsert_rows(chunk)
+    logger.info(f"Imported {written} components.")
+    return written
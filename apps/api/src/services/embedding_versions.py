@@ -0,0 +1,200 @@
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+"""
+Versioned component embeddings, so the embedding model can be upgraded without
+re-running ATS generation.
+
+`components.embedding` always holds the vectors of the active version. A new
+version is computed into its own staging column by `scripts/migrate_embeddings.py`
+while queries keep using the active one; ingestion writes both during that time.
+Once every row has a staging vector, one database call swaps the columns inside
+a transaction, so every reader sees either the old or the new version, never a
+mix. The previous vectors are kept under their version's column for rollback.
+
+    create table embedding_versions (
+        id bigint generated always as identity primary key,
+        version text not null unique,
+        model text not null,
+        status text not null default 'migrating',  -- migrating | active | retired
+        cursor text,                                -- last component id re-embedded
+        rows_done bigint not null default 0,
+        updated_at timestamptz not null default now(),
+        activated_at timestamptz
+    );
+    insert into embedding_versions (version, model, status) values ('minilm-l6-v2', 'all-MiniLM-L6-v2', 'active');
+
+    -- Before a migration: alter table components add column embedding_<version> vector(<dim>);
+
+    create or replace function activate_embedding_version(target text) returns void as $$
+    declare
+        staging text := 'embedding_' || regexp_replace(lower(target), '[^a-z0-9]+', '_', 'g');
+        previous text;
+        missing bigint;
+    begin
+        lock table components in share row exclusive mode;  -- no writes until the swap commits
+        execute format('select count(*) from components where %I is null', staging) into missing;
+        if missing > 0 then
+            raise exception 'embedding version % is missing for % components', target, missing;
+        end if;
+        select version into previous from embedding_versions where status = 'active';
+        execute format('alter table components rename column embedding to %I',
+                       'embedding_' || regexp_replace(lower(previous), '[^a-z0-9]+', '_', 'g'));
+        execute format('alter table components rename column %I to embedding', staging);
+        update embedding_versions set status = 'retired', updated_at = now() where version = previous;
+        update embedding_versions set status = 'active', activated_at = now(), updated_at = now()
+            where version = target;
+    end $$ language plpgsql;
+
+    -- Bulk-writes vectors into existing rows only; ids deleted meanwhile are skipped.
+    create or replace function set_component_embeddings(target_column text, ids uuid[], vectors text[])
+    returns bigint as $$
+    declare
+        updated bigint;
+    begin
+        if target_column !~ '^embedding(_[a-z0-9_]+)?$' then
+            raise exception 'not an embedding column: %', target_column;
+        end if;
+        execute format('update components c set %I = v.vector::vector
+                        from unnest($1, $2) as v(id, vector) where c.id = v.id', target_column)
+            using ids, vectors;
+        get diagnostics updated = row_count;
+        return updated;
+    end $$ language plpgsql;
+"""
+
+VERSION_TABLE = "embedding_versions"
+ACTIVATE_FUNCTION = "activate_embedding_version"
+SET_EMBEDDINGS_FUNCTION = "set_component_embeddings"
+ACTIVE = "active"
+MIGRATING = "migrating"
+RETIRED = "retired"
+
+# Postgres "undefined_column", and PostgREST's "column not in the schema cache".
+MISSING_COLUMN_CODES = ("42703", "PGRST204")
+
+# Assumed when the versions table has no active row, i.e. before the first migration.
+DEFAULT_VERSION = {"version": "minilm-l6-v2", "model": "all-MiniLM-L6-v2", "status": ACTIVE}
+
+
+def staging_column(version: str) -> str:
+    """The `components` column a version is written to until it becomes active."""
+    return "embedding_" + re.sub(r"[^a-z0-9]+", "_", version.lower())
+
+
+def is_missing_column_error(error: Exception) -> bool:
+    """Whether a write failed because a column does not exist, e.g. a staging column renamed by a cutover."""
+    code = getattr(error, "code", None)
+    if code in MISSING_COLUMN_CODES:
+        return True
+    message = str(error)
+    return "column" in message and ("does not exist" in message or "Could not find" in message)
+
+
+class EmbeddingVersionStore:
+    """Reads and updates embedding versions and their migration progress."""
+
+    def __init__(self, client, cache_seconds: float = 30.0):
+        """
+        Args:
+            client: A Supabase client.
+            cache_seconds: How long `write_targets` reuses its last answer.
+        """
+        self.client = client
+        self.cache_seconds = cache_seconds
+        self._targets: Optional[Tuple[float, List[Tuple[str, str]]]] = None
+
+    def all(self) -> List[Dict[str, Any]]:
+        return self.client.table(VERSION_TABLE).select("*").execute().data or []
+
+    def get(self, version: str) -> Optional[Dict[str, Any]]:
+        response = self.client.table(VERSION_TABLE).select("*").eq("version", version).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    def active(self) -> Dict[str, Any]:
+        """Returns the version whose vectors are in `components.embedding`."""
+        response = self.client.table(VERSION_TABLE).select("*").eq("status", ACTIVE).limit(1).execute()
+        return response.data[0] if response.data else dict(DEFAULT_VERSION)
+
+    def start(self, version: str, model: str, restart: bool = False) -> Dict[str, Any]:
+        """
+        Registers a version to migrate to, or returns the existing record to resume it.
+
+        Raises:
+            ValueError: If the version exists with another model, or is already active.
+        """
+        record = self.get(version)
+        if record is not None and record["model"] != model:
+            raise ValueError(f"Embedding version {version} was started with model {record['model']}, not {model}.")
+        if record is not None and record["status"] == ACTIVE:
+            raise ValueError(f"Embedding version {version} is already active.")
+        if record is None or restart:
+            record = {
+                "version": version,
+                "model": model,
+                "status": MIGRATING,
+                "cursor": None,
+                "rows_done": 0,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+            self.client.table(VERSION_TABLE).upsert(record, on_conflict="version").execute()
+        return record
+
+    def save_progress(self, version: str, cursor: Optional[str], rows_done: int) -> None:
+        """Checkpoints a migration so an interrupted run resumes after `cursor`."""
+        self.client.table(VERSION_TABLE).update({
+            "cursor": cursor,
+            "rows_done": rows_done,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }).eq("version", version).execute()
+
+    def activate(self, version: str) -> None:
+        """
+        Atomically makes a fully migrated version the one queries use.
+
+        Raises:
+            Exception: If some component still lacks a vector for the version.
+        """
+        self.client.rpc(ACTIVATE_FUNCTION, {"target": version}).execute()
+        logger.info(f"Activated embedding version {version}.")
+
+    def set_vectors(self, column: str, ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> int:
+        """
+        Writes vectors into `column` of existing components. Unlike an upsert, it
+        never re-creates a component deleted since its id was read.
+
+        Returns:
+            The number of components updated.
+        """
+        literals = [orjson.dumps(list(map(float, vector))).decode() for vector in vectors]
+        response = self.client.rpc(
+            SET_EMBEDDINGS_FUNCTION, {"target_column": column, "ids": list(ids), "vectors": literals}
+        ).execute()
+        return int(response.data or 0)
+
+    def invalidate(self) -> None:
+        """Forgets the cached write targets."""
+        self._targets = None
+
+    def write_targets(self) -> List[Tuple[str, str]]:
+        """
+        Returns the (model, column) pairs new components must be embedded with:
+        the active version into `embedding`, and every migrating version into its
+        staging column so a migration in progress does not miss them.
+        """
+        now = time.monotonic()
+        if self._targets is not None and now - self._targets[0] < self.cache_seconds:
+            return self._targets[1]
+        targets = [(self.active()["model"], "embedding")]
+        for record in self.all():
+            if record.get("status") == MIGRATING:
+                targets.append((record["model"], staging_column(record["version"])))
+        self._targets = (now, targets)
+        return targets
@@ -0,0 +1,156 @@
+from typing import Collection, Dict, Iterable, List, Mapping, Optional, Sequence, Set
+
+import numpy as np
+
+"""
+Faceted inverted indexes over component metadata.
+
+Every (facet, value) pair, e.g. ("tag", "form") or ("dependency", "@radix-ui/react-slot"),
+maps to a bitmap of document slots held in a Python int. Filtering is a chain of
+bitwise ANDs and facet counts are popcounts, both of which run in C over machine
+words, so answering a filtered listing never touches the stored metadata.
+
+Python ints are immutable, so setting one bit rebuilds the whole bitmap. Writes
+therefore only update a set of slots per value and drop its bitmap; bitmaps are
+materialised from the sets when a query first needs them, so ingesting N
+documents costs O(N) rather than O(N) per document.
+"""
+
+# Facet names accepted in filters, in the order they are reported.
+FACETS = ("kit", "tag", "dependency", "internalDependency")
+
+
+def component_facets(kit_id: Optional[str], metadata: Mapping) -> Dict[str, List[str]]:
+    """Extracts facet values from a component's kit id and ATS metadata."""
+    return {
+        "kit": [str(kit_id)] if kit_id is not None else [],
+        "tag": [tag.lower() for tag in metadata.get("tags") or []],
+        "dependency": list(metadata.get("dependencies") or []),
+        "internalDependency": list(metadata.get("internalDependencies") or []),
+    }
+
+
+class FacetIndex:
+    """Bitmap posting lists per facet value, keyed by an external document key."""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, Set[int]]] = {facet: {} for facet in FACETS}
+        # Bitmaps of the postings, built on first use after a change.
+        self._bitmaps: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self._slot_by_key: Dict[str, int] = {}
+        self._keys: List[Optional[str]] = []
+        self._values: List[Dict[str, List[str]]] = []
+        self._free_slots: List[int] = []
+        self._all: Optional[int] = 0
+
+    def __len__(self) -> int:
+        return len(self._slot_by_key)
+
+    def upsert(self, key: str, facets: Mapping[str, Iterable[str]]) -> None:
+        """Adds or replaces the facet values of a document."""
+        self.remove(key)
+        values = {facet: list(dict.fromkeys(facets.get(facet, ()))) for facet in FACETS}
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._keys[slot] = key
+            self._values[slot] = values
+        else:
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._values.append(values)
+        self._slot_by_key[key] = slot
+
+        self._all = None
+        for facet, facet_values in values.items():
+            postings, bitmaps = self._postings[facet], self._bitmaps[facet]
+            for value in facet_values:
+                postings.setdefault(value, set()).add(slot)
+                bitmaps.pop(value, None)
+
+    def remove(self, key: str) -> bool:
+        """Removes a document. Returns False if the key was not indexed."""
+        slot = self._slot_by_key.pop(key, None)
+        if slot is None:
+            return False
+        self._all = None
+        for facet, facet_values in self._values[slot].items():
+            postings, bitmaps = self._postings[facet], self._bitmaps[facet]
+            for value in facet_values:
+                slots = postings[value]
+                slots.discard(slot)
+                if not slots:
+                    del postings[value]
+                bitmaps.pop(value, None)
+        self._keys[slot] = None
+        self._values[slot] = {}
+        self._free_slots.append(slot)
+        return True
+
+    def match(self, filters: Optional[Mapping[str, Sequence[str]]] = None) -> int:
+        """
+        Returns the bitmap of documents matching every filter value.
+
+        Args:
+            filters: Mapping of facet name to required values. All values must match,
+                both across and within facets.
+
+        Raises:
+            ValueError: If a filter names an unknown facet.
+        """
+        if self._all is None:
+            self._all = self._bitmap(self._slot_by_key.values())
+        bitmap = self._all
+        for facet, values in (filters or {}).items():
+            if facet not in self._postings:
+                raise ValueError(f"Unknown facet '{facet}'. Expected one of {', '.join(FACETS)}.")
+            for value in values:
+                if facet == "tag":
+                    value = value.lower()
+                bitmap &= self._value_bitmap(facet, value)
+                if not bitmap:
+                    return 0
+        return bitmap
+
+    def keys(self, bitmap: int) -> List[str]:
+        """Returns the keys of the documents set in a bitmap, in slot order."""
+        return [self._keys[slot] for slot in self._slots(bitmap)]
+
+    def counts(self, bitmap: int, limit: int = 20) -> Dict[str, Dict[str, int]]:
+        """
+        Counts how many documents in the bitmap carry each facet value.
+
+        Returns:
+            For each facet, up to `limit` values with non-zero counts, most common first.
+        """
+        result = {}
+        for facet in FACETS:
+            counts = {}
+            for value in list(self._postings[facet]):
+                count = (self._value_bitmap(facet, value) & bitmap).bit_count()
+                if count:
+                    counts[value] = count
+            top = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            result[facet] = dict(top)
+        return result
+
+    def _value_bitmap(self, facet: str, value: str) -> int:
+        bitmap = self._bitmaps[facet].get(value)
+        if bitmap is None:
+            slots = self._postings[facet].get(value)
+            if not slots:
+                return 0
+            bitmap = self._bitmaps[facet][value] = self._bitmap(slots)
+        return bitmap
+
+    def _bitmap(self, slots: Collection[int]) -> int:
+        if not slots:
+            return 0
+        bits = np.zeros(len(self._keys), dtype=np.uint8)
+        bits[np.fromiter(slots, dtype=np.int64, count=len(slots))] = 1
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+    def _slots(self, bitmap: int) -> np.ndarray:
+        if not bitmap:
+            return np.empty(0, dtype=np.int64)
+        raw = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
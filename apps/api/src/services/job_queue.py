@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+"""
+Durable, SQLite-backed queue for background ingestion jobs.
+
+The API process only enqueues jobs and reads their progress; separate worker
+processes claim and execute them. A claim is a lease that the worker renews with
+heartbeats, so a job whose worker crashed becomes claimable again once its lease
+expires. Progress is checkpointed per file, which lets the next worker skip the
+files that were already ingested instead of starting over. Every state change is
+also appended to an events table that clients can follow incrementally.
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+FILE_PENDING = "pending"
+FILE_DONE = "done"
+FILE_FAILED = "failed"
+
+_SCHEMA = """
+create table if not exists jobs (
+    id text primary key,
+    kit_id text not null,
+    path text not null,
+    status text not null,
+    worker_id text,
+    lease_expires_at real,
+    attempts integer not null default 0,
+    error text,
+    created_at real not null,
+    updated_at real not null
+);
+create index if not exists jobs_status on jobs (status, created_at);
+create table if not exists job_files (
+    job_id text not null references jobs (id),
+    path text not null,
+    status text not null,
+    error text,
+    primary key (job_id, path)
+);
+create table if not exists job_events (
+    id integer primary key autoincrement,
+    job_id text not null references jobs (id),
+    type text not null,
+    data text not null,
+    created_at real not null
+);
+create index if not exists job_events_job on job_events (job_id, id);
+"""
+
+
+class JobQueue:
+    """A job queue stored in a single SQLite database file, safe across processes."""
+
+    def __init__(self, path: str, default_lease_seconds: float = 60.0):
+        """
+        Args:
+            path: Location of the SQLite database file; created if missing.
+            default_lease_seconds: How long a claim stays valid without a heartbeat.
+        """
+        self.path = path
+        self.default_lease_seconds = default_lease_seconds
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A connection per operation keeps the queue usable from threads and
+        # forked processes alike; SQLite connections are cheap to open.
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            # IMMEDIATE takes the write lock up front so concurrent claims cannot interleave.
+            conn.execute("begin immediate")
+            try:
+                yield conn
+                conn.execute("commit")
+            except BaseException:
+                conn.execute("rollback")
+                raise
+
+    def enqueue(self, kit_id: str, path: str) -> Dict[str, Any]:
+        """Adds a new job and returns it."""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "insert into jobs (id, kit_id, path, status, created_at, updated_at) values (?, ?, ?, ?, ?, ?)",
+                (job_id, kit_id, path, QUEUED, now, now),
+            )
+            self._add_event(conn, job_id, "status", {"status": QUEUED})
+        logger.info(f"Enqueued ingestion job {job_id} for kit {kit_id} at {path}.")
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns a job with its per-file progress counts, or None if unknown."""
+        with self._connect() as conn:
+            row = conn.execute("select * from jobs where id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(
+                conn.execute(
+                    "select status, count(*) from job_files where job_id = ? group by status", (job_id,)
+                ).fetchall()
+            )
+        job = dict(row)
+        job["total_files"] = sum(counts.values())
+        job["done_files"] = counts.get(FILE_DONE, 0)
+        job["failed_files"] = counts.get(FILE_FAILED, 0)
+        return job
+
+    def claim(self, worker_id: str, lease_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Claims the oldest queued job, or a running job whose lease has expired.
+
+        Returns:
+            The claimed job, or None if there is nothing to do.
+        """
+        now = time.time()
+        lease = lease_seconds or self.default_lease_seconds
+        with self._transaction() as conn:
+            row = conn.execute(
+                """
+                select id, status, worker_id from jobs
+                where status = ? or (status = ? and lease_expires_at < ?)
+                order by created_at limit 1
+                """,
+                (QUEUED, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """
+                update jobs set status = ?, worker_id = ?, lease_expires_at = ?,
+                    attempts = attempts + 1, updated_at = ?
+                where id = ?
+                """,
+                (RUNNING, worker_id, now + lease, now, row["id"]),
+            )
+            resumed = row["status"] == RUNNING
+            self._add_event(
+                conn, row["id"], "status",
+                {"status": RUNNING, "worker_id": worker_id, "resumed": resumed},
+            )
+        if resumed:
+            logger.warning(f"Worker {worker_id} resumed job {row['id']} abandoned by {row['worker_id']}.")
+        return self.get(row["id"])
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: Optional[float] = None) -> bool:
+        """
+        Extends the worker's lease on a job.
+
+        Returns:
+            False if the job is no longer held by this worker, which must then stop.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "update jobs set lease_expires_at = ?, updated_at = ? where id = ? and worker_id = ? and status = ?",
+                (now + (lease_seconds or self.default_lease_seconds), now, job_id, worker_id, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def register_files(self, job_id: str, paths: List[str]) -> None:
+        """Records the files a job will process. Existing checkpoints are kept."""
+        with self._transaction() as conn:
+            conn.executemany(
+                "insert or ignore into job_files (job_id, path, status) values (?, ?, ?)",
+                [(job_id, path, FILE_PENDING) for path in paths],
+            )
+            total = conn.execute("select count(*) from job_files where job_id = ?", (job_id,)).fetchone()[0]
+            self._add_event(conn, job_id, "files", {"total_files": total})
+
+    def pending_files(self, job_id: str) -> List[str]:
+        """Returns the files not yet checkpointed as done or failed, in path order."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "select path from job_files where job_id = ? and status = ? order by path",
+                (job_id, FILE_PENDING),
+            ).fetchall()
+        return [row["path"] for row in rows]
+
+    def checkpoint_file(self, job_id: str, path: str, ok: bool, error: Optional[str] = None) -> None:
+        """Records the outcome of one file so it is not processed again."""
+        status = FILE_DONE if ok else FILE_FAILED
+        with self._transaction() as conn:
+            conn.execute(
+                "update job_files set status = ?, error = ? where job_id = ? and path = ?",
+                (status, error, job_id, path),
+            )
+            progress = dict(
+                conn.execute(
+                    "select status, count(*) from job_files where job_id = ? group by status", (job_id,)
+                ).fetchall()
+            )
+            self._add_event(
+                conn, job_id, "file",
+                {
+                    "path": path,
+                    "status": status,
+                    "error": error,
+                    "done_files": progress.get(FILE_DONE, 0),
+                    "failed_files": progress.get(FILE_FAILED, 0),
+                    "total_files": sum(progress.values()),
+                },
+            )
+
+    def finish(self, job_id: str, ok: bool, error: Optional[str] = None) -> None:
+        """Marks a job as succeeded or failed and releases its lease."""
+        status = SUCCEEDED if ok else FAILED
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "update jobs set status = ?, error = ?, lease_expires_at = null, updated_at = ? where id = ?",
+                (status, error, now, job_id),
+            )
+            self._add_event(conn, job_id, "status", {"status": status, "error": error})
+        logger.info(f"Ingestion job {job_id} {status}.")
+
+    def events(self, job_id: str, after_id: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """Returns the job's events with an id greater than `after_id`, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "select id, type, data, created_at from job_events where job_id = ? and id > ? order by id limit ?",
+                (job_id, after_id, limit),
+            ).fetchall()
+        return [
+            {"id": row["id"], "type": row["type"], "data": json.loads(row["data"]), "created_at": row["created_at"]}
+            for row in rows
+        ]
+
+    @staticmethod
+    def _add_event(conn: sqlite3.Connection, job_id: str, type: str, data: Dict[str, Any]) -> None:
+        conn.execute(
+            "insert into job_events (job_id, type, data, created_at) values (?, ?, ?, ?)",
+            (job_id, type, json.dumps(data), time.time()),
+        )
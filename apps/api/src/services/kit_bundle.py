@@ -0,0 +1,243 @@
+import io
+import logging
+import queue
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Tuple, Union
+
+import orjson
+from pydantic import ValidationError
+
+from schemas.ats import ATSModel
+from services.blob_store import RAW_CODE_HASH_KEY, BlobStore
+
+logger = logging.getLogger(__name__)
+
+"""
+Streams a design kit's components as a zip or tar.gz archive.
+
+The archive holds each component's source under `<kit>/components/` and a
+`<kit>/manifest.jsonl` with one line per component: its id, name, source path
+and ATS (an `ATSModel` without `rawCode`). Sources are fetched from the blob
+store one page of rows at a time.
+
+The archive is written by a worker thread into a bounded queue that the HTTP
+response drains, so compression overlaps with sending, a slow client pauses the
+worker instead of growing a buffer, and memory stays constant whatever the kit
+size. The manifest grows with the kit, so its lines are spooled to a temporary
+file and copied into the archive last.
+"""
+
+ZIP = "zip"
+TAR_GZ = "tar.gz"
+BUNDLE_FORMATS = (ZIP, TAR_GZ)
+MEDIA_TYPES = {ZIP: "application/zip", TAR_GZ: "application/gzip"}
+
+# Columns read from `components` for a bundle.
+BUNDLE_COLUMNS = "id,kit_id,name,metadata"
+SOURCE_EXTENSION = ".tsx"
+MANIFEST_NAME = "manifest.jsonl"
+
+# Bytes handed to the response at a time, and chunks buffered ahead of a slow client.
+CHUNK_BYTES = 64 * 1024
+QUEUE_CHUNKS = 16
+
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]+")
+_DONE = object()
+
+Content = Union[bytes, BinaryIO]
+
+
+class BundleCancelled(Exception):
+    """Raised inside the worker when the client went away."""
+
+
+def source_path(row: Dict[str, Any]) -> str:
+    """The archive path of a component's source, safe to extract."""
+    name = str(row.get("name") or "component")
+    safe = _SAFE_NAME_RE.sub("_", name).strip("._") or "component"
+    if safe != name:
+        # Keep paths unique when two names sanitize to the same string.
+        safe = f"{safe}-{str(row['id'])[:8]}"
+    return f"components/{safe}{SOURCE_EXTENSION}"
+
+
+def _pages(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[list]:
+    page = []
+    for row in rows:
+        page.append(row)
+        if len(page) == size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def bundle_entries(
+    rows: Iterable[Dict[str, Any]], blob_store: BlobStore, page_size: int = 200
+) -> Iterator[Tuple[str, Content]]:
+    """
+    Yields (path, content) for each component's source, then the manifest.
+    Content is bytes, or a readable file for the manifest.
+    """
+    with tempfile.TemporaryFile() as manifest:
+        count = 0
+        for page in _pages(rows, page_size):
+            metadatas = [row.get("metadata") or {} for row in page]
+            sources = blob_store.get_many(
+                m[RAW_CODE_HASH_KEY] for m in metadatas if "rawCode" not in m and m.get(RAW_CODE_HASH_KEY)
+            )
+            for row, metadata in zip(page, metadatas):
+                raw_code = metadata.get("rawCode")
+                if raw_code is None:
+                    raw_code = sources.get(metadata.get(RAW_CODE_HASH_KEY))
+                path = source_path(row)
+                entry: Dict[str, Any] = {"id": str(row["id"]), "name": row.get("name"), "source": None}
+                try:
+                    ats = ATSModel.model_validate({**metadata, "rawCode": raw_code or ""})
+                    entry["ats"] = ats.model_dump(exclude={"rawCode"})
+                except ValidationError as e:
+                    logger.warning(f"Component {row['id']} has no valid ATS; bundling its raw metadata: {e}")
+                    entry["ats"] = None
+                    entry["metadata"] = {k: v for k, v in metadata.items() if k != "rawCode"}
+                if raw_code is None:
+                    logger.warning(f"Source of component {row['id']} is missing from the blob store.")
+                else:
+                    entry["source"] = path
+                    yield path, raw_code.encode("utf-8")
+                manifest.write(orjson.dumps(entry) + b"\n")
+                count += 1
+        manifest.seek(0)
+        logger.info(f"Bundled {count} components.")
+        yield MANIFEST_NAME, manifest
+
+
+class _QueueSink(io.RawIOBase):
+    """A write-only file that hands fixed-size chunks to a bounded queue."""
+
+    def __init__(self, chunks: "queue.Queue", cancelled: threading.Event):
+        super().__init__()
+        self._chunks = chunks
+        self._cancelled = cancelled
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        if len(self._buffer) >= CHUNK_BYTES:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def close(self) -> None:
+        # Whatever is left after a cancellation is dropped, not sent.
+        self._buffer.clear()
+        super().close()
+
+    def _put(self, item) -> None:
+        while True:
+            if self._cancelled.is_set():
+                raise BundleCancelled()
+            try:
+                self._chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+def _size(content: Content) -> int:
+    if isinstance(content, bytes):
+        return len(content)
+    position = content.tell()
+    size = content.seek(0, io.SEEK_END)
+    content.seek(position)
+    return size
+
+
+def write_zip(entries: Iterable[Tuple[str, Content]], sink: BinaryIO, root: str) -> None:
+    date_time = time.localtime()[:6]
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for i, (path, content) in enumerate(entries):
+            info = zipfile.ZipInfo(f"{root}/{path}", date_time=date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, "w") as target:
+                if isinstance(content, bytes):
+                    target.write(content)
+                else:
+                    shutil.copyfileobj(content, target, CHUNK_BYTES)
+            if i == 0:
+                # Get the first bytes to the client without waiting for a full chunk.
+                sink.flush()
+
+
+def write_tar_gz(entries: Iterable[Tuple[str, Content]], sink: BinaryIO, root: str) -> None:
+    mtime = time.time()
+    # "w|gz" writes a non-seekable gzip stream.
+    with tarfile.open(fileobj=sink, mode="w|gz") as archive:
+        for i, (path, content) in enumerate(entries):
+            info = tarfile.TarInfo(f"{root}/{path}")
+            info.size = _size(content)
+            info.mtime = mtime
+            info.mode = 0o644
+            archive.addfile(info, io.BytesIO(content) if isinstance(content, bytes) else content)
+            if i == 0:
+                sink.flush()
+
+
+WRITERS = {ZIP: write_zip, TAR_GZ: write_tar_gz}
+
+
+def stream_bundle(
+    entries: Iterable[Tuple[str, Content]], format: str, root: str, queue_chunks: int = QUEUE_CHUNKS
+) -> Iterator[bytes]:
+    """
+    Writes the archive in a worker thread and yields it chunk by chunk.
+    Closing the iterator early (client disconnect) stops the worker.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if format not in WRITERS:
+        raise ValueError(f"format must be one of: {', '.join(BUNDLE_FORMATS)}.")
+    chunks: "queue.Queue" = queue.Queue(maxsize=queue_chunks)
+    cancelled = threading.Event()
+    sink = _QueueSink(chunks, cancelled)
+
+    def produce() -> None:
+        try:
+            WRITERS[format](entries, sink, root)
+            sink.flush()
+            sink._put(_DONE)
+        except BundleCancelled:
+            logger.info(f"Bundle {root} cancelled by the client.")
+        except Exception as e:
+            logger.error(f"Bundle {root} failed: {e}")
+            try:
+                sink._put(e)
+            except BundleCancelled:
+                pass
+
+    worker = threading.Thread(target=produce, name=f"bundle-{root}", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+        worker.join()
@@ -0,0 +1,311 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from services.projection import EmbeddingProjection
+from services.vector_index import VectorIndex, coerce_vector
+
+logger = logging.getLogger(__name__)
+
+"""
+Precomputed "related components": the top-k most similar components of every
+component by embedding cosine similarity.
+
+The full graph is built with a blocked matrix multiply over all normalised
+embeddings, one block of rows against the whole matrix at a time, so memory
+stays at block_size x N scores. After that, adding or changing one embedding
+costs a single matrix-vector product: the new scores show exactly which other
+components gain it as a neighbor, and only lists that contained the old vector
+are recomputed in full. Lists are persisted per component in the
+`component_neighbors` table, so serving them is a primary-key lookup. One
+process owns that table (`scripts/build_related_components.py --follow`): it
+follows every write to `components` through the change feed, whatever wrote it,
+so lists are never rewritten concurrently from graphs that disagree.
+
+    create table component_neighbors (
+        component_id uuid primary key references components (id) on delete cascade,
+        neighbors jsonb not null,    -- [{"id", "kit_id", "name", "score"}], most similar first
+        updated_at timestamptz not null default now()
+    );
+"""
+
+NEIGHBOR_TABLE = "component_neighbors"
+DEFAULT_K = 10
+
+Neighbors = List[Tuple[str, float]]
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first. Excluded (-inf) entries are never returned."""
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return top[scores[top] > -np.inf]
+
+
+def build_knn(keys: List[str], matrix: np.ndarray, k: int, block_size: int = 1024) -> Dict[str, Neighbors]:
+    """
+    Computes every row's top-k neighbors by cosine similarity (rows must be L2-normalised).
+
+    Args:
+        keys: Row keys.
+        matrix: One normalised vector per key.
+        k: Neighbors per key, excluding the key itself.
+        block_size: Rows scored per matrix multiply; bounds memory to block_size x N.
+    """
+    count = len(keys)
+    k = min(k, count - 1)
+    graph: Dict[str, Neighbors] = {}
+    if k <= 0:
+        return {key: [] for key in keys}
+    for start in range(0, count, block_size):
+        end = min(start + block_size, count)
+        scores = matrix[start:end] @ matrix.T
+        scores[np.arange(end - start), np.arange(start, end)] = -np.inf
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for offset in range(end - start):
+            graph[keys[start + offset]] = [
+                (keys[j], float(score)) for j, score in zip(top[offset], top_scores[offset])
+            ]
+    return graph
+
+
+class KnnGraph:
+    """Top-k similar components per component, maintained incrementally."""
+
+    def __init__(self, k: int = DEFAULT_K, block_size: int = 1024, projection: Optional[EmbeddingProjection] = None):
+        """
+        Args:
+            k: Neighbors kept per component.
+            block_size: Rows per matrix multiply in `build`.
+            projection: Optional dimensionality reduction applied to embeddings first.
+        """
+        self.k = k
+        self.block_size = block_size
+        self.projection = projection
+        self.vectors = VectorIndex()
+        self.neighbors: Dict[str, Neighbors] = {}
+        # Reverse edges: who lists a component among its neighbors.
+        self._listed_by: Dict[str, Set[str]] = {}
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.neighbors)
+
+    def build(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Indexes many `components` rows and computes every neighbor list in one batch."""
+        with self._lock:
+            indexed = [(row, vector) for row in rows if (vector := coerce_vector(row.get("embedding"))) is not None]
+            if indexed and self.projection is not None:
+                projected = self.projection.apply(np.stack([vector for _, vector in indexed]))
+                indexed = [(row, vector) for (row, _), vector in zip(indexed, projected)]
+            for row, vector in indexed:
+                key = str(row["id"])
+                self.vectors.upsert(key, vector)
+                self._info[key] = _summary(row)
+            keys, matrix = self.vectors.snapshot()
+            graph = build_knn(keys, matrix, self.k, self.block_size)
+            self.neighbors, self._listed_by = {}, {}
+            for key, neighbors in graph.items():
+                self._set_neighbors(key, neighbors)
+        logger.info(f"Built kNN graph over {len(keys)} components (k={self.k}).")
+        return len(keys)
+
+    def related(self, key: str) -> Neighbors:
+        """Returns a component's precomputed neighbors, best first."""
+        with self._lock:
+            return list(self.neighbors.get(key, []))
+
+    def info(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._info.get(key)
+
+    def upsert_row(self, row: Dict[str, Any]) -> Set[str]:
+        """
+        Adds or updates a `components` row. Suitable as a `SupabaseUploader` listener.
+
+        Returns:
+            The components whose stored neighbor lists must be rewritten.
+        """
+        key = str(row["id"])
+        vector = coerce_vector(row.get("embedding"))
+        if vector is not None and self.projection is not None:
+            vector = self.projection.apply(vector)
+        with self._lock:
+            renamed = self._info.get(key) != _summary(row)
+            self._info[key] = _summary(row)
+            if vector is None:
+                return self.remove(key)
+            norm = float(np.linalg.norm(vector))
+            normalised = vector / norm if norm > 0 else vector
+            previous = self.vectors.get(key)
+            if previous is not None and np.allclose(previous, normalised):
+                # Only the denormalised name or kit changed, which shows in lists naming it.
+                return {key} | self._listed_by.get(key, set()) if renamed else set()
+            return self._upsert_vector(key, vector)
+
+    def remove(self, key: str) -> Set[str]:
+        """
+        Drops a component.
+
+        Returns:
+            The remaining components whose neighbor lists changed.
+        """
+        with self._lock:
+            self._info.pop(key, None)
+            if not self.vectors.remove(key):
+                return set()
+            self._set_neighbors(key, None)
+            affected = self._listed_by.pop(key, set())
+            for other in affected:
+                self._recompute(other)
+            return affected
+
+    def _upsert_vector(self, key: str, vector: np.ndarray) -> Set[str]:
+        stale = set(self._listed_by.get(key, set()))
+        self.vectors.upsert(key, vector)
+        keys, scores = self.vectors.scores(vector)
+        own = keys.index(key)
+        scores[own] = -np.inf
+
+        changed = {key}
+        self._set_neighbors(key, [(keys[i], float(scores[i])) for i in _top_k(scores, self.k)])
+
+        # Lists that held the old vector may lose it: recompute them from scratch.
+        for other in stale:
+            self._recompute(other)
+        changed |= stale
+
+        # Any other list whose weakest entry scores below the new vector gains it.
+        weakest = np.fromiter(
+            (self._weakest(other) for other in keys), dtype=np.float32, count=len(keys)
+        )
+        weakest[own] = np.inf
+        for i in np.nonzero(scores > weakest)[0]:
+            other = keys[i]
+            if other in stale:
+                continue
+            merged = [entry for entry in self.neighbors.get(other, []) if entry[0] != key]
+            merged.append((key, float(scores[i])))
+            merged.sort(key=lambda entry: -entry[1])
+            self._set_neighbors(other, merged[: self.k])
+            changed.add(other)
+        return changed
+
+    def _weakest(self, key: str) -> float:
+        neighbors = self.neighbors.get(key, [])
+        return neighbors[-1][1] if len(neighbors) >= self.k else -np.inf
+
+    def _recompute(self, key: str) -> None:
+        vector = self.vectors.get(key)
+        if vector is None:
+            return
+        keys, scores = self.vectors.scores(vector)
+        scores[keys.index(key)] = -np.inf
+        self._set_neighbors(key, [(keys[i], float(scores[i])) for i in _top_k(scores, self.k)])
+
+    def _set_neighbors(self, key: str, neighbors: Optional[Neighbors]) -> None:
+        for old, _ in self.neighbors.get(key, []):
+            self._listed_by.get(old, set()).discard(key)
+        if neighbors is None:
+            self.neighbors.pop(key, None)
+            return
+        self.neighbors[key] = neighbors
+        for other, _ in neighbors:
+            self._listed_by.setdefault(other, set()).add(key)
+
+
+def _summary(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": str(row["id"]),
+        "kit_id": str(row["kit_id"]) if row.get("kit_id") is not None else None,
+        "name": row.get("name") or (row.get("metadata") or {}).get("componentName", ""),
+    }
+
+
+class NeighborStore:
+    """Reads and writes precomputed neighbor lists in the `component_neighbors` table."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def save(self, graph: KnnGraph, keys: Iterable[str]) -> int:
+        """Writes the current lists of the given components. Returns the number of rows written."""
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for key in keys:
+            if key not in graph.neighbors:
+                continue
+            neighbors = graph.related(key)
+            rows.append({
+                "component_id": key,
+                "neighbors": [
+                    {**(graph.info(other) or {"id": other}), "score": round(score, 6)}
+                    for other, score in neighbors
+                ],
+                "updated_at": now,
+            })
+        for start in range(0, len(rows), 500):
+            self.client.table(NEIGHBOR_TABLE).upsert(rows[start : start + 500], on_conflict="component_id").execute()
+        return len(rows)
+
+    def get(self, component_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Returns a component's stored neighbors, or None if it has no list."""
+        response = (
+            self.client.table(NEIGHBOR_TABLE).select("neighbors").eq("component_id", component_id).limit(1).execute()
+        )
+        return response.data[0]["neighbors"] if response.data else None
+
+
+def _save_changed(graph: KnnGraph, store: NeighborStore, changed: Set[str], cause: str) -> None:
+    if changed:
+        written = store.save(graph, changed)
+        logger.info(f"Updated {written} related-component list(s) after {cause}.")
+
+
+def attach_to_change_feed(feed, graph: KnnGraph, store: NeighborStore, since=None) -> Callable[[Dict[str, Any]], None]:
+    """
+    Keeps the graph current with every component written or deleted, by any
+    process (see services.change_feed), and rewrites the stored lists those
+    changes affect. Attach it in exactly one process, the owner of the stored
+    lists.
+
+    Args:
+        since: Watermarks from `feed.mark()` taken before the graph was loaded.
+
+    Returns:
+        The upsert handler, to `feed.unsubscribe` when the graph is replaced.
+    """
+
+    def on_upsert(row: Dict[str, Any]) -> None:
+        _save_changed(graph, store, graph.upsert_row(row), f"a change to {row.get('name')}")
+
+    def on_delete(key: str) -> None:
+        _save_changed(graph, store, graph.remove(key), f"the deletion of {key}")
+
+    feed.subscribe("components", on_upsert, on_delete, since=since)
+    return on_upsert
+
+
+_neighbor_store: Optional[NeighborStore] = None
+
+
+def get_neighbor_store() -> NeighborStore:
+    """Returns the process-wide neighbor store. Used as a FastAPI dependency."""
+    global _neighbor_store
+    if _neighbor_store is None:
+        from db.db import supabase_client
+
+        _neighbor_store = NeighborStore(supabase_client)
+    return _neighbor_store
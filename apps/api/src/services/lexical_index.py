@@ -0,0 +1,184 @@
+import math
+import re
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+"""
+An in-memory BM25 inverted index over short component documents.
+
+Each document is a handful of weighted fields (name, description, tags, prop names,
+dependencies). Postings are stored per term as two parallel integer arrays (document
+slot and weighted term frequency), which keeps the index compact and lets queries
+score with vectorised arithmetic over zero-copy NumPy views of those arrays.
+Documents can be upserted and removed incrementally; freed slots are reused by
+later inserts. The index is not thread-safe; callers serialise access.
+"""
+
+# Fields are weighted by repeating their term frequencies, so an exact hit on the
+# component name outranks a passing mention in the description.
+DEFAULT_FIELD_WEIGHTS: Dict[str, int] = {
+    "name": 4,
+    "tags": 2,
+    "props": 2,
+    "dependencies": 2,
+    "description": 1,
+}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or that the this to with".split()
+)
+
+# Whole tokens may contain package punctuation, e.g. "@radix-ui/react-slot" or "@/lib/utils".
+_TOKEN_RE = re.compile(r"[@\w][\w@./-]*")
+_PART_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """
+    Splits text into lowercase search terms.
+
+    Each raw token is emitted whole (so exact package names and identifiers match)
+    followed by its punctuation and camelCase parts, e.g. "asChild" yields
+    "aschild", "as", "child".
+    """
+    for raw in _TOKEN_RE.findall(text):
+        whole = raw.strip("./-").lower()
+        if not whole or whole in STOPWORDS:
+            continue
+        yield whole
+        parts = [part.lower() for part in _PART_RE.findall(raw)]
+        if len(parts) > 1 or (parts and parts[0] != whole):
+            for part in parts:
+                if part not in STOPWORDS:
+                    yield part
+
+
+class LexicalIndex:
+    """BM25 index keyed by an external document key (the component id)."""
+
+    def __init__(self, field_weights: Optional[Dict[str, int]] = None, k1: float = 1.2, b: float = 0.75):
+        self.field_weights = field_weights or DEFAULT_FIELD_WEIGHTS
+        self.k1 = k1
+        self.b = b
+        # term -> (document slots, weighted term frequencies)
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._slot_by_key: Dict[str, int] = {}
+        self._keys: List[Optional[str]] = []
+        self._doc_terms: List[Tuple[str, ...]] = []
+        self._doc_lengths = array("I")
+        self._free_slots: List[int] = []
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._slot_by_key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._slot_by_key
+
+    def upsert(self, key: str, fields: Dict[str, Iterable[str] | str]) -> None:
+        """
+        Adds or replaces a document.
+
+        Args:
+            key: External document key.
+            fields: Mapping of field name to text or a list of strings.
+        """
+        self.remove(key)
+
+        frequencies: Dict[str, int] = {}
+        for field, value in fields.items():
+            weight = self.field_weights.get(field, 1)
+            texts = [value] if isinstance(value, str) else value
+            for text in texts:
+                for term in tokenize(text):
+                    frequencies[term] = frequencies.get(term, 0) + weight
+        length = sum(frequencies.values())
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._keys[slot] = key
+            self._doc_terms[slot] = tuple(frequencies)
+            self._doc_lengths[slot] = length
+        else:
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._doc_terms.append(tuple(frequencies))
+            self._doc_lengths.append(length)
+        self._slot_by_key[key] = slot
+        self._total_length += length
+
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("I"))
+            postings[0].append(slot)
+            postings[1].append(frequency)
+
+    def remove(self, key: str) -> bool:
+        """Removes a document. Returns False if the key was not indexed."""
+        slot = self._slot_by_key.pop(key, None)
+        if slot is None:
+            return False
+        for term in self._doc_terms[slot]:
+            slots, frequencies = self._postings[term]
+            position = slots.index(slot)
+            if len(slots) == 1:
+                del self._postings[term]
+            else:
+                del slots[position]
+                del frequencies[position]
+        self._total_length -= self._doc_lengths[slot]
+        self._keys[slot] = None
+        self._doc_terms[slot] = ()
+        self._doc_lengths[slot] = 0
+        self._free_slots.append(slot)
+        return True
+
+    def search(
+        self, query: str, limit: int = 10, allowed: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Scores documents against the query with BM25.
+
+        Args:
+            query: Free-text query.
+            limit: Maximum number of results.
+            allowed: If given, only these keys may be returned.
+
+        Returns:
+            Up to `limit` (key, score) pairs, best first.
+        """
+        count = len(self._slot_by_key)
+        if count == 0 or limit <= 0:
+            return []
+        k1, b = self.k1, self.b
+        lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)
+        # Per-slot BM25 length normalisation, shared by every query term.
+        norms = k1 * (1.0 - b + b * lengths / (self._total_length / count))
+
+        scores = None
+        for term in dict.fromkeys(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            slots = np.frombuffer(postings[0], dtype=np.uint32)
+            frequencies = np.frombuffer(postings[1], dtype=np.uint32).astype(np.float64)
+            idf = math.log(1.0 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+            if scores is None:
+                scores = np.zeros(len(lengths), dtype=np.float64)
+            # Slots are unique within a posting list, so fancy-index addition is safe.
+            scores[slots] += idf * frequencies * (k1 + 1.0) / (frequencies + norms[slots])
+        if scores is None:
+            return []
+        if allowed is not None:
+            mask = np.zeros(len(scores), dtype=bool)
+            mask[[self._slot_by_key[key] for key in allowed if key in self._slot_by_key]] = True
+            scores[~mask] = 0.0
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self._keys[slot], float(scores[slot])) for slot in matched]
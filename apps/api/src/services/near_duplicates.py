@@ -0,0 +1,218 @@
+import base64
+import logging
+import re
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from agents.source_minifier import minify_source
+
+logger = logging.getLogger(__name__)
+
+"""
+Near-duplicate detection for component sources with MinHash and LSH.
+
+A source is normalized (comments and whitespace removed) and split into
+overlapping 5-token shingles. Its MinHash signature keeps, for each of 128
+hash functions, the minimum hash over all shingles; the fraction of equal
+positions between two signatures estimates the Jaccard similarity of their
+shingle sets. Signatures are cut into 16 bands of 8 rows and every band is
+hashed into a bucket, so only components sharing at least one bucket are
+ever compared: candidates are found without scanning the catalog.
+
+Signatures are stored in each component's metadata under `minHash`. They
+depend on NUM_PERM, SHINGLE_SIZE and the permutation seed; changing any of
+those requires bumping SIGNATURE_VERSION, which makes old signatures ignored.
+"""
+
+MINHASH_KEY = "minHash"
+SIGNATURE_VERSION = 1
+
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+DEFAULT_BANDS = 16
+DEFAULT_THRESHOLD = 0.9
+
+# Largest prime below 2**32: (a * h + b) stays below 2**64 for 32-bit a, h and b.
+_PRIME = np.uint64(4294967291)
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(1, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+
+_TOKEN_RE = re.compile(r"[A-Za-z_$][\w$]*|\d+|\S")
+
+
+def shingles(code: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Returns the set of `size`-token shingles of a normalized source."""
+    tokens = _TOKEN_RE.findall(minify_source(code, elide_strings=False))
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash_signature(code: str) -> np.ndarray:
+    """Computes the MinHash signature of a source as NUM_PERM uint32 values."""
+    pieces = shingles(code)
+    if not pieces:
+        return np.full(NUM_PERM, int(_PRIME) - 1, dtype=np.uint32)
+    hashes = np.fromiter(
+        (zlib.crc32(piece.encode("utf-8")) for piece in pieces), dtype=np.uint64, count=len(pieces)
+    )
+    return ((hashes[:, None] * _A + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def encode_signature(signature: np.ndarray) -> str:
+    """Serializes a signature for storage in component metadata."""
+    return f"{SIGNATURE_VERSION}:" + base64.b64encode(signature.astype("<u4").tobytes()).decode("ascii")
+
+
+def decode_signature(value: Any) -> Optional[np.ndarray]:
+    """Parses a stored signature. Returns None if missing or from another version."""
+    if not isinstance(value, str):
+        return None
+    version, _, data = value.partition(":")
+    if version != str(SIGNATURE_VERSION):
+        return None
+    signature = np.frombuffer(base64.b64decode(data), dtype="<u4")
+    return signature if len(signature) == NUM_PERM else None
+
+
+def estimated_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimates the Jaccard similarity of the sources behind two signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """LSH index over MinHash signatures, keyed by component id."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, bands: int = DEFAULT_BANDS):
+        """
+        Args:
+            threshold: Minimum estimated Jaccard similarity for two sources to count as duplicates.
+            bands: Number of LSH bands; NUM_PERM must be divisible by it. More bands
+                find lower-similarity candidates at the cost of more comparisons.
+        """
+        if NUM_PERM % bands:
+            raise ValueError(f"bands must divide {NUM_PERM}.")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def upsert(self, key: str, signature: np.ndarray) -> None:
+        """Adds or replaces a component's signature."""
+        with self._lock:
+            self._remove(key)
+            self._signatures[key] = signature
+            for bucket in self._band_keys(signature):
+                self._buckets.setdefault(bucket, set()).add(key)
+
+    def upsert_row(self, row: Dict[str, Any]) -> None:
+        """Indexes a `components` row by the signature in its metadata, if any."""
+        key = str(row["id"])
+        signature = decode_signature((row.get("metadata") or {}).get(MINHASH_KEY))
+        if signature is None:
+            self.remove(key)
+        else:
+            self.upsert(key, signature)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def query(self, signature: np.ndarray, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Finds indexed components at or above the similarity threshold.
+
+        Returns:
+            (key, estimated similarity) pairs, most similar first.
+        """
+        with self._lock:
+            candidates: Set[str] = set()
+            for bucket in self._band_keys(signature):
+                candidates |= self._buckets.get(bucket, set())
+            matches = [
+                (key, similarity)
+                for key in candidates
+                if (similarity := estimated_similarity(signature, self._signatures[key])) >= self.threshold
+            ]
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit] if limit is not None else matches
+
+    def clusters(self) -> List[Tuple[List[str], float]]:
+        """
+        Groups indexed components into clusters of near-duplicates.
+
+        Components are linked when they share a bucket and their similarity meets
+        the threshold; clusters are the connected components of those links.
+
+        Returns:
+            (sorted member keys, lowest similarity of any link in the cluster)
+            for every cluster of two or more, largest first.
+        """
+        parent: Dict[str, str] = {}
+
+        def find(key: str) -> str:
+            while parent.setdefault(key, key) != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        lowest: Dict[str, float] = {}
+        compared: Set[Tuple[str, str]] = set()
+        with self._lock:
+            for members in self._buckets.values():
+                if len(members) < 2:
+                    continue
+                ordered = sorted(members)
+                for i, a in enumerate(ordered):
+                    for b in ordered[i + 1 :]:
+                        if (a, b) in compared:
+                            continue
+                        compared.add((a, b))
+                        similarity = estimated_similarity(self._signatures[a], self._signatures[b])
+                        if similarity < self.threshold:
+                            continue
+                        root_a, root_b = find(a), find(b)
+                        link = min(similarity, lowest.pop(root_a, 1.0), lowest.pop(root_b, 1.0))
+                        if root_a != root_b:
+                            parent[root_b] = root_a
+                        lowest[root_a] = link
+
+        groups: Dict[str, List[str]] = {}
+        for key in parent:
+            groups.setdefault(find(key), []).append(key)
+        clusters = [(sorted(keys), lowest[root]) for root, keys in groups.items() if len(keys) > 1]
+        clusters.sort(key=lambda cluster: (-len(cluster[0]), cluster[0][0]))
+        return clusters
+
+    def load(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Indexes many rows. Returns the number that carried a signature."""
+        for row in rows:
+            self.upsert_row(row)
+        logger.info(f"Indexed {len(self)} component signatures for near-duplicate detection.")
+        return len(self)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows : (band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _remove(self, key: str) -> None:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket in self._band_keys(signature):
+            members = self._buckets.get(bucket)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._buckets[bucket]
@@ -0,0 +1,173 @@
+import contextlib
+import functools
+import inspect
+import logging
+import os
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from typing import Any, Callable, ContextManager, FrozenSet, Optional
+
+from fastapi.routing import APIRoute
+
+from config.config import settings
+
+logger = logging.getLogger(__name__)
+
+"""
+Opt-in sampling profiler for API requests and ingestion stages.
+
+Profiling is off unless PROFILE_DIR is set. Then:
+
+- PROFILE_REQUEST_RATE (0..1) is the fraction of API requests profiled. Routes
+  opt in through `ProfiledRoute`, which only wraps endpoints when enabled.
+- PROFILE_STAGES lists pipeline stages to profile, e.g. "ats,embed,upload", or "*".
+
+A profiled block gets a sampler thread that reads the block's thread stack every
+PROFILE_INTERVAL_MS through `sys._current_frames()`; the profiled code itself is
+not instrumented. Samples are appended in collapsed-stack format, one file per
+route or stage, e.g. PROFILE_DIR/stage-embed.folded, ready for flamegraph.pl,
+speedscope or inferno. Repeated profiles of the same route add up in its file.
+
+Disabled, `profile_stage` is a set lookup returning a shared no-op context, and
+routes are not wrapped at all.
+"""
+
+REQUEST = "route"
+STAGE = "stage"
+
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+_write_lock = threading.Lock()
+_disabled = contextlib.nullcontext()
+
+
+def _stages(value: str) -> FrozenSet[str]:
+    return frozenset(stage.strip() for stage in value.split(",") if stage.strip())
+
+
+PROFILE_DIR = settings.PROFILE_DIR
+PROFILED_STAGES = _stages(settings.PROFILE_STAGES) if PROFILE_DIR else frozenset()
+REQUEST_RATE = settings.PROFILE_REQUEST_RATE if PROFILE_DIR else 0.0
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    short = os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+    # ";" separates frames in collapsed stacks.
+    return f"{code.co_name} ({short}:{code.co_firstlineno})".replace(";", ":")
+
+
+def collapse(frame) -> str:
+    """Formats a stack as "root;...;leaf"."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Samples one thread's stack at a fixed interval from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop_event.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+            # Drop the reference so the sampled thread's frames can be freed.
+            frame = None
+
+
+def write_folded(kind: str, name: str, stacks: Counter, directory: Optional[str] = None) -> Optional[str]:
+    """Appends collapsed stacks to the route's or stage's file and returns its path."""
+    if not stacks:
+        return None
+    directory = directory or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kind}-{_SAFE_NAME_RE.sub('_', name).strip('_') or 'root'}.folded")
+    data = "".join(f"{stack} {count}\n" for stack, count in stacks.items())
+    with _write_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(data)
+    return path
+
+
+@contextlib.contextmanager
+def profiled(kind: str, name: str, interval: Optional[float] = None, directory: Optional[str] = None):
+    """Samples the current thread for the duration of the block."""
+    interval = interval if interval is not None else settings.PROFILE_INTERVAL_MS / 1000.0
+    sampler = StackSampler(threading.get_ident(), interval).start()
+    try:
+        yield sampler
+    finally:
+        stacks = sampler.stop()
+        try:
+            path = write_folded(kind, name, stacks, directory)
+            logger.debug(f"Profiled {kind} {name}: {sum(stacks.values())} samples -> {path}")
+        except OSError as e:
+            # Profiling must never fail the profiled work.
+            logger.error(f"Could not write profile of {kind} {name}: {e}")
+
+
+def profile_stage(stage: str) -> ContextManager:
+    """Profiles a pipeline stage ("ats", "embed", "upload", ...) if PROFILE_STAGES selects it."""
+    if stage in PROFILED_STAGES or "*" in PROFILED_STAGES:
+        return profiled(STAGE, stage)
+    return _disabled
+
+
+def _profile_request(name: str) -> ContextManager:
+    if random.random() < REQUEST_RATE:
+        return profiled(REQUEST, name)
+    return _disabled
+
+
+def profile_endpoint(endpoint: Callable[..., Any], name: str) -> Callable[..., Any]:
+    """
+    Wraps an endpoint so a sampled fraction of its calls is profiled. Sync
+    endpoints are profiled in the threadpool thread that runs them; async ones
+    on the event loop thread, where other requests' callbacks can show up too.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            with _profile_request(name):
+                return await endpoint(*args, **kwargs)
+
+    else:
+
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            with _profile_request(name):
+                return endpoint(*args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """An APIRoute whose endpoint is sampled at PROFILE_REQUEST_RATE. A plain APIRoute when disabled."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        if REQUEST_RATE > 0:
+            methods = "_".join(sorted(kwargs.get("methods") or ["GET"]))
+            endpoint = profile_endpoint(endpoint, f"{methods} {path}")
+        super().__init__(path, endpoint, **kwargs)
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import os
+from functools import lru_cache
+from typing import Optional, Sequence
+
+import numpy as np
+
+from config.config import settings
+from services.embedding_versions import DEFAULT_VERSION
+
+logger = logging.getLogger(__name__)
+
+"""
+Dimensionality reduction for component embeddings.
+
+`components.embedding` always keeps the full all-MiniLM vector (384 floats) so a
+projection can be retrained at any time. The in-memory indexes (hybrid search,
+related components) can instead hold vectors projected to fewer dimensions,
+which shrinks them proportionally and speeds up every scan. A projection is
+either trained with PCA on the catalog's own embeddings or a data-independent
+Gaussian random projection. It is saved as an .npz file together with a version
+id derived from its contents, so logs and evaluation reports can tell which
+projection an index was built with.
+
+A projection only fits the embedding model it was trained on. Activating a new
+embedding version (scripts/migrate_embeddings.py) therefore refits it on the new
+vectors first and saves it next to EMBEDDING_PROJECTION_PATH under the version's
+name; `load_projection(version)` reads that file. The configured file itself
+belongs to the initial version.
+"""
+
+PCA = "pca"
+RANDOM = "random"
+
+
+class EmbeddingProjection:
+    """A linear map from full embeddings to a lower dimension: (x - mean) @ matrix."""
+
+    def __init__(self, method: str, matrix: np.ndarray, mean: np.ndarray):
+        self.method = method
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        digest = hashlib.sha256(self.matrix.tobytes() + self.mean.tobytes()).hexdigest()[:12]
+        self.version = f"{method}-{self.input_dim}x{self.output_dim}-{digest}"
+
+    @property
+    def input_dim(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def output_dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def apply(self, vectors: Sequence) -> np.ndarray:
+        """
+        Projects one vector or a batch of row vectors.
+
+        Raises:
+            ValueError: If the vectors do not have the projection's input dimension.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[-1] != self.input_dim:
+            raise ValueError(
+                f"Projection {self.version} expects {self.input_dim}-dim vectors, got {vectors.shape[-1]}."
+            )
+        return (vectors - self.mean) @ self.matrix
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, method=self.method, version=self.version, matrix=self.matrix, mean=self.mean)
+        logger.info(f"Saved embedding projection {self.version} to {path}.")
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingProjection":
+        """
+        Raises:
+            ValueError: If the file's contents do not match its recorded version.
+        """
+        with np.load(path) as data:
+            projection = cls(str(data["method"]), data["matrix"], data["mean"])
+            if str(data["version"]) != projection.version:
+                raise ValueError(f"Projection file {path} is corrupt: version mismatch.")
+        return projection
+
+
+def fit_pca(vectors: np.ndarray, dim: int) -> EmbeddingProjection:
+    """Fits a PCA projection keeping the `dim` directions of highest variance."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dim > min(vectors.shape):
+        raise ValueError(f"Cannot fit {dim} components to {vectors.shape[0]} vectors of dimension {vectors.shape[1]}.")
+    mean = vectors.mean(axis=0)
+    _, _, components = np.linalg.svd(vectors - mean, full_matrices=False)
+    return EmbeddingProjection(PCA, components[:dim].T, mean)
+
+
+def random_projection(input_dim: int, dim: int, seed: int = 0) -> EmbeddingProjection:
+    """Builds a Gaussian random projection, which approximately preserves angles."""
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(scale=1.0 / np.sqrt(dim), size=(input_dim, dim))
+    return EmbeddingProjection(RANDOM, matrix, np.zeros(input_dim))
+
+
+def refit_projection(projection: EmbeddingProjection, vectors: np.ndarray, seed: int = 0) -> EmbeddingProjection:
+    """
+    Fits a projection of the same method and output dimension to other vectors,
+    e.g. those of a new embedding model. PCA falls back to a random projection
+    when there are fewer vectors than output dimensions.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if projection.method == PCA and projection.output_dim <= min(vectors.shape):
+        return fit_pca(vectors, projection.output_dim)
+    return random_projection(vectors.shape[1], projection.output_dim, seed=seed)
+
+
+def projection_path(embedding_version: Optional[str] = None) -> str:
+    """Where the projection for an embedding version is saved; the configured path without a version."""
+    path = settings.EMBEDDING_PROJECTION_PATH
+    if not path or embedding_version is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{embedding_version}{extension or '.npz'}"
+
+
+@lru_cache(maxsize=4)
+def load_projection(embedding_version: Optional[str] = None) -> Optional[EmbeddingProjection]:
+    """
+    Returns the projection configured by EMBEDDING_PROJECTION_PATH, or None if
+    no projection is configured.
+
+    Args:
+        embedding_version: The version whose vectors will be projected. Its own
+            refitted projection is used if one was saved. Otherwise only the
+            initial version uses the configured file; for any other, vectors are
+            not projected, as the file was fit on another model.
+    """
+    path = settings.EMBEDDING_PROJECTION_PATH
+    if not path:
+        return None
+    versioned = projection_path(embedding_version)
+    if embedding_version is not None and os.path.exists(versioned):
+        path = versioned
+    elif embedding_version not in (None, DEFAULT_VERSION["version"]):
+        logger.warning(
+            f"No projection was fit for embedding version {embedding_version}; indexing full embeddings."
+        )
+        return None
+    projection = EmbeddingProjection.load(path)
+    logger.info(f"Using embedding projection {projection.version} from {path}.")
+    return projection
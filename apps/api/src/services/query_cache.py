@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional, Sequence, Tuple
+
+"""
+Caches for repeated search and listing queries.
+
+`QueryCache` is an LRU map whose entries also expire after a TTL. It counts hits
+and misses so hit rates can be exported as metrics.
+
+Cached results are never invalidated by scanning the cache. Instead their keys
+include the revisions of the kits they were computed from (`KitRevisions`):
+every component write bumps its kit's revision, so a later lookup builds a new
+key and misses, and the stale entry ages out through LRU/TTL. A query filtered
+to one kit only depends on that kit's revision, so writes to other kits leave
+it cached; unfiltered queries depend on the global revision.
+"""
+
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    """Collapses whitespace. Case is kept: the lexical tokenizer splits camelCase."""
+    return " ".join(query.split())
+
+
+def filters_key(filters: Optional[Mapping[str, Sequence[str]]]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """A hashable, order-independent form of facet filters."""
+    return tuple(sorted((facet, tuple(sorted(set(values)))) for facet, values in (filters or {}).items() if values))
+
+
+class QueryCache:
+    """A thread-safe LRU cache with per-entry expiry and hit/miss counters."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 300.0):
+        """
+        Args:
+            max_entries: Entries kept before the least recently used is evicted; 0 disables caching.
+            ttl_seconds: Lifetime of an entry; None keeps entries until evicted.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class KitRevisions:
+    """Per-kit write counters, plus a global one that moves with any kit."""
+
+    def __init__(self):
+        self._revisions: Dict[Optional[str], int] = {}
+        self._global = 0
+        self._lock = threading.Lock()
+
+    def bump(self, kit_ids: Iterable[Optional[str]]) -> None:
+        with self._lock:
+            for kit_id in set(kit_ids):
+                self._revisions[kit_id] = self._revisions.get(kit_id, 0) + 1
+            self._global += 1
+
+    def get(self, kit_id: Optional[str]) -> int:
+        with self._lock:
+            return self._revisions.get(kit_id, 0)
+
+    def token(self, kit_ids: Optional[Sequence[str]] = None) -> Tuple:
+        """The revision part of a cache key: the given kits' revisions, or the global one."""
+        with self._lock:
+            if not kit_ids:
+                return ("*", self._global)
+            return tuple((kit_id, self._revisions.get(kit_id, 0)) for kit_id in sorted(set(kit_ids)))
@@ -0,0 +1,324 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+from services.vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+"""
+A component embedding index shared by every API worker process through memory-mapped files.
+
+One builder (`scripts/build_vector_snapshot.py`) writes the normalised embedding
+matrix and the sorted component ids as .npy files into a new generation
+directory, then atomically points the CURRENT file at it:
+
+    <EMBEDDING_SNAPSHOT_DIR>/
+        CURRENT             -> "gen-000042"
+        gen-000042/
+            vectors.npy     float32 [count, dim], rows aligned with keys.npy
+            keys.npy        fixed-width bytes [count], sorted
+            meta.json       {"count", "dim", "projection", "created_at", "as_of"}
+
+Workers map both files read-only, so the matrix lives once in the page cache
+however many workers are running, and ids are looked up by binary search in
+the mapped array instead of a per-process dict. Readers notice a new
+generation on their next query (checked at most every `refresh_seconds`) and
+swap their mappings; a process that still holds an old generation keeps
+reading it safely even after it is pruned from the directory.
+
+Rows upserted or removed inside a worker after the snapshot (e.g. by an
+uploader listener or the change feed) are kept in a small per-process overlay
+that takes precedence over the snapshot. When a newer generation is attached,
+overlay entries recorded before that snapshot's rows were read (`as_of`) are
+already in it and are dropped, so the overlay only ever holds what changed
+since the last snapshot. `as_of` is wall-clock time, so the builder and the
+workers must share a clock (in practice: the host of the snapshot directory).
+"""
+
+CURRENT_FILE = "CURRENT"
+VECTORS_FILE = "vectors.npy"
+KEYS_FILE = "keys.npy"
+META_FILE = "meta.json"
+GENERATION_PREFIX = "gen-"
+
+
+def _fsync_file(path: str) -> None:
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _generations(directory: str) -> List[str]:
+    return sorted(
+        name for name in os.listdir(directory)
+        if name.startswith(GENERATION_PREFIX) and name[len(GENERATION_PREFIX):].isdigit()
+    )
+
+
+def publish_snapshot(
+    directory: str,
+    keys: Sequence[str],
+    matrix: np.ndarray,
+    projection: Optional[str] = None,
+    keep: int = 2,
+    as_of: Optional[float] = None,
+) -> str:
+    """
+    Writes a new snapshot generation and makes it current.
+
+    Args:
+        directory: The snapshot directory shared with the API workers.
+        keys: Component ids, aligned with the rows of `matrix`.
+        matrix: L2-normalised embeddings, one row per key.
+        projection: Version of the projection the vectors went through, if any.
+            Readers configured with another projection refuse the snapshot.
+        keep: Generations to keep on disk, including the new one.
+        as_of: Unix time at which the rows were read; every change made before it
+            is in the snapshot. Defaults to now.
+
+    Returns:
+        The name of the new generation.
+    """
+    os.makedirs(directory, exist_ok=True)
+    existing = _generations(directory)
+    number = int(existing[-1][len(GENERATION_PREFIX):]) + 1 if existing else 1
+    generation = f"{GENERATION_PREFIX}{number:06d}"
+
+    encoded = np.array([key.encode("utf-8") for key in keys], dtype=np.bytes_)
+    order = np.argsort(encoded, kind="stable")
+    matrix = np.ascontiguousarray(np.asarray(matrix, dtype=np.float32)[order])
+    dim = matrix.shape[1] if matrix.ndim == 2 else 0
+
+    staging = os.path.join(directory, f".{generation}.tmp-{os.getpid()}")
+    os.makedirs(staging)
+    np.save(os.path.join(staging, VECTORS_FILE), matrix.reshape(len(keys), dim))
+    np.save(os.path.join(staging, KEYS_FILE), encoded[order])
+    created_at = time.time()
+    with open(os.path.join(staging, META_FILE), "wb") as f:
+        f.write(orjson.dumps({
+            "count": len(keys),
+            "dim": dim,
+            "projection": projection,
+            "created_at": created_at,
+            "as_of": as_of if as_of is not None else created_at,
+        }))
+    for name in (VECTORS_FILE, KEYS_FILE, META_FILE):
+        _fsync_file(os.path.join(staging, name))
+    os.rename(staging, os.path.join(directory, generation))
+
+    pointer = os.path.join(directory, f".{CURRENT_FILE}.tmp-{os.getpid()}")
+    with open(pointer, "w") as f:
+        f.write(generation + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    for old in _generations(directory)[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    logger.info(f"Published embedding snapshot {generation} with {len(keys)} vectors of dimension {dim}.")
+    return generation
+
+
+class _Generation:
+    """The memory-mapped arrays of one snapshot generation."""
+
+    def __init__(self, name: str, keys: np.ndarray, matrix: np.ndarray, meta: dict):
+        self.name = name
+        self.keys = keys
+        self.matrix = matrix
+        self.meta = meta
+
+    @classmethod
+    def open(cls, directory: str, name: str) -> "_Generation":
+        path = os.path.join(directory, name)
+        with open(os.path.join(path, META_FILE), "rb") as f:
+            meta = orjson.loads(f.read())
+        if meta["count"] == 0:
+            # numpy cannot map an empty array.
+            return cls(name, np.empty(0, dtype=np.bytes_), np.empty((0, meta["dim"]), dtype=np.float32), meta)
+        keys = np.load(os.path.join(path, KEYS_FILE), mmap_mode="r")
+        matrix = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        return cls(name, keys, matrix, meta)
+
+    def rows(self, keys: Iterable[str]) -> np.ndarray:
+        """Maps keys to row numbers, skipping keys that are not in the snapshot."""
+        wanted = np.array([key.encode("utf-8") for key in keys], dtype=np.bytes_)
+        if len(wanted) == 0 or len(self.keys) == 0:
+            return np.empty(0, dtype=np.int64)
+        positions = np.searchsorted(self.keys, wanted)
+        positions = np.minimum(positions, len(self.keys) - 1)
+        return positions[self.keys[positions] == wanted].astype(np.int64)
+
+
+class SharedVectorIndex:
+    """
+    Cosine-similarity search over a memory-mapped embedding snapshot.
+    Offers the parts of the `VectorIndex` interface used by `ComponentSearch`.
+    """
+
+    def __init__(self, directory: str, projection: Optional[str] = None, refresh_seconds: float = 1.0):
+        """
+        Args:
+            directory: The snapshot directory written by `publish_snapshot`.
+            projection: Version of the projection query vectors go through, if any.
+            refresh_seconds: Minimum interval between checks for a new generation.
+        """
+        self.directory = directory
+        self.projection = projection
+        self.refresh_seconds = refresh_seconds
+        self.overlay = VectorIndex()
+        # Keys upserted or removed in this process; their snapshot rows are hidden.
+        self._shadowed: set = set()
+        # When each shadowed key was last written, to drop it once a snapshot covers it.
+        self._written_at: Dict[str, float] = {}
+        self._generation: Optional[_Generation] = None
+        self._hidden = np.empty(0, dtype=np.int64)
+        self._checked_at = float("-inf")
+        self._rejected: Optional[str] = None
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    @property
+    def generation(self) -> Optional[str]:
+        return self._generation.name if self._generation is not None else None
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Attaches to the current generation if it changed. Returns True on a swap.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_seconds:
+            return False
+        self._checked_at = now
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE)) as f:
+                name = f.read().strip()
+            if name in (self.generation, self._rejected):
+                return False
+            generation = _Generation.open(self.directory, name)
+        except FileNotFoundError:
+            # No snapshot yet, or the generation was pruned between reading CURRENT and opening it.
+            return False
+        if generation.meta.get("projection") != self.projection:
+            self._rejected = name
+            logger.error(
+                f"Ignoring embedding snapshot {name}: built with projection "
+                f"{generation.meta.get('projection')}, expected {self.projection}."
+            )
+            return False
+        with self._lock:
+            self._generation = generation
+            self._drop_covered(generation.meta.get("as_of", generation.meta.get("created_at")))
+            self._update_hidden()
+        logger.info(
+            f"Attached embedding snapshot {name} ({generation.meta['count']} vectors, "
+            f"{len(self._shadowed)} overridden in this process)."
+        )
+        return True
+
+    def __len__(self) -> int:
+        self.refresh()
+        with self._lock:
+            base = len(self._generation.keys) - len(self._hidden) if self._generation is not None else 0
+            return base + len(self.overlay)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def upsert(self, key: str, vector: Sequence[float]) -> None:
+        """Overrides a key's vector in this process until the next snapshot includes it."""
+        with self._lock:
+            self.overlay.upsert(key, vector)
+            self._written_at[key] = time.time()
+            if key not in self._shadowed:
+                self._shadowed.add(key)
+                self._update_hidden()
+
+    def remove(self, key: str) -> bool:
+        """Hides a key in this process. Returns False if it was not indexed."""
+        present = key in self
+        with self._lock:
+            self.overlay.remove(key)
+            self._written_at[key] = time.time()
+            if key not in self._shadowed:
+                self._shadowed.add(key)
+                self._update_hidden()
+        return present
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Returns a copy of the normalised vector stored for a key."""
+        vector = self.overlay.get(key)
+        if vector is not None:
+            return vector
+        with self._lock:
+            generation = self._generation
+            if generation is None or key in self._shadowed:
+                return None
+        rows = generation.rows([key])
+        return np.array(generation.matrix[rows[0]]) if len(rows) else None
+
+    def search(
+        self, vector: Sequence[float], limit: int = 10, allowed: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Returns up to `limit` (key, cosine similarity) pairs, best first.
+        If `allowed` is given, only those keys are considered.
+
+        Raises:
+            ValueError: If the vector's dimension differs from the snapshot's.
+        """
+        self.refresh()
+        if allowed is not None:
+            allowed = list(allowed)
+        results = self.overlay.search(vector, limit, allowed)
+        with self._lock:
+            generation, hidden = self._generation, self._hidden
+        if generation is None or len(generation.keys) == 0 or limit <= 0:
+            return results
+
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape != (generation.matrix.shape[1],):
+            raise ValueError(
+                f"Expected a vector of dimension {generation.matrix.shape[1]}, got {query.shape}."
+            )
+        norm = float(np.linalg.norm(query))
+        if norm > 0:
+            query = query / norm
+        if allowed is None:
+            rows = None
+            scores = generation.matrix @ query
+            scores[hidden] = -np.inf
+        else:
+            rows = np.setdiff1d(generation.rows(allowed), hidden)
+            if len(rows) == 0:
+                return results
+            scores = generation.matrix[rows] @ query
+        count = min(limit, int(np.count_nonzero(scores > -np.inf)))
+        if count > 0:
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.argsort(-scores[top])]
+            for i in top:
+                row = i if rows is None else rows[i]
+                results.append((generation.keys[row].decode("utf-8"), float(scores[i])))
+        results.sort(key=lambda result: -result[1])
+        return results[:limit]
+
+    def _drop_covered(self, as_of: Optional[float]) -> None:
+        """Forgets overrides older than a snapshot, which already reflects them."""
+        if as_of is None:
+            return
+        covered = [key for key, written_at in self._written_at.items() if written_at < as_of]
+        for key in covered:
+            self.overlay.remove(key)
+            self._shadowed.discard(key)
+            del self._written_at[key]
+
+    def _update_hidden(self) -> None:
+        if self._generation is not None:
+            self._hidden = self._generation.rows(self._shadowed)
@@ -0,0 +1,22 @@
+import json
+from typing import Any, Optional
+
+"""
+Helpers for Server-Sent Events (text/event-stream) responses.
+"""
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Headers that stop proxies (e.g. nginx) from buffering the stream.
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_sse(data: Any, event: Optional[str] = None, id: Optional[Any] = None) -> str:
+    """Encodes one SSE message. `data` is serialised as JSON on a single line."""
+    lines = []
+    if id is not None:
+        lines.append(f"id: {id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
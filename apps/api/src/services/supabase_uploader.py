@@ -1,27 +1,60 @@
 import logging
 from supabase import create_client, Client
 from config.config import settings
-from typing import List
-from schemas.ats import ATSModel
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from schemas.ats import ATSModel, ATSPayload
+from services.blob_store import BlobStore, RAW_CODE_HASH_KEY, content_hash
+from services.near_duplicates import MINHASH_KEY, encode_signature, minhash_signature
+from services.write_buffer import WriteBehindBuffer
 
 logger = logging.getLogger(__name__)
 
 class SupabaseUploader:
     """Handles all interactions with the Supabase database."""
 
-    def __init__(self):
+    def __init__(self, client: Optional[Client] = None, write_behind: bool = False):
         """
         Initializes the Supabase client using credentials from the environment.
         Ensures a secure connection without hardcoding keys.
+
+        Args:
+            client: An existing client to reuse instead of creating a new one.
+            write_behind: Buffer uploads and send them in the background, see `flush`. Uploads
+                then return no row and fail only when flushed, so ingestion refuses it with
+                near-duplicate reuse or during an embedding migration.
         """
-        if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
-            logger.error("Supabase URL or Key is not configured.")
-            raise ValueError("Supabase credentials must be set in the environment.")
-        
-        self.client: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        if client is None:
+            if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
+                logger.error("Supabase URL or Key is not configured.")
+                raise ValueError("Supabase credentials must be set in the environment.")
+            client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+        self.client: Client = client
+        # rawCode lives in a content-addressed blob store rather than in each row.
+        self.blob_store = BlobStore(self.client)
+        # Callbacks notified with each upserted row, e.g. in-memory search indexes.
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+        # In write-behind mode, uploads are coalesced by (kit_id, name) and written in batches.
+        self.buffer: Optional[WriteBehindBuffer] = None
+        if write_behind:
+            self.buffer = WriteBehindBuffer(
+                self._write_buffered,
+                max_batch=settings.UPLOAD_BATCH_ROWS,
+                max_pending=settings.UPLOAD_MAX_PENDING,
+                flush_seconds=settings.UPLOAD_FLUSH_SECONDS,
+                max_attempts=settings.UPLOAD_MAX_ATTEMPTS,
+                name="component-uploads",
+            )
         logger.info("Supabase client initialized successfully.")
 
-    def upload_ats(self, ats_data: ATSModel, kit_id: str, embedding: List[float] = None) -> None:
+    def upload_ats(
+        self,
+        ats_data: ATSModel,
+        kit_id: str,
+        embedding: List[float] = None,
+        payload: Optional[ATSPayload] = None,
+        extra_columns: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
         """
         Uploads a single component's ATS data to the 'components' table.
 
@@ -29,22 +62,54 @@ class SupabaseUploader:
         existing one if a component with the same `componentName` already exists.
         This prevents creating duplicate entries.
 
+        The component's `rawCode` is written to the blob store first and only its
+        SHA-256 hash is kept in `metadata`, so identical sources are stored once.
+        In write-behind mode the row (and its blob) are only buffered: the call
+        returns None right away and listeners see the row once it is flushed.
+        A MinHash signature of the source is stored next to it for near-duplicate
+        detection (see services.near_duplicates).
+
         Args:
             ats_data: A validated Pydantic model containing the component's ATS.
+            kit_id: The design kit the component belongs to.
+            embedding: Optional embedding vector for the component.
+            payload: The already-dumped ATS from `dump_ats`, reused to avoid dumping again.
+            extra_columns: Additional columns to write, e.g. the staging embedding of a
+                version being migrated to (see services.embedding_versions).
+
+        Returns:
+            The upserted row as returned by Supabase, if any; None in write-behind mode.
 
         Raises:
             Exception: If the upload to Supabase fails.
         """
         table_name = "components"
+        if self.buffer is not None:
+            # The blob is written with the row's batch, just before it.
+            raw_code_hash = content_hash(ats_data.rawCode)
+        else:
+            raw_code_hash = self.blob_store.put(ats_data.rawCode)
+        if payload is not None:
+            metadata = {key: value for key, value in payload.data.items() if key != "rawCode"}
+        else:
+            metadata = ats_data.model_dump(exclude={"rawCode"})
+        metadata[RAW_CODE_HASH_KEY] = raw_code_hash
+        metadata[MINHASH_KEY] = encode_signature(minhash_signature(ats_data.rawCode))
+
         # Transform the ATSModel into the structure of the 'components' table.
         # This is a critical step to ensure the data we send matches the database schema.
         component_data = {
             "name": ats_data.componentName,
             "kit_id": kit_id,
-            "metadata": ats_data.model_dump(),  # Nest the entire ATS object in the metadata field
-            "embedding": embedding
+            "metadata": metadata,  # Nest the ATS object (minus the source) in the metadata field
+            "embedding": embedding,
+            **(extra_columns or {}),
         }
 
+        if self.buffer is not None:
+            self.buffer.put((kit_id, ats_data.componentName), (component_data, ats_data.rawCode))
+            return None
+
         try:
             logger.info(f"Uploading ATS for component: {ats_data.componentName} to table '{table_name}'.")
             
@@ -54,8 +119,89 @@ class SupabaseUploader:
             
             logger.info(f"Successfully uploaded ATS for {ats_data.componentName}.")
             logger.debug(f"Supabase response: {response}")
+            self._notify(response.data or [])
+            return response.data[0] if response.data else None
 
         except Exception as e:
             logger.error(f"Failed to upload ATS for {ats_data.componentName}. Error: {e}")
             # Re-raise the exception to allow the caller to handle it.
             raise
+
+    def upsert_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Upserts already-built `components` rows (name, kit_id, metadata, embedding)
+        in a single request, e.g. rows read back from an embedding export. Rows
+        are matched on (kit_id, name) like `upload_ats`.
+
+        Returns:
+            The number of rows written (or buffered, in write-behind mode).
+        """
+        if not rows:
+            return 0
+        if self.buffer is not None:
+            for row in rows:
+                self.buffer.put((row["kit_id"], row["name"]), (row, None))
+            return len(rows)
+        response = self.client.table("components").upsert(rows, on_conflict="kit_id,name").execute()
+        self._notify(response.data or [])
+        return len(response.data or [])
+
+    def flush(self) -> None:
+        """
+        Writes every buffered upload before returning; a no-op without write-behind.
+
+        Raises:
+            Exception: If a batch cannot be written. Its rows stay buffered until
+                `UPLOAD_MAX_ATTEMPTS` failures, then are written one by one.
+        """
+        if self.buffer is not None:
+            self.buffer.flush()
+
+    def close(self) -> None:
+        """Flushes buffered uploads and stops the background writer."""
+        if self.buffer is not None:
+            self.buffer.close()
+            logger.info(f"Write-behind uploads: {self.buffer.summary()}")
+
+    def _write_buffered(self, entries: List[Tuple[Dict[str, Any], Optional[str]]]) -> None:
+        # Blobs first, so no committed row references a missing blob.
+        self.blob_store.put_many(raw_code for _, raw_code in entries if raw_code is not None)
+        # PostgREST bulk upserts need the same columns in every row of a request.
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row, _ in entries:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for rows in groups.values():
+            response = self.client.table("components").upsert(rows, on_conflict="kit_id,name").execute()
+            logger.info(f"Flushed {len(rows)} buffered component upload(s).")
+            self._notify(response.data or [])
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Registers a callback invoked with every row this uploader upserts."""
+        self.listeners.append(listener)
+
+    def _notify(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            for listener in self.listeners:
+                try:
+                    listener(row)
+                except Exception as e:
+                    # A failing cache must never fail the upload itself.
+                    logger.error(f"Upload listener {listener!r} failed for {row.get('name')}: {e}")
+
+    def get_component(self, component_id: str) -> Optional[Dict[str, Any]]:
+        """Fetches one `components` row by id, or None if it does not exist."""
+        response = self.client.table("components").select("*").eq("id", component_id).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    def get_raw_code(self, metadata: Dict[str, Any]) -> Optional[str]:
+        """
+        Returns the source code for a component's metadata, fetching it from the
+        blob store on demand. Rows written before the blob store existed still
+        carry `rawCode` inline and are returned as-is.
+        """
+        if "rawCode" in metadata:
+            return metadata["rawCode"]
+        digest = metadata.get(RAW_CODE_HASH_KEY)
+        if digest is None:
+            return None
+        return self.blob_store.get(digest)
@@ -0,0 +1,275 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+"""
+Compiles `user_themes.config` CSS variables into minified CSS.
+
+A config maps variable names to values, either flat (light mode only) or split
+by mode like a shadcn registry theme:
+
+    {"primary": "oklch(0.205 0 0)", "radius": "0.625rem"}
+    {"light": {"primary": "..."}, "dark": {"primary": "..."}, "theme": {"font-sans": "..."}}
+    {"cssVars": {"light": {...}, "dark": {...}}}
+
+`light` and `theme` variables are emitted under `:root`, `dark` under `.dark`.
+A theme can be merged over its kit's defaults (`design_kits.theme`, same format),
+variable by variable.
+
+The CSS is identified by the SHA-256 of the canonical (sorted, merged) variables,
+so the same theme always compiles to the same URL and ETag; compiled output is
+memoized by that hash. Themes are compiled when saved and the CSS is stored next
+to the config, together with the revision (`updated_at`) of the kit defaults it
+was merged over. Serving a theme by id only compiles again when the kit has
+changed since; hash URLs keep serving the CSS they were issued for:
+
+    alter table user_themes
+        add column kit_id uuid references design_kits (id),
+        add column kit_revision timestamptz,
+        add column css text,
+        add column css_hash text;
+    create index user_themes_css_hash on user_themes (css_hash);
+    alter table design_kits add column theme jsonb;
+
+`design_kits.updated_at` is maintained by a trigger, see services.change_feed.
+"""
+
+THEME_TABLE = "user_themes"
+# Bumped when the generated CSS changes for the same input, so cached URLs change too.
+COMPILER_VERSION = 1
+
+SCOPES = {"theme": ":root", "light": ":root", "dark": ".dark"}
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+# Characters that could close the declaration or the rule and inject other CSS.
+_UNSAFE_VALUE_RE = re.compile(r"[;{}<>\\]|/\*")
+
+
+@dataclass(frozen=True)
+class CompiledTheme:
+    hash: str
+    css: str
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.hash}"'
+
+
+def theme_variables(config: Optional[Mapping[str, Any]]) -> Dict[str, Dict[str, str]]:
+    """
+    Normalizes a theme config to {selector: {"--name": value}}.
+
+    Raises:
+        ValueError: If a variable name or value is not valid CSS.
+    """
+    config = dict(config or {})
+    if isinstance(config.get("cssVars"), Mapping):
+        config = dict(config["cssVars"])
+    if not any(isinstance(config.get(mode), Mapping) for mode in SCOPES):
+        config = {"light": config}
+    scopes: Dict[str, Dict[str, str]] = {}
+    for mode, selector in SCOPES.items():
+        for name, value in (config.get(mode) or {}).items():
+            scopes.setdefault(selector, {})[_variable_name(name)] = _variable_value(name, value)
+    return scopes
+
+
+def _variable_name(name: str) -> str:
+    bare = str(name)[2:] if str(name).startswith("--") else str(name)
+    if not _NAME_RE.match(bare):
+        raise ValueError(f"Invalid CSS variable name: {name!r}")
+    return f"--{bare}"
+
+
+def _variable_value(name: str, value: Any) -> str:
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"CSS variable {name!r} must be a string or number.")
+    text = " ".join(str(value).split())
+    if not text or _UNSAFE_VALUE_RE.search(text):
+        raise ValueError(f"Invalid value for CSS variable {name!r}: {value!r}")
+    return text
+
+
+def merge_variables(
+    base: Mapping[str, Mapping[str, str]], override: Mapping[str, Mapping[str, str]]
+) -> Dict[str, Dict[str, str]]:
+    """Overlays one normalized theme on another, variable by variable."""
+    merged = {selector: dict(variables) for selector, variables in base.items()}
+    for selector, variables in override.items():
+        merged.setdefault(selector, {}).update(variables)
+    return merged
+
+
+def theme_hash(variables: Mapping[str, Mapping[str, str]]) -> str:
+    """The content hash of normalized variables, independent of key order."""
+    canonical = orjson.dumps({"v": COMPILER_VERSION, "vars": variables}, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(canonical).hexdigest()
+
+
+def render_css(variables: Mapping[str, Mapping[str, str]]) -> str:
+    """Renders normalized variables as minified CSS, `:root` first."""
+    rules = []
+    for selector in sorted(variables, key=lambda s: (s != ":root", s)):
+        declarations = ";".join(f"{name}:{value}" for name, value in sorted(variables[selector].items()))
+        if declarations:
+            rules.append(f"{selector}{{{declarations}}}")
+    return "".join(rules)
+
+
+class ThemeCompiler:
+    """Compiles theme configs to CSS, memoizing the output by content hash."""
+
+    def __init__(self, max_cached: int = 1024):
+        self.max_cached = max_cached
+        self._compiled: "OrderedDict[str, CompiledTheme]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(
+        self, config: Optional[Mapping[str, Any]], defaults: Optional[Mapping[str, Any]] = None
+    ) -> CompiledTheme:
+        """
+        Compiles a theme config, optionally merged over a kit's default theme.
+
+        Raises:
+            ValueError: If either config contains invalid variables.
+        """
+        variables = theme_variables(config)
+        if defaults:
+            variables = merge_variables(theme_variables(defaults), variables)
+        digest = theme_hash(variables)
+        compiled = self.cached(digest)
+        if compiled is None:
+            compiled = CompiledTheme(digest, render_css(variables))
+            self.remember(compiled)
+        return compiled
+
+    def cached(self, digest: str) -> Optional[CompiledTheme]:
+        with self._lock:
+            compiled = self._compiled.get(digest)
+            if compiled is not None:
+                self._compiled.move_to_end(digest)
+            return compiled
+
+    def remember(self, compiled: CompiledTheme) -> None:
+        with self._lock:
+            self._compiled[compiled.hash] = compiled
+            self._compiled.move_to_end(compiled.hash)
+            while len(self._compiled) > self.max_cached:
+                self._compiled.popitem(last=False)
+
+
+class ThemeStore:
+    """Saves user themes with their precompiled CSS and serves the CSS back."""
+
+    def __init__(self, client, compiler: Optional[ThemeCompiler] = None):
+        self.client = client
+        self.compiler = compiler or ThemeCompiler()
+
+    def kit_defaults(self, kit_id: Optional[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Returns a kit's default theme and its revision; (None, None) without a kit."""
+        if not kit_id:
+            return None, None
+        response = (
+            self.client.table("design_kits").select("id,theme,updated_at").eq("id", kit_id).limit(1).execute()
+        )
+        if not response.data:
+            raise LookupError(f"Design kit {kit_id} not found.")
+        return response.data[0].get("theme"), response.data[0].get("updated_at")
+
+    def compile(self, config: Mapping[str, Any], kit_id: Optional[str] = None) -> CompiledTheme:
+        """Compiles a config over its kit's defaults without saving it, e.g. for previews."""
+        defaults, _ = self.kit_defaults(kit_id)
+        return self.compiler.compile(config, defaults)
+
+    def save(
+        self,
+        theme_id: str,
+        user_id: str,
+        name: str,
+        config: Mapping[str, Any],
+        kit_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Upserts a theme together with its compiled CSS.
+
+        Raises:
+            ValueError: If the config contains invalid variables.
+            LookupError: If `kit_id` does not exist.
+        """
+        defaults, kit_revision = self.kit_defaults(kit_id)
+        compiled = self.compiler.compile(config, defaults)
+        row = {
+            "id": theme_id,
+            "user_id": user_id,
+            "name": name,
+            "config": dict(config),
+            "kit_id": kit_id,
+            "kit_revision": kit_revision,
+            "css": compiled.css,
+            "css_hash": compiled.hash,
+        }
+        response = self.client.table(THEME_TABLE).upsert(row, on_conflict="id").execute()
+        logger.info(f"Saved theme {theme_id} ({len(compiled.css)} bytes of CSS, {compiled.hash[:12]}).")
+        return response.data[0] if response.data else row
+
+    def theme_hash(self, theme_id: str) -> Optional[str]:
+        """
+        The hash of a theme's current CSS, or None if the theme does not exist.
+        A theme whose kit defaults changed since it was saved is compiled and saved again first.
+        """
+        response = (
+            self.client.table(THEME_TABLE)
+            .select("id,user_id,name,config,kit_id,kit_revision,css_hash")
+            .eq("id", theme_id)
+            .limit(1)
+            .execute()
+        )
+        if not response.data:
+            return None
+        row = response.data[0]
+        if row.get("kit_id"):
+            try:
+                _, kit_revision = self.kit_defaults(row["kit_id"])
+            except LookupError:
+                # The kit was deleted; keep serving the CSS compiled over its last defaults.
+                return row["css_hash"]
+            if kit_revision != row.get("kit_revision"):
+                logger.info(f"Recompiling theme {theme_id}: the defaults of kit {row['kit_id']} changed.")
+                try:
+                    row = self.save(row["id"], row["user_id"], row["name"], row["config"], row["kit_id"])
+                except ValueError as e:
+                    logger.error(f"Keeping the previous CSS of theme {theme_id}: {e}")
+        return row["css_hash"]
+
+    def css(self, digest: str) -> Optional[CompiledTheme]:
+        """Returns compiled CSS by hash, from memory or from any theme saved with it."""
+        compiled = self.compiler.cached(digest)
+        if compiled is not None:
+            return compiled
+        response = self.client.table(THEME_TABLE).select("css,css_hash").eq("css_hash", digest).limit(1).execute()
+        if not response.data or response.data[0].get("css") is None:
+            return None
+        compiled = CompiledTheme(digest, response.data[0]["css"])
+        self.compiler.remember(compiled)
+        return compiled
+
+
+_theme_store: Optional[ThemeStore] = None
+
+
+def get_theme_store() -> ThemeStore:
+    """Returns the process-wide theme store. Used as a FastAPI dependency."""
+    global _theme_store
+    if _theme_store is None:
+        from db.db import supabase_client
+
+        _theme_store = ThemeStore(supabase_client)
+    return _theme_store
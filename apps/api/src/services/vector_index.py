@@ -0,0 +1,133 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+"""
+An in-memory cosine-similarity index over component embeddings.
+
+Vectors are L2-normalised on insert and kept in one contiguous float32 matrix, so a
+query is a single matrix-vector product. Removal swaps the last row into the freed
+slot to keep the matrix dense.
+"""
+
+
+def coerce_vector(value) -> Optional[np.ndarray]:
+    """
+    Converts an embedding as returned by Supabase into a float32 array.
+    pgvector columns come back from PostgREST as a string such as "[0.1,0.2]".
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = orjson.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+class VectorIndex:
+    """Exact cosine-similarity search keyed by component id."""
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 256):
+        self.dim = dim
+        self._matrix = np.zeros((initial_capacity, dim or 0), dtype=np.float32)
+        self._keys: List[str] = []
+        self._row_by_key: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._row_by_key
+
+    def upsert(self, key: str, vector: Sequence[float]) -> None:
+        """Adds or replaces the vector stored for a key."""
+        vector = np.asarray(vector, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vector.shape[0]
+            self._matrix = np.zeros((self._matrix.shape[0], self.dim), dtype=np.float32)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Expected a vector of dimension {self.dim}, got {vector.shape}.")
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector = vector / norm
+
+        with self._lock:
+            row = self._row_by_key.get(key)
+            if row is None:
+                row = len(self._keys)
+                if row == self._matrix.shape[0]:
+                    grown = np.zeros((max(1, row * 2), self.dim), dtype=np.float32)
+                    grown[:row] = self._matrix[:row]
+                    self._matrix = grown
+                self._keys.append(key)
+                self._row_by_key[key] = row
+            self._matrix[row] = vector
+
+    def remove(self, key: str) -> bool:
+        """Removes a key. Returns False if it was not indexed."""
+        with self._lock:
+            row = self._row_by_key.pop(key, None)
+            if row is None:
+                return False
+            last = len(self._keys) - 1
+            if row != last:
+                moved = self._keys[last]
+                self._matrix[row] = self._matrix[last]
+                self._keys[row] = moved
+                self._row_by_key[moved] = row
+            self._keys.pop()
+            return True
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Returns a copy of the normalised vector stored for a key."""
+        with self._lock:
+            row = self._row_by_key.get(key)
+            return None if row is None else self._matrix[row].copy()
+
+    def snapshot(self) -> Tuple[List[str], np.ndarray]:
+        """Returns the keys and a copy of their normalised vectors, row-aligned."""
+        with self._lock:
+            return list(self._keys), self._matrix[: len(self._keys)].copy()
+
+    def scores(self, vector: Sequence[float]) -> Tuple[List[str], np.ndarray]:
+        """Returns every key with its cosine similarity to the vector, row-aligned and unsorted."""
+        query = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm > 0:
+            query = query / norm
+        with self._lock:
+            count = len(self._keys)
+            return list(self._keys), self._matrix[:count] @ query
+
+    def search(
+        self, vector: Sequence[float], limit: int = 10, allowed: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Returns up to `limit` (key, cosine similarity) pairs, best first.
+        If `allowed` is given, only those keys are considered.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm > 0:
+            query = query / norm
+        with self._lock:
+            count = len(self._keys)
+            if count == 0 or limit <= 0:
+                return []
+            if allowed is None:
+                rows = np.arange(count)
+                scores = self._matrix[:count] @ query
+            else:
+                rows = np.fromiter(
+                    (self._row_by_key[key] for key in allowed if key in self._row_by_key),
+                    dtype=np.int64,
+                )
+                if len(rows) == 0:
+                    return []
+                scores = self._matrix[rows] @ query
+            limit = min(limit, len(rows))
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            return [(self._keys[rows[i]], float(scores[i])) for i in top]
@@ -0,0 +1,227 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+"""
+A write-behind buffer: callers hand over writes and return immediately, while a
+background thread sends them in batches.
+
+Writes are coalesced by key, so a component upserted several times before the
+next flush is sent once, with its last value. A batch is flushed as soon as
+`max_batch` keys are pending, or `flush_seconds` after the previous flush. When
+`max_pending` keys are waiting, `put` blocks until a flush makes room, so a slow
+database slows producers down instead of growing memory without bound.
+
+A failed batch is put back (unless newer writes for the same keys arrived in the
+meantime) and retried on the next flush. Once a batch has failed `max_attempts`
+times it is split and its items are written one at a time, so a single bad row
+cannot hold back the rest: items that still fail are logged, kept in
+`dead_letters` and dropped from the buffer. `close` flushes whatever is left and
+is also registered to run at interpreter exit.
+"""
+
+Batch = List[Tuple[Hashable, Any]]
+
+
+class WriteBehindBuffer:
+    """Coalesces writes by key and flushes them in batches from a background thread."""
+
+    def __init__(
+        self,
+        write: Callable[[List[Any]], None],
+        max_batch: int = 200,
+        max_pending: int = 2000,
+        flush_seconds: float = 1.0,
+        max_attempts: int = 5,
+        name: str = "write-behind",
+    ):
+        """
+        Args:
+            write: Sends one batch of items; raising leaves them in the buffer.
+            max_batch: Keys per batch; reaching it triggers a flush.
+            max_pending: Keys buffered before `put` blocks.
+            flush_seconds: Longest time a write waits before being flushed.
+            max_attempts: Failed writes of a batch before its items are written one by one.
+            name: Name of the flush thread, for logs.
+        """
+        if max_pending < max_batch:
+            raise ValueError("max_pending must be at least max_batch.")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        self.write = write
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+        self.name = name
+        self.stats = {
+            "puts": 0, "coalesced": 0, "written": 0, "batches": 0, "failures": 0, "blocked": 0, "dropped": 0,
+        }
+        # (key, item, error) of the most recent items that could not be written and were dropped.
+        self.dead_letters: "deque[Tuple[Hashable, Any, str]]" = deque(maxlen=max_pending)
+        self._pending: "OrderedDict[Hashable, Any]" = OrderedDict()
+        # Failed writes per buffered key; a newer write for the key starts over.
+        self._attempts: Dict[Hashable, int] = {}
+        self._cond = threading.Condition()
+        # Held while a batch is taken and written, so batches reach the database in order.
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def put(self, key: Hashable, item: Any, timeout: Optional[float] = None) -> None:
+        """
+        Buffers `item`, replacing any pending item with the same key.
+
+        Raises:
+            TimeoutError: If the buffer stayed full for `timeout` seconds.
+            RuntimeError: If the buffer is closed.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} buffer is closed.")
+            self.stats["puts"] += 1
+            if key in self._pending:
+                self._pending[key] = item
+                self._attempts.pop(key, None)
+                self.stats["coalesced"] += 1
+                return
+            if len(self._pending) >= self.max_pending:
+                self.stats["blocked"] += 1
+                self._cond.notify_all()
+                if not self._cond.wait_for(lambda: len(self._pending) < self.max_pending or self._closed, timeout):
+                    raise TimeoutError(f"{self.name} buffer stayed full for {timeout}s.")
+                if self._closed:
+                    raise RuntimeError(f"{self.name} buffer is closed.")
+            self._pending[key] = item
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+
+    def flush(self) -> None:
+        """
+        Writes everything buffered so far before returning.
+
+        Raises:
+            Exception: The error of the first batch that could not be written.
+        """
+        with self._write_lock:
+            while self._write_batch(raise_errors=True):
+                pass
+
+    def close(self) -> None:
+        """Stops the flush thread and writes the remaining items."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"{self.name}: {len(self)} buffered write(s) could not be flushed on close: {e}")
+            raise
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.max_batch, timeout=self.flush_seconds
+                )
+                if self._closed:
+                    return
+            with self._write_lock:
+                failed = not self._write_batch(raise_errors=False) and len(self) > 0
+            if failed:
+                # Back off before retrying; producers are held back by max_pending.
+                time.sleep(self.flush_seconds)
+
+    def _take(self) -> Batch:
+        with self._cond:
+            batch = []
+            while self._pending and len(batch) < self.max_batch:
+                batch.append(self._pending.popitem(last=False))
+            # Room was made for blocked producers.
+            self._cond.notify_all()
+            return batch
+
+    def _requeue(self, batch: Batch) -> int:
+        """Puts a failed batch back in front; returns the most failed writes of any requeued item."""
+        attempts = 0
+        with self._cond:
+            for key, item in reversed(batch):
+                if key in self._pending:
+                    # Superseded by a newer write, which gets attempts of its own.
+                    self._attempts.pop(key, None)
+                    continue
+                self._pending[key] = item
+                self._pending.move_to_end(key, last=False)
+                self._attempts[key] = self._attempts.get(key, 0) + 1
+                attempts = max(attempts, self._attempts[key])
+        return attempts
+
+    def _forget(self, batch: Batch) -> None:
+        with self._cond:
+            for key, _ in batch:
+                self._attempts.pop(key, None)
+
+    def _write_one_by_one(self, batch: Batch) -> None:
+        """Writes a repeatedly failing batch item by item, dropping the items that still fail."""
+        for key, item in batch:
+            try:
+                self.write([item])
+            except Exception as e:
+                self.stats["dropped"] += 1
+                self.dead_letters.append((key, item, str(e)))
+                logger.error(f"{self.name}: dropping buffered item {key!r} after {self.max_attempts} failed writes: {e}")
+                continue
+            self.stats["written"] += 1
+            self.stats["batches"] += 1
+        self._forget(batch)
+
+    def _write_batch(self, raise_errors: bool) -> bool:
+        """Writes one batch; returns whether it left the buffer. Caller must hold the write lock."""
+        batch = self._take()
+        if not batch:
+            return False
+        started = time.perf_counter()
+        try:
+            self.write([item for _, item in batch])
+        except Exception as e:
+            self.stats["failures"] += 1
+            if self._requeue(batch) >= self.max_attempts:
+                logger.error(f"{self.name}: writing {len(batch)} buffered item(s) failed again; writing them one by one: {e}")
+                # Take back exactly the exhausted items; newer writes for other keys stay buffered.
+                with self._cond:
+                    exhausted = [
+                        (key, self._pending.pop(key))
+                        for key, _ in batch
+                        if self._attempts.get(key, 0) >= self.max_attempts and key in self._pending
+                    ]
+                    self._cond.notify_all()
+                self._write_one_by_one(exhausted)
+                return True
+            logger.error(f"{self.name}: writing {len(batch)} buffered item(s) failed; will retry: {e}")
+            if raise_errors:
+                raise
+            return False
+        self._forget(batch)
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        logger.debug(f"{self.name}: wrote {len(batch)} item(s) in {time.perf_counter() - started:.3f}s.")
+        return True
+
+    def summary(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self.stats, pending=len(self._pending))
@@ -0,0 +1,104 @@
+from unittest.mock import MagicMock
+
+import dspy
+import pytest
+
+from agents.ats_creator import ATSCreator
+
+
+def make_spec(index, name):
+    return {
+        "id": index,
+        "componentName": name,
+        "description": f"The {name} component.",
+        "dependencies": ["react"],
+        "internalDependencies": ["@/lib/utils"],
+        "propsInterface": {"size": {"type": "string", "optional": True, "options": ["sm", "lg"]}},
+        "tags": ["ui"],
+    }
+
+
+def single_prediction(name):
+    return dspy.Prediction(
+        componentName=name,
+        description=f"The {name} component.",
+        dependencies='["react"]',
+        internalDependencies="[]",
+        propsInterface="{}",
+        tags='["ui"]',
+    )
+
+
+@pytest.fixture
+def component_files(tmp_path):
+    paths = []
+    for name in ["Badge", "Label", "Separator", "Skeleton"]:
+        path = tmp_path / f"{name.lower()}.tsx"
+        path.write_text(f'import {{ cn }} from "@/lib/utils"\nexport function {name}() {{ return <div /> }}\n')
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def creator():
+    creator = ATSCreator(token_budget=10_000)
+    creator.predictor = MagicMock(side_effect=lambda **kwargs: single_prediction("Single"))
+    creator.packed_predictor = MagicMock()
+    return creator
+
+
+def test_small_components_share_one_call(creator, component_files):
+    creator.packed_predictor.return_value = dspy.Prediction(
+        specs=[make_spec(i, name) for i, name in enumerate(["Badge", "Label", "Separator", "Skeleton"])]
+    )
+
+    results = creator.create_ats_for_files(component_files, pack_token_budget=1000, max_pack_size=8)
+
+    assert creator.packed_predictor.call_count == 1
+    assert creator.predictor.call_count == 0
+    assert list(results) == component_files
+    assert [ats.componentName for ats in results.values()] == ["Badge", "Label", "Separator", "Skeleton"]
+    badge = results[component_files[0]]
+    assert badge.rawCode.startswith('import { cn } from "@/lib/utils"')
+    assert badge.propsInterface["size"].isOptional is True
+
+
+def test_packs_respect_max_size(creator, component_files):
+    creator.packed_predictor.side_effect = [
+        dspy.Prediction(specs=[make_spec(0, "Badge"), make_spec(1, "Label")]),
+        dspy.Prediction(specs=[make_spec(0, "Separator"), make_spec(1, "Skeleton")]),
+    ]
+
+    results = creator.create_ats_for_files(component_files, pack_token_budget=1000, max_pack_size=2)
+
+    assert creator.packed_predictor.call_count == 2
+    assert [ats.componentName for ats in results.values()] == ["Badge", "Label", "Separator", "Skeleton"]
+
+
+def test_invalid_or_missing_entries_fall_back_to_single_calls(creator, component_files):
+    broken = make_spec(1, "Label")
+    del broken["description"]
+    creator.packed_predictor.return_value = dspy.Prediction(
+        specs=[make_spec(0, "Badge"), broken, make_spec(3, "Skeleton")]
+    )
+
+    results = creator.create_ats_for_files(component_files, pack_token_budget=1000, max_pack_size=8)
+
+    assert creator.predictor.call_count == 2
+    assert [ats.componentName for ats in results.values()] == ["Badge", "Single", "Single", "Skeleton"]
+
+
+def test_failed_packed_call_falls_back_for_every_component(creator, component_files):
+    creator.packed_predictor.side_effect = ValueError("could not parse specs")
+
+    results = creator.create_ats_for_files(component_files, pack_token_budget=1000, max_pack_size=8)
+
+    assert creator.predictor.call_count == len(component_files)
+    assert all(ats.componentName == "Single" for ats in results.values())
+
+
+def test_component_over_pack_budget_is_sent_alone(creator, component_files):
+    results = creator.create_ats_for_files(component_files[:1], pack_token_budget=5, max_pack_size=8)
+
+    creator.packed_predictor.assert_not_called()
+    assert results[component_files[0]].componentName == "Single"
@@ -0,0 +1,91 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import dspy
+from dspy.streaming import StreamResponse
+from fastapi.testclient import TestClient
+
+from agents.ats_creator import ATSCreator
+from agents.source_analysis import extract_static_fields
+from main import app
+from routers.ats import get_ats_creator
+
+CODE = """import * as React from "react"
+import { Slot } from "@radix-ui/react-slot"
+import { cn } from "@/lib/utils"
+
+function Button({ asChild }: { asChild?: boolean }) {
+  const Comp = asChild ? Slot : "button"
+  return <Comp className={cn("btn")} />
+}
+
+export { Button }
+"""
+
+PREDICTION = dspy.Prediction(
+    componentName="Button",
+    description="A clickable button.",
+    dependencies='["react", "@radix-ui/react-slot"]',
+    internalDependencies='["@/lib/utils"]',
+    propsInterface='{"asChild": {"type": "boolean", "optional": true}}',
+    tags='["button", "ui"]',
+)
+
+
+def fake_program(prediction):
+    async def program(**kwargs):
+        yield StreamResponse("predictor", "description", "A clickable ", False)
+        yield StreamResponse("predictor", "description", "button.", True)
+        yield prediction
+    return lambda: program
+
+
+async def collect(creator, code):
+    return [event async for event in creator.stream_ats(code)]
+
+
+def test_extract_static_fields():
+    fields = extract_static_fields(CODE)
+    assert fields["componentName"] == "Button"
+    assert fields["dependencies"] == ["react", "@radix-ui/react-slot"]
+    assert fields["internalDependencies"] == ["@/lib/utils"]
+    assert fields["rawCode"] == CODE
+
+
+def test_stream_ats_emits_static_then_deltas_then_final():
+    creator = ATSCreator()
+    with patch.object(creator, "_streaming_program", fake_program(PREDICTION)):
+        events = asyncio.run(collect(creator, CODE))
+    assert [e["event"] for e in events] == ["static", "delta", "delta", "final"]
+    assert events[0]["data"]["componentName"] == "Button"
+    assert "".join(e["data"]["chunk"] for e in events[1:3]) == "A clickable button."
+    final = events[-1]["data"]
+    assert final["rawCode"] == CODE
+    assert final["propsInterface"]["asChild"]["isOptional"] is True
+
+
+def test_stream_ats_reports_invalid_output():
+    creator = ATSCreator()
+    bad = PREDICTION.copy(tags="not json")
+    with patch.object(creator, "_streaming_program", fake_program(bad)):
+        events = asyncio.run(collect(creator, CODE))
+    assert events[-1]["event"] == "error"
+
+
+def test_stream_endpoint_sends_sse():
+    creator = ATSCreator()
+    app.dependency_overrides[get_ats_creator] = lambda: creator
+    try:
+        with patch.object(creator, "_streaming_program", fake_program(PREDICTION)):
+            response = TestClient(app).post("/api/v1/ats/stream", json={"code": CODE})
+        empty = TestClient(app).post("/api/v1/ats/stream", json={"code": "  "})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert events == ["static", "delta", "delta", "final"]
+    final = json.loads(response.text.strip().split("\n\n")[-1].split("data: ", 1)[1])
+    assert final["componentName"] == "Button"
+    assert empty.status_code == 400
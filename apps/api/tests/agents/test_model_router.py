@@ -0,0 +1,97 @@
+import json
+from unittest.mock import MagicMock
+
+import dspy
+import pytest
+
+from agents.ats_creator import ATSCreator
+from agents.model_router import ModelRouter
+from agents.source_analysis import component_complexity
+
+SIMPLE = 'import { cn } from "@/lib/utils"\nexport function Badge() { return <span className={cn("badge")} /> }\n'
+
+COMPLEX = """import * as React from "react"
+import { cva } from "class-variance-authority"
+const variants = cva("base", { variants: { size: { sm: "a", lg: "b" } } })
+const Ctx = React.createContext(null)
+export const Dialog = React.forwardRef((props, ref) => {
+  React.useEffect(() => {}, [])
+  React.useImperativeHandle(ref, () => ({}))
+  return null
+})
+export const DialogTitle = ({ a, b }: { a?: string; b?: string; c?: number; d?: boolean }) => null
+export { DialogContent, DialogFooter, DialogHeader }
+"""
+
+
+@pytest.fixture
+def router():
+    return ModelRouter(["fast", "standard", "strong"], fast_max_tokens=200, fast_max_complexity=10, lm_factory=lambda model: model)
+
+
+def test_complexity_scores_structure():
+    assert component_complexity(SIMPLE) == 1
+    assert component_complexity(COMPLEX) > 10
+
+
+def test_simple_components_use_fast_tier(router):
+    assert router.choose_tier(SIMPLE) == 0
+    assert router.choose_tier(COMPLEX) == 1
+    assert router.choose_tier(SIMPLE * 50) == 1
+
+
+def test_escalates_on_invalid_output_and_records_stats(router):
+    seen = []
+
+    def attempt(lm):
+        seen.append(lm)
+        if lm == "fast":
+            return json.loads("not json")
+        return "ats"
+
+    assert router.run(SIMPLE, attempt) == "ats"
+    assert seen == ["fast", "standard"]
+    summary = router.summary()
+    assert summary["fast"]["escalations"] == 1
+    assert summary["fast"]["success_rate"] == 0
+    assert summary["standard"]["success_rate"] == 1
+    assert summary["strong"]["attempts"] == 0
+
+
+def test_last_tier_failure_raises(router):
+    with pytest.raises(json.JSONDecodeError):
+        router.run(COMPLEX, lambda lm: json.loads("not json"))
+    assert router.summary()["strong"]["attempts"] == 1
+
+
+def test_other_errors_do_not_escalate(router):
+    def attempt(lm):
+        raise ConnectionError("quota exceeded")
+
+    with pytest.raises(ConnectionError):
+        router.run(SIMPLE, attempt)
+    summary = router.summary()
+    assert summary["fast"]["errors"] == 1
+    assert summary["standard"]["attempts"] == 0
+
+
+def test_ats_creator_escalates_to_valid_output(router, tmp_path):
+    path = tmp_path / "badge.tsx"
+    path.write_text(SIMPLE)
+    valid = dict(
+        componentName="Badge",
+        description="A badge.",
+        dependencies="[]",
+        internalDependencies='["@/lib/utils"]',
+        propsInterface="{}",
+        tags='["badge"]',
+    )
+    creator = ATSCreator(router=router)
+    creator.predictor = MagicMock(side_effect=lambda component_code, lm: dspy.Prediction(
+        **{**valid, "tags": "oops"} if lm == "fast" else valid
+    ))
+
+    ats = creator.create_ats_from_file(str(path))
+
+    assert ats.componentName == "Badge"
+    assert [call.kwargs["lm"] for call in creator.predictor.call_args_list] == ["fast", "standard"]
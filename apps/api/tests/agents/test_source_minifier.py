@@ -0,0 +1,166 @@
+from unittest.mock import MagicMock
+
+import dspy
+
+from agents.ats_creator import ATSCreator
+from agents.source_analysis import parse_imports
+from agents.source_minifier import (
+    ELISION,
+    TRUNCATION_MARKER,
+    estimate_tokens,
+    fit_to_budget,
+    minify_source,
+)
+
+CLASSES = "inline-flex items-center justify-center gap-2 whitespace-nowrap rounded-md text-sm font-medium"
+
+CODE = f'''/**
+ * Button component.
+ * Licensed under MIT.
+ */
+import * as React from "react"
+import {{ cva }} from "class-variance-authority"
+import {{ cn }} from "@/lib/utils"
+
+// Variants shared by every button.
+const buttonVariants = cva("{CLASSES}", {{
+  variants: {{
+    size: {{ sm: "h-8", lg: "h-10" }},  // trailing comment
+  }},
+}})
+
+const url = "https://example.com/a"
+const pattern = /\\/\\/"not a string/g
+
+export function Button({{ className }}: {{ className?: string }}) {{
+  return <button className={{cn(buttonVariants(), className)}} />
+}}
+'''
+
+
+def test_minify_strips_comments_and_whitespace():
+    minified = minify_source(CODE)
+
+    assert "Licensed" not in minified
+    assert "Variants shared" not in minified
+    assert "trailing comment" not in minified
+    assert "\n\n" not in minified
+    assert "  " not in minified
+    assert "export function Button" in minified
+
+
+def test_minify_keeps_comment_like_text_in_strings_and_regexes():
+    minified = minify_source(CODE)
+
+    assert '"https://example.com/a"' in minified
+    assert '/\\/\\/"not a string/g' in minified
+
+
+def test_minify_elides_long_strings_but_not_import_specifiers():
+    code = f'import {{ Thing }} from "@/components/ui/some-really-long-component-module-name"\nconst c = "{CLASSES}"\n'
+
+    minified = minify_source(code, max_string_length=24)
+
+    assert CLASSES not in minified
+    assert ELISION in minified
+    assert parse_imports(minified) == ["@/components/ui/some-really-long-component-module-name"]
+    assert CLASSES in minify_source(code, elide_strings=False)
+
+
+def test_minify_keeps_template_literals_and_jsx_closing_tags():
+    code = 'const a = `${b} // not a comment`\nconst el = <div>text</div>\nconst x = a / 2 / b\n'
+
+    minified = minify_source(code)
+
+    assert "`${b} // not a comment`" in minified
+    assert "</div>" in minified
+    assert "a / 2 / b" in minified
+
+
+def test_minify_keeps_slashes_and_apostrophes_in_jsx_text():
+    code = (
+        "export const Link = () => <a href='http://x'>http://x</a> // link\n"
+        "export const Note = () => (\n"
+        "  <p className=\"note\">Don't // stop, it's <b>bold </b>fine</p>\n"
+        ")\n"
+        "// Trailing comment.\n"
+    )
+
+    minified = minify_source(code)
+
+    assert "<a href='http://x'>http://x</a>" in minified
+    assert "<p className=\"note\">Don't // stop, it's <b>bold </b>fine</p>" in minified
+    assert "link" not in minified
+    assert "Trailing" not in minified
+
+
+def test_minify_scans_code_inside_template_expressions():
+    code = 'const s = `a ${cond ? `http://${host}` : "}"} b // kept` // dropped\nconst t = "it\'s // kept" // dropped\n'
+
+    minified = minify_source(code)
+
+    assert '`a ${cond ? `http://${host}` : "}"} b // kept`' in minified
+    assert '"it\'s // kept"' in minified
+    assert "dropped" not in minified
+
+
+def test_minify_strips_comments_in_jsx_expressions_only():
+    code = (
+        "const List = () => <ul {...props} data-x={`${a}//b`}>\n"
+        "  {/* hidden */}\n"
+        "  {items.map((i) => <li key={i}>{i}</li>) // dropped\n"
+        "  }\n"
+        "</ul>\n"
+        "const id = <T,>(x: T) => x // dropped\n"
+        "if (a < b && c > d) { x = y } // dropped\n"
+    )
+
+    minified = minify_source(code)
+
+    assert "hidden" not in minified and "dropped" not in minified
+    assert "data-x={`${a}//b`}" in minified
+    assert "<li key={i}>{i}</li>" in minified
+    assert "const id = <T,>(x: T) => x\n" in minified
+    assert "if (a < b && c > d) { x = y }" in minified
+
+
+def test_fit_to_budget_reports_tokens_saved():
+    result = fit_to_budget(CODE, budget=10_000)
+
+    assert not result.truncated
+    assert result.original_tokens == estimate_tokens(CODE)
+    assert result.tokens_saved > 0
+
+
+def test_fit_to_budget_truncates_on_line_boundaries():
+    code = "".join(f"export const Value{i} = {i}\n" for i in range(200))
+
+    result = fit_to_budget(code, budget=100)
+
+    assert result.truncated
+    assert result.tokens <= 100
+    assert result.code.endswith(TRUNCATION_MARKER)
+    assert result.code.startswith("export const Value0 = 0\n")
+    body = result.code[: -len(TRUNCATION_MARKER)]
+    assert all(line.startswith("export const Value") for line in body.splitlines())
+
+
+def test_ats_creator_sends_minified_code_and_keeps_raw_code(tmp_path):
+    path = tmp_path / "button.tsx"
+    path.write_text(CODE)
+    creator = ATSCreator(token_budget=10_000)
+    creator.predictor = MagicMock(return_value=dspy.Prediction(
+        componentName="Button",
+        description="A button.",
+        dependencies='["react", "class-variance-authority"]',
+        internalDependencies='["@/lib/utils"]',
+        propsInterface="{}",
+        tags='["button"]',
+    ))
+
+    ats = creator.create_ats_from_file(str(path))
+
+    sent = creator.predictor.call_args.kwargs["component_code"]
+    assert "Licensed" not in sent
+    assert ats.rawCode == CODE
+    assert creator.minify_results[str(path)].tokens_saved > 0
@@ -0,0 +1,24 @@
+"""
+Builders for the models tests upload through the fake Supabase client.
+"""
+from typing import Any, Optional
+
+from schemas.ats import ATSModel
+
+
+def make_ats(name: str = "Button", raw_code: Optional[str] = None, description: Optional[str] = None, **fields: Any) -> ATSModel:
+    """
+    Returns a minimal ATS for `name`. Any other ATSModel field can be overridden
+    by keyword, e.g. `tags=["button"]`.
+    """
+    values = {
+        "componentName": name,
+        "description": description if description is not None else f"The {name} component.",
+        "dependencies": ["react"],
+        "internalDependencies": [],
+        "propsInterface": {},
+        "tags": ["ui"],
+        "rawCode": raw_code if raw_code is not None else f"export function {name}() {{ return null }}\n",
+    }
+    values.update(fields)
+    return ATSModel(**values)
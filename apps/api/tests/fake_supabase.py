@@ -0,0 +1,192 @@
+"""
+A small in-memory stand-in for the parts of the Supabase client our services use.
+It supports the chained query-builder style (`client.table(...).select(...).eq(...).execute()`)
+so services can be exercised without a live database.
+"""
+import copy
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+
+class FakeQuery:
+    def __init__(self, table: "FakeTable", action: str, payload: Any = None, **options):
+        self.table = table
+        self.action = action
+        self.payload = payload
+        self.options = options
+        self.filters = []
+        self._order = []
+        self._limit = None
+
+    def select(self, *columns, **kwargs):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) > value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) >= value)
+        return self
+
+    def is_(self, column, value):
+        expected = None if value in (None, "null") else value
+        self.filters.append(lambda row: row.get(column) is expected)
+        return self
+
+    def or_(self, expression):
+        # Only the keyset form "and(a.eq.X,b.gt.Y),a.gt.X" is needed by our services.
+        self.filters.append(_parse_or(expression))
+        return self
+
+    def order(self, column, desc=False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def execute(self):
+        self.table.calls.append((self.action, self.payload, self.options))
+        if self.action in ("upsert", "insert"):
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            return SimpleNamespace(data=[self.table.write(row, **self.options) for row in rows])
+        rows = [row for row in self.table.rows if all(f(row) for f in self.filters)]
+        if self.action == "delete":
+            for row in rows:
+                self.table.rows.remove(row)
+                if self.table.on_delete is not None:
+                    self.table.on_delete(self.table.name, row)
+            return SimpleNamespace(data=rows)
+        if self.action == "update":
+            for row in rows:
+                row.update(self.payload)
+                self.table.touch(row)
+            return SimpleNamespace(data=copy.deepcopy(rows))
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if self._limit is not None:
+            rows = rows[: self._limit]
+        return SimpleNamespace(data=copy.deepcopy(rows), count=len(rows))
+
+
+def _parse_or(expression: str):
+    clauses = []
+    depth, current = 0, ""
+    for char in expression:
+        if char == "," and depth == 0:
+            clauses.append(current)
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    clauses.append(current)
+
+    def compile_term(term):
+        column, op, value = term.split(".", 2)
+        if op == "eq":
+            return lambda row: str(row.get(column)) == value
+        return lambda row: row.get(column) is not None and str(row.get(column)) > value
+
+    compiled = []
+    for clause in clauses:
+        if clause.startswith("and("):
+            terms = [compile_term(t) for t in clause[4:-1].split(",")]
+            compiled.append(lambda row, terms=terms: all(t(row) for t in terms))
+        else:
+            compiled.append(compile_term(clause))
+    return lambda row: any(c(row) for c in compiled)
+
+
+class FakeTable:
+    def __init__(self, name: str, key_counter, clock=None, on_delete=None):
+        self.name = name
+        self.rows: List[Dict[str, Any]] = []
+        self.calls = []
+        self._next_id = key_counter
+        self._clock = clock
+        self.on_delete = on_delete
+
+    def touch(self, row):
+        # Mirrors a database trigger maintaining `updated_at` on every write.
+        if self._clock is not None:
+            row["updated_at"] = self._clock()
+
+    def write(self, row, on_conflict="", ignore_duplicates=False, **_):
+        row = copy.deepcopy(row)
+        keys = [k.strip() for k in on_conflict.split(",") if k.strip()] or ["id"]
+        for existing in self.rows:
+            if all(k in row and existing.get(k) == row[k] for k in keys):
+                if not ignore_duplicates:
+                    existing.update(row)
+                    self.touch(existing)
+                return copy.deepcopy(existing)
+        row.setdefault("id", self._next_id())
+        self.touch(row)
+        self.rows.append(row)
+        return copy.deepcopy(row)
+
+    def select(self, *columns, **kwargs):
+        return FakeQuery(self, "select")
+
+    def upsert(self, payload, **options):
+        return FakeQuery(self, "upsert", payload, **options)
+
+    def insert(self, payload, **options):
+        return FakeQuery(self, "insert", payload, **options)
+
+    def update(self, payload):
+        return FakeQuery(self, "update", payload)
+
+    def delete(self):
+        return FakeQuery(self, "delete")
+
+
+class FakeSupabaseClient:
+    def __init__(self, timestamps: bool = False):
+        """
+        Args:
+            timestamps: Stamp every written row with an increasing `updated_at`, and
+                record deleted rows in `row_deletions` (see services.change_feed).
+        """
+        self.tables: Dict[str, FakeTable] = {}
+        self._counter = 0
+        self._ticks = 0
+        self._timestamps = timestamps
+        # Stored procedures callable through `rpc`, by name.
+        self.functions: Dict[str, Any] = {}
+
+    def _now(self):
+        self._ticks += 1
+        return f"2026-01-01T00:00:00.{self._ticks:06d}+00:00"
+
+    def _next_id(self):
+        self._counter += 1
+        return f"00000000-0000-0000-0000-{self._counter:012d}"
+
+    def table(self, name: str) -> FakeTable:
+        if name not in self.tables:
+            timestamps = self._timestamps and name != "row_deletions"
+            self.tables[name] = FakeTable(
+                name, self._next_id, self._now if timestamps else None, self._record_deletion if timestamps else None
+            )
+        return self.tables[name]
+
+    def _record_deletion(self, table: str, row: Dict[str, Any]) -> None:
+        # Mirrors the record_deletion trigger.
+        self.table("row_deletions").write({"table_name": table, "row_id": str(row["id"]), "deleted_at": self._now()})
+
+    def rpc(self, name: str, params: Dict[str, Any]):
+        function = self.functions[name]
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=function(**params)))
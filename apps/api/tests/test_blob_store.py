@@ -0,0 +1,74 @@
+import pytest
+
+from services.blob_store import BlobStore, RAW_CODE_HASH_KEY, content_hash
+from services.supabase_uploader import SupabaseUploader
+from tests.factories import make_ats
+from tests.fake_supabase import FakeSupabaseClient
+
+SOURCE = "export const Button = () => <button className='btn'>Click</button>;\n" * 20
+
+
+def test_put_returns_sha256_and_compresses():
+    client = FakeSupabaseClient()
+    store = BlobStore(client)
+    digest = store.put(SOURCE)
+    assert digest == content_hash(SOURCE)
+    row = client.table("component_blobs").rows[0]
+    assert row["size"] == len(SOURCE.encode())
+    assert len(row["data"]) < len(SOURCE)
+
+
+def test_put_dedupes_identical_sources():
+    client = FakeSupabaseClient()
+    store = BlobStore(client)
+    store.put(SOURCE)
+    store.put(SOURCE)
+    table = client.table("component_blobs")
+    assert len(table.rows) == 1
+    assert len(table.calls) == 1
+
+
+def test_get_fetches_lazily_and_caches():
+    client = FakeSupabaseClient()
+    digest = BlobStore(client).put(SOURCE)
+
+    reader = BlobStore(client)
+    assert reader.get(digest) == SOURCE
+    calls = len(client.table("component_blobs").calls)
+    assert reader.get(digest) == SOURCE
+    assert len(client.table("component_blobs").calls) == calls
+
+
+def test_get_unknown_hash_returns_none():
+    assert BlobStore(FakeSupabaseClient()).get("0" * 64) is None
+
+
+def test_corrupted_blob_fails_integrity_check():
+    client = FakeSupabaseClient()
+    digest = BlobStore(client).put(SOURCE)
+    BlobStore(client).put("something else")
+    rows = client.table("component_blobs").rows
+    rows[0]["data"], rows[1]["data"] = rows[1]["data"], rows[0]["data"]
+    with pytest.raises(ValueError, match="integrity"):
+        BlobStore(client).get(digest)
+
+
+def test_upload_ats_stores_only_hash_in_metadata():
+    client = FakeSupabaseClient()
+    uploader = SupabaseUploader(client=client)
+    uploader.upload_ats(make_ats("Button", SOURCE), kit_id="kit-1")
+    uploader.upload_ats(make_ats("ButtonCopy", SOURCE), kit_id="kit-2")
+
+    components = client.table("components").rows
+    assert len(components) == 2
+    for row in components:
+        assert "rawCode" not in row["metadata"]
+        assert row["metadata"][RAW_CODE_HASH_KEY] == content_hash(SOURCE)
+    assert len(client.table("component_blobs").rows) == 1
+    assert uploader.get_raw_code(components[0]["metadata"]) == SOURCE
+
+
+def test_get_raw_code_supports_inline_legacy_rows():
+    uploader = SupabaseUploader(client=FakeSupabaseClient())
+    assert uploader.get_raw_code({"rawCode": "legacy"}) == "legacy"
+    assert uploader.get_raw_code({}) is None
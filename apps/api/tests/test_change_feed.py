@@ -0,0 +1,156 @@
+from services.change_feed import DELETIONS_TABLE, ChangeFeed
+from services.component_search import ComponentSearch, iter_component_rows
+from services.supabase_uploader import SupabaseUploader
+from tests.factories import make_ats
+from tests.fake_supabase import FakeSupabaseClient
+
+
+def test_replica_index_follows_writes_from_another_process():
+    client = FakeSupabaseClient(timestamps=True)
+    writer = SupabaseUploader(client)
+    writer.upload_ats(make_ats("Button", description="A clickable button."), kit_id="kit-1", embedding=[1.0, 0.0])
+
+    feed = ChangeFeed(client, reconcile_every=1)
+    feed.prime()
+    search = ComponentSearch(embed=lambda text: [0.0, 1.0])
+    search.load(iter_component_rows(client))
+    feed.subscribe("components", search.upsert, search.remove)
+
+    # Another replica adds a component and edits an existing one.
+    card = writer.upload_ats(make_ats("Card", description="A surface grouping content."), kit_id="kit-1", embedding=[0.0, 1.0])
+    writer.upload_ats(make_ats("Button", description="A pressable control."), kit_id="kit-1", embedding=[1.0, 0.0])
+    assert feed.poll() == 2
+    assert [r.name for r in search.search("surface", limit=1)] == ["Card"]
+    assert [r.name for r in search.search("pressable", limit=1)] == ["Button"]
+    assert feed.poll() == 0
+
+    client.table("components").delete().eq("id", card["id"]).execute()
+    assert feed.poll() == 1
+    assert "Card" not in [r.name for r in search.search("surface", limit=5)]
+    assert len(search) == 1
+
+
+def test_deletions_are_read_from_the_watermark_without_scanning_ids():
+    client = FakeSupabaseClient(timestamps=True)
+    uploader = SupabaseUploader(client)
+    button = uploader.upload_ats(make_ats("Button"), kit_id="kit-1")
+    card = uploader.upload_ats(make_ats("Card"), kit_id="kit-1")
+    components = client.table("components")
+    feed = ChangeFeed(client, tables=["components"], reconcile_every=1)
+    feed.prime()
+    deleted = []
+    feed.subscribe("components", lambda row: None, deleted.append)
+    feed.poll()
+
+    since = feed.mark()
+    components.delete().eq("id", button["id"]).execute()
+    components.calls.clear()
+    assert feed.poll() == 1
+    assert feed.poll() == 0
+    assert deleted == [button["id"]]
+    # One read of the changed rows per poll; the table's ids are never listed.
+    assert [action for action, _, _ in components.calls] == ["select", "select"]
+
+    # A subscriber that loaded before the deletion is told about it.
+    replayed = []
+    feed.subscribe("components", lambda row: None, replayed.append, since=since)
+    assert replayed == [button["id"]]
+    assert card["id"] not in deleted
+
+
+def test_deletions_fall_back_to_scanning_ids_without_the_deletions_table():
+    client = FakeSupabaseClient(timestamps=True)
+    card = SupabaseUploader(client).upload_ats(make_ats("Card"), kit_id="kit-1")
+    table = client.table
+
+    def without_deletions(name):
+        if name == DELETIONS_TABLE:
+            raise Exception(f'relation "{name}" does not exist')
+        return table(name)
+
+    client.table = without_deletions
+    feed = ChangeFeed(client, tables=["components"], reconcile_every=1)
+    feed.prime()
+    deleted = []
+    feed.subscribe("components", lambda row: None, deleted.append)
+    client.tables["components"].rows.clear()
+    assert feed.poll() == 1
+    assert deleted == [card["id"]]
+
+
+def test_poll_pages_through_rows_sharing_a_timestamp():
+    client = FakeSupabaseClient()
+    table = client.table("components")
+    for i in range(7):
+        table.write({"id": f"id-{i}", "name": f"C{i}", "updated_at": "2026-01-01T00:00:00+00:00"})
+    feed = ChangeFeed(client, tables=["components"], page_size=3, reconcile_every=0)
+    seen = []
+    feed.subscribe("components", lambda row: seen.append(row["id"]))
+
+    assert feed.poll() == 7
+    assert seen == [f"id-{i}" for i in range(7)]
+    assert feed.watermarks["components"] == ("2026-01-01T00:00:00+00:00", "id-6")
+
+    table.write({"id": "id-2", "name": "C2 renamed", "updated_at": "2026-01-01T00:00:01+00:00"})
+    assert feed.poll() == 1
+    assert seen[-1] == "id-2"
+
+
+def test_late_subscriber_replays_writes_made_during_its_load():
+    client = FakeSupabaseClient(timestamps=True)
+    uploader = SupabaseUploader(client)
+    uploader.upload_ats(make_ats("Button", description="A button."), kit_id="kit-1")
+    # Without an overlap, only rows after the mark are replayed.
+    feed = ChangeFeed(client, reconcile_every=0, overlap_seconds=0)
+    feed.prime()
+    feed.poll()
+
+    since = feed.mark()
+    loaded = [row["name"] for row in iter_component_rows(client)]
+    # Written after the subscriber's load and already consumed by a poll.
+    uploader.upload_ats(make_ats("Card", description="A card."), kit_id="kit-1")
+    feed.poll()
+    replayed = []
+    feed.subscribe("components", lambda row: replayed.append(row["name"]), since=since)
+
+    assert loaded == ["Button"]
+    assert replayed == ["Card"]
+
+
+def test_rows_committed_behind_the_watermark_are_picked_up():
+    client = FakeSupabaseClient()
+    table = client.table("components")
+    table.write({"id": "a", "name": "A", "updated_at": "2026-01-01T00:00:01+00:00"})
+    table.write({"id": "b", "name": "B", "updated_at": "2026-01-01T00:00:03+00:00"})
+    feed = ChangeFeed(client, tables=["components"], reconcile_every=0, overlap_seconds=5)
+    seen = []
+    feed.subscribe("components", lambda row: seen.append(row["id"]))
+    assert feed.poll() == 2
+    assert feed.poll() == 0
+
+    # A transaction that started at 00:00:02 commits after the watermark passed 00:00:03.
+    table.write({"id": "c", "name": "C", "updated_at": "2026-01-01T00:00:02+00:00"})
+    assert feed.poll() == 1
+    assert seen == ["a", "b", "c"]
+
+    # Rows that fell out of the overlap window are forgotten.
+    table.write({"id": "d", "name": "D", "updated_at": "2026-01-01T00:00:09+00:00"})
+    assert feed.poll() == 1
+    assert sorted(feed._recent["components"]) == ["d"]
+
+
+def test_realtime_events_and_failing_subscribers():
+    feed = ChangeFeed(FakeSupabaseClient(), reconcile_every=0)
+    received, deleted = [], []
+
+    def broken(row):
+        raise RuntimeError("cache unavailable")
+
+    feed.subscribe("design_kits", broken)
+    feed.subscribe("design_kits", lambda row: received.append(row["name"]), deleted.append)
+
+    feed._on_realtime({"data": {"table": "design_kits", "type": "INSERT", "record": {"id": "k1", "name": "Nova"}}, "ids": [1]})
+    feed._on_realtime({"data": {"table": "design_kits", "type": "DELETE", "old_record": {"id": "k1"}}, "ids": [1]})
+
+    assert received == ["Nova"]
+    assert deleted == ["k1"]
@@ -0,0 +1,161 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from schemas.ats import ATSModel, PropDetail
+from services import component_search
+from services.component_search import ComponentSearch, get_component_search, reciprocal_rank_fusion
+from services.lexical_index import LexicalIndex, tokenize
+from services.supabase_uploader import SupabaseUploader
+from services.vector_index import VectorIndex
+from tests.fake_supabase import FakeSupabaseClient
+
+
+def make_row(id, name, description, tags=(), props=(), deps=(), embedding=None, kit_id="kit-1"):
+    return {
+        "id": id,
+        "kit_id": kit_id,
+        "name": name,
+        "metadata": {
+            "componentName": name,
+            "description": description,
+            "tags": list(tags),
+            "dependencies": list(deps),
+            "internalDependencies": [],
+            "propsInterface": {p: {"type": "boolean", "isOptional": True, "options": None} for p in props},
+        },
+        "embedding": embedding,
+    }
+
+
+ROWS = [
+    make_row("1", "Button", "A clickable button.", ["button", "action"], ["asChild", "variant"],
+             ["react", "@radix-ui/react-slot"], [1.0, 0.0, 0.0]),
+    make_row("2", "Card", "A surface that groups content.", ["card", "layout"], ["className"],
+             ["react"], [0.0, 1.0, 0.0]),
+    make_row("3", "Dialog", "A modal window over the page.", ["modal", "overlay"], ["open"],
+             ["react", "@radix-ui/react-dialog"], [0.0, 0.0, 1.0]),
+]
+
+
+@pytest.fixture
+def search():
+    index = ComponentSearch(embed=lambda text: [0.0, 0.0, 1.0] if "popup" in text else [0.0, 1.0, 0.0])
+    index.load(ROWS)
+    return index
+
+
+def test_tokenize_keeps_package_names_and_splits_camel_case():
+    tokens = list(tokenize("asChild @radix-ui/react-slot"))
+    assert "aschild" in tokens and "child" in tokens
+    assert "@radix-ui/react-slot" in tokens and "slot" in tokens
+
+
+def test_lexical_finds_exact_dependency_and_prop():
+    index = LexicalIndex()
+    for row in ROWS:
+        index.upsert(row["id"], {"props": list(row["metadata"]["propsInterface"]),
+                                 "dependencies": row["metadata"]["dependencies"]})
+    assert index.search("@radix-ui/react-slot")[0][0] == "1"
+    assert index.search("open")[0][0] == "3"
+
+
+def test_lexical_index_incremental_update_and_slot_reuse():
+    index = LexicalIndex()
+    index.upsert("a", {"name": "Button"})
+    index.upsert("b", {"name": "Card"})
+    index.upsert("a", {"name": "Toggle"})
+    assert index.search("button") == []
+    assert index.search("toggle")[0][0] == "a"
+    assert index.remove("b")
+    index.upsert("c", {"name": "Card"})
+    assert len(index) == 2
+    assert index.search("card")[0][0] == "c"
+
+
+def test_vector_index_remove_keeps_matrix_dense():
+    index = VectorIndex()
+    index.upsert("a", [1.0, 0.0])
+    index.upsert("b", [0.0, 1.0])
+    index.upsert("c", [1.0, 1.0])
+    index.remove("a")
+    assert [key for key, _ in index.search([0.0, 1.0], 3)] == ["b", "c"]
+    with pytest.raises(ValueError):
+        index.upsert("d", [1.0, 0.0, 0.0])
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]])
+    assert fused[0][0] == "b"
+
+
+def test_hybrid_search_fuses_both_sides(search):
+    results = search.search("popup asChild")
+    names = [r.name for r in results]
+    assert names[:2] in (["Button", "Dialog"], ["Dialog", "Button"])
+    by_name = {r.name: r for r in results}
+    assert by_name["Button"].lexical_rank == 1
+    assert by_name["Dialog"].vector_rank == 1
+
+
+def test_search_tracks_upserts_and_removals(search):
+    search.upsert(make_row("2", "Panel", "A surface.", ["panel"], embedding=[0.0, 1.0, 0.0]))
+    assert not any(r.name == "Card" for r in search.search("card"))
+    assert search.search("panel")[0].id == "2"
+    search.remove("2")
+    assert all(r.id != "2" for r in search.search("panel surface"))
+
+
+def test_uploader_listener_updates_search_index():
+    index = ComponentSearch(embed=lambda text: [1.0])
+    uploader = SupabaseUploader(client=FakeSupabaseClient())
+    uploader.add_listener(index.upsert)
+    uploader.upload_ats(
+        ATSModel(
+            componentName="Tooltip",
+            description="Shows a hint on hover.",
+            dependencies=["@radix-ui/react-tooltip"],
+            internalDependencies=[],
+            propsInterface={"side": PropDetail(type="string", isOptional=True, options=None)},
+            tags=["tooltip"],
+            rawCode="export const Tooltip = () => null;",
+        ),
+        kit_id="kit-1",
+    )
+    assert [r.name for r in index.search("@radix-ui/react-tooltip")] == ["Tooltip"]
+
+
+def test_search_endpoint(search):
+    app.dependency_overrides[get_component_search] = lambda: search
+    try:
+        response = TestClient(app).get("/api/v1/components/search", params={"q": "asChild", "limit": 1})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert [hit["name"] for hit in response.json()] == ["Button"]
+
+
+def test_search_index_is_built_in_the_background(search, monkeypatch):
+    release = threading.Event()
+
+    def build(client, feed):
+        release.wait(5)
+        return search
+
+    monkeypatch.setattr(component_search, "_build_component_search", build)
+    monkeypatch.setattr(component_search, "get_change_feed", lambda: None)
+    monkeypatch.setattr(component_search, "_component_search", None)
+    api = TestClient(app)
+    # Entering the client runs startup, which starts the build without waiting for it.
+    with api:
+        loading = api.get("/api/v1/components/search", params={"q": "asChild"})
+        release.set()
+        component_search._component_search_thread.join(5)
+        ready = api.get("/api/v1/components/search", params={"q": "asChild", "limit": 1})
+
+    assert loading.status_code == 503
+    assert loading.headers["Retry-After"] == "5"
+    assert ready.status_code == 200
+    assert [hit["name"] for hit in ready.json()] == ["Button"]
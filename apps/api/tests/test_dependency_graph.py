@@ -0,0 +1,104 @@
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from agents.source_analysis import parse_imports, split_imports
+from scripts.ingest_components import reingest_changed_files
+from services.dependency_graph import DependencyGraph, load_aliases
+
+FILES = {
+    "tsconfig.json": '{\n  // shadcn alias\n  "compilerOptions": {"baseUrl": ".", "paths": {"@/*": ["./*"]},},\n}',
+    "lib/utils.ts": 'import { clsx } from "clsx"\nexport function cn() {}',
+    "components/ui/button.tsx": 'import * as React from "react"\nimport { cn } from "@/lib/utils"\n',
+    "components/ui/dialog.tsx": 'import { Button } from "./button"\nimport { X } from "lucide-react"\n',
+    "components/ui/card.tsx": 'import * as React from "react"\n',
+    "components/ui/a.tsx": 'export { b } from "./b"\n',
+    "components/ui/b.tsx": 'import { a } from "@/components/ui/a"\n',
+}
+
+
+@pytest.fixture
+def kit():
+    with tempfile.TemporaryDirectory() as root:
+        for name, content in FILES.items():
+            path = os.path.join(root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        yield root
+
+
+def rel(root, paths):
+    return [os.path.relpath(p, root) for p in paths]
+
+
+def test_parse_and_split_imports():
+    code = (
+        'import * as React from "react"\n'
+        'import { cva, type VariantProps } from "class-variance-authority"\n'
+        "import './styles.css'\n"
+        'export { Slot } from "@radix-ui/react-slot/dist"\n'
+        'const Lazy = React.lazy(() => import("@/components/ui/card"))\n'
+    )
+    specs = parse_imports(code)
+    assert specs == ["react", "class-variance-authority", "./styles.css",
+                     "@radix-ui/react-slot/dist", "@/components/ui/card"]
+    external, internal = split_imports(specs)
+    assert external == ["react", "class-variance-authority", "@radix-ui/react-slot"]
+    assert internal == ["./styles.css", "@/components/ui/card"]
+
+
+def test_load_aliases_reads_tsconfig_paths(kit):
+    assert load_aliases(kit) == {"@/": [os.path.normpath(kit)]}
+
+
+def test_resolves_alias_and_relative_imports(kit):
+    graph = DependencyGraph.build(kit)
+    button = os.path.join(kit, "components/ui/button.tsx")
+    assert rel(kit, graph.dependencies[button]) == ["lib/utils.ts"]
+    assert rel(kit, graph.dependents[button]) == ["components/ui/dialog.tsx"]
+    assert graph.unresolved == {}
+
+
+def test_change_to_shared_utility_affects_dependents_in_order(kit):
+    graph = DependencyGraph.build(kit)
+    affected = graph.affected_by([os.path.join(kit, "lib/utils.ts")])
+    assert rel(kit, affected) == ["lib/utils.ts", "components/ui/button.tsx", "components/ui/dialog.tsx"]
+
+
+def test_change_to_leaf_affects_only_itself(kit):
+    graph = DependencyGraph.build(kit)
+    assert rel(kit, graph.affected_by([os.path.join(kit, "components/ui/card.tsx")])) == ["components/ui/card.tsx"]
+
+
+def test_detects_cycles(kit):
+    graph = DependencyGraph.build(kit)
+    assert [rel(kit, cycle) for cycle in graph.find_cycles()] == [["components/ui/a.tsx", "components/ui/b.tsx"]]
+
+
+def test_apply_changes_handles_added_and_deleted_files(kit):
+    graph = DependencyGraph.build(kit)
+    button = os.path.join(kit, "components/ui/button.tsx")
+    os.remove(button)
+    assert rel(kit, graph.apply_changes([button])) == ["components/ui/button.tsx", "components/ui/dialog.tsx"]
+    assert graph.unresolved == {os.path.join(kit, "components/ui/dialog.tsx"): ["./button"]}
+
+    with open(button, "w") as f:
+        f.write('import { cn } from "@/lib/utils"\n')
+    assert rel(kit, graph.apply_changes([button])) == ["components/ui/button.tsx", "components/ui/dialog.tsx"]
+    assert graph.unresolved == {}
+
+
+def test_reingest_changed_files_only_touches_affected_components(kit):
+    graph = DependencyGraph.build(kit)
+    creator = MagicMock()
+    creator.create_ats_from_file.side_effect = lambda path: MagicMock(description="desc", componentName=path)
+    uploader = MagicMock()
+    with patch("scripts.ingest_components.generate_embedding", return_value=[0.1]), \
+            patch("scripts.ingest_components.dump_ats"):
+        done = reingest_changed_files(graph, [os.path.join(kit, "lib/utils.ts")], "kit-1", uploader, creator)
+    assert rel(kit, done) == ["components/ui/button.tsx", "components/ui/dialog.tsx"]
+    assert [c.args[0] for c in creator.create_ats_from_file.call_args_list] == done
+    assert uploader.upload_ats.call_count == 2
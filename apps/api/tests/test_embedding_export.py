@@ -0,0 +1,140 @@
+import io
+import zipfile
+
+import numpy as np
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from routers.kits import get_supabase_client
+from scripts.export_embeddings import export_kit
+from services.component_search import iter_component_rows
+from services.embedding_export import (
+    ARROW,
+    EXPORT_COLUMNS,
+    NPY,
+    import_rows,
+    read_export,
+    stream_export,
+)
+from services.supabase_uploader import SupabaseUploader
+from tests.fake_supabase import FakeSupabaseClient
+
+pa = pytest.importorskip("pyarrow")
+
+
+def seed(client, kit_id="kit-1", count=5, dim=4):
+    rng = np.random.default_rng(0)
+    table = client.table("components")
+    for i in range(count):
+        table.write({
+            "kit_id": kit_id,
+            "name": f"Component{i}",
+            "metadata": {"componentName": f"Component{i}", "tags": ["ui", f"t{i}"], "rawCodeHash": f"h{i}"},
+            # pgvector columns come back as strings; the last component has no embedding yet.
+            "embedding": str(rng.normal(size=dim).round(4).tolist()) if i < count - 1 else None,
+        })
+    table.write({"kit_id": "kit-2", "name": "Other", "metadata": {}, "embedding": "[1, 1, 1, 1]"})
+
+
+@pytest.mark.parametrize("format", [ARROW, NPY])
+def test_export_of_kit_without_embeddings(format):
+    client = FakeSupabaseClient()
+    client.table("components").write({"kit_id": "kit-1", "name": "Pending", "metadata": {}, "embedding": None})
+
+    rows = list(read_export(io.BytesIO(b"".join(export_bytes(client, format)))))
+
+    assert [(row["name"], row["embedding"]) for row in rows] == [("Pending", None)]
+
+
+def export_bytes(client, format, chunk_rows=2):
+    rows = iter_component_rows(client, page_size=chunk_rows, columns=EXPORT_COLUMNS, kit_id="kit-1")
+    return list(stream_export(rows, format, chunk_rows))
+
+
+@pytest.mark.parametrize("format", [ARROW, NPY])
+def test_export_roundtrip(format):
+    client = FakeSupabaseClient()
+    seed(client)
+
+    data = b"".join(export_bytes(client, format))
+    rows = list(read_export(io.BytesIO(data)))
+
+    source = sorted(client.table("components").rows, key=lambda row: row["id"])[:5]
+    assert [row["name"] for row in rows] == [row["name"] for row in source]
+    assert all(row["kit_id"] == "kit-1" for row in rows)
+    assert rows[0]["metadata"]["tags"] == ["ui", "t0"]
+    for row, original in zip(rows[:4], source):
+        assert row["embedding"] == pytest.approx(np.array(orjson.loads(original["embedding"]), dtype=np.float32))
+    assert rows[4]["embedding"] is None
+
+
+def test_arrow_export_has_one_batch_per_chunk():
+    client = FakeSupabaseClient()
+    seed(client)
+
+    reader = pa.ipc.open_stream(b"".join(export_bytes(client, ARROW)))
+    batches = list(reader)
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert reader.schema.field("embedding").type == pa.list_(pa.float32(), 4)
+    assert reader.schema.field("tags").type == pa.list_(pa.string())
+
+
+def test_npy_export_writes_parts_with_sidecars():
+    client = FakeSupabaseClient()
+    seed(client)
+
+    chunks = export_bytes(client, NPY)
+    # Every part is emitted as soon as it is encoded, not at the end.
+    assert len([chunk for chunk in chunks if chunk]) >= 3
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert sorted(archive.namelist()) == [
+            "part-00000.jsonl", "part-00000.npy",
+            "part-00001.jsonl", "part-00001.npy",
+            "part-00002.jsonl", "part-00002.npy",
+        ]
+        matrix = np.load(io.BytesIO(archive.read("part-00002.npy")))
+    assert matrix.shape == (1, 4) and np.isnan(matrix).all()
+
+
+def test_import_loads_rows_through_uploader(tmp_path):
+    source = FakeSupabaseClient()
+    seed(source)
+    path = tmp_path / "kit.arrows"
+    export_kit(source, "kit-1", str(path), ARROW, chunk_rows=2)
+
+    target = FakeSupabaseClient()
+    uploader = SupabaseUploader(target)
+    seen = []
+    uploader.add_listener(seen.append)
+    with open(path, "rb") as f:
+        assert import_rows(read_export(f), uploader, kit_id="kit-copy", batch_size=2) == 5
+
+    rows = target.table("components").rows
+    assert len(seen) == 5
+    assert {row["kit_id"] for row in rows} == {"kit-copy"}
+    assert [call[0] for call in target.table("components").calls] == ["upsert"] * 3
+
+    # Importing again updates the same (kit_id, name) rows.
+    with open(path, "rb") as f:
+        import_rows(read_export(f), uploader, kit_id="kit-copy")
+    assert len(target.table("components").rows) == 5
+
+
+def test_export_endpoint_streams_kit():
+    client = FakeSupabaseClient()
+    seed(client)
+    app.dependency_overrides[get_supabase_client] = lambda: client
+    try:
+        api = TestClient(app)
+        response = api.get("/api/v1/kits/kit-1/embeddings", params={"format": "npy", "chunk_rows": 2})
+        invalid = api.get("/api/v1/kits/kit-1/embeddings", params={"format": "csv"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert 'filename="kit-1-embeddings.zip"' in response.headers["content-disposition"]
+    assert len(list(read_export(io.BytesIO(response.content)))) == 5
+    assert invalid.status_code == 400
@@ -0,0 +1,278 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import orjson
+import pytest
+
+from config.config import settings
+from schemas.ats import ATSModel
+from scripts.ingest_components import ingest_component_files
+from scripts.migrate_embeddings import EmbeddingMigration
+from services.embedding_versions import (
+    ACTIVATE_FUNCTION,
+    ACTIVE,
+    DEFAULT_VERSION,
+    RETIRED,
+    SET_EMBEDDINGS_FUNCTION,
+    EmbeddingVersionStore,
+    staging_column,
+)
+from services.projection import load_projection, random_projection
+from services.supabase_uploader import SupabaseUploader
+from tests.fake_supabase import FakeSupabaseClient
+
+STAGING = staging_column("mpnet-v1")
+
+
+def seeded_client(count=10):
+    client = FakeSupabaseClient()
+    client.functions[ACTIVATE_FUNCTION] = lambda target: activate(client, target)
+    client.functions[SET_EMBEDDINGS_FUNCTION] = lambda **params: set_embeddings(client, **params)
+    for i in range(count):
+        client.table("components").write({
+            "kit_id": "kit-1",
+            "name": f"C{i}",
+            "metadata": {"componentName": f"C{i}", "description": f"Component number {i}."},
+            "embedding": [0.0, 0.0],
+        })
+    return client
+
+
+def activate(client, target):
+    """Mirrors the activate_embedding_version database function."""
+    rows = client.table("components").rows
+    missing = sum(1 for row in rows if row.get(staging_column(target)) is None)
+    if missing:
+        raise Exception(f"embedding version {target} is missing for {missing} components")
+    versions = client.table("embedding_versions").rows
+    previous = next((v for v in versions if v["status"] == ACTIVE), DEFAULT_VERSION)
+    for row in rows:
+        row[staging_column(previous["version"])] = row["embedding"]
+        row["embedding"] = row.pop(staging_column(target))
+    for version in versions:
+        if version["version"] == target:
+            version["status"] = ACTIVE
+        elif version["status"] == ACTIVE:
+            version["status"] = RETIRED
+
+
+def set_embeddings(client, target_column, ids, vectors):
+    """Mirrors the set_component_embeddings database function."""
+    by_id = dict(zip(ids, vectors))
+    updated = 0
+    for row in client.table("components").rows:
+        if row["id"] in by_id:
+            row[target_column] = orjson.loads(by_id[row["id"]])
+            updated += 1
+    return updated
+
+
+def length_encoder(texts):
+    return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_migration_fills_staging_column_and_cuts_over():
+    client = seeded_client()
+    report = EmbeddingMigration(client, "mpnet-v1", "all-mpnet-base-v2", encode=length_encoder, batch_size=4).run()
+
+    assert report["rows"] == 10 and report["activated"]
+    assert report["rows_per_second"] > 0
+    rows = client.table("components").rows
+    assert all(row["embedding"] == [len(row["metadata"]["description"]), 1.0] for row in rows)
+    assert all(row[staging_column(DEFAULT_VERSION["version"])] == [0.0, 0.0] for row in rows)
+    store = EmbeddingVersionStore(client)
+    assert store.active()["version"] == "mpnet-v1"
+    assert store.write_targets() == [("all-mpnet-base-v2", "embedding")]
+
+
+def test_multi_process_pool_is_started_once_per_run():
+    client = seeded_client()
+    model = MagicMock()
+    model.encode.side_effect = lambda texts, **kwargs: length_encoder(texts)
+
+    with patch("embedding.get_model", return_value=model):
+        report = EmbeddingMigration(client, "mpnet-v1", "all-mpnet-base-v2", batch_size=4, processes=3).run()
+
+    assert report["activated"]
+    model.start_multi_process_pool.assert_called_once_with(target_devices=["cpu"] * 3)
+    model.stop_multi_process_pool.assert_called_once_with(model.start_multi_process_pool.return_value)
+    assert model.encode.call_count == 3
+    assert all(call.kwargs["pool"] is model.start_multi_process_pool.return_value for call in model.encode.call_args_list)
+
+
+def test_interrupted_migration_resumes_from_checkpoint():
+    client = seeded_client()
+    calls = []
+
+    def flaky(texts):
+        calls.append(len(texts))
+        if len(calls) == 2:
+            raise RuntimeError("worker killed")
+        return length_encoder(texts)
+
+    with pytest.raises(RuntimeError):
+        EmbeddingMigration(client, "mpnet-v1", "all-mpnet-base-v2", encode=flaky, batch_size=4).run()
+    record = EmbeddingVersionStore(client).get("mpnet-v1")
+    assert record["rows_done"] == 4
+
+    report = EmbeddingMigration(client, "mpnet-v1", "all-mpnet-base-v2", encode=flaky, batch_size=4).run()
+    # Only the six remaining rows were encoded on the second run.
+    assert calls[2:] == [4, 2]
+    assert report["activated"]
+    assert EmbeddingVersionStore(client).get("mpnet-v1")["rows_done"] == 10
+
+
+def test_rows_inserted_behind_the_cursor_are_caught_up_before_cutover():
+    client = seeded_client(count=6)
+    table = client.table("components")
+
+    def encoder(texts):
+        if not any(row["name"] == "Late" for row in table.rows):
+            table.write({"id": "00000000-0000-0000-0000-000000000000", "kit_id": "kit-1", "name": "Late",
+                         "metadata": {"description": "Inserted mid-run."}, "embedding": [0.0, 0.0]})
+        return length_encoder(texts)
+
+    report = EmbeddingMigration(client, "mpnet-v1", "all-mpnet-base-v2", encode=encoder, batch_size=4).run()
+
+    assert report["activated"]
+    late = next(row for row in table.rows if row["name"] == "Late")
+    assert late["embedding"] == [len("Inserted mid-run."), 1.0]
+
+
+def test_components_deleted_mid_run_are_not_recreated():
+    client = seeded_client(count=6)
+    table = client.table("components")
+
+    def encoder(texts):
+        # Another writer deletes a component after its page was read.
+        table.rows[:] = [row for row in table.rows if row["name"] != "C1"]
+        return length_encoder(texts)
+
+    report = EmbeddingMigration(client, "mpnet-v1", "all-mpnet-base-v2", encode=encoder, batch_size=4).run()
+
+    assert report["activated"]
+    assert sorted(row["name"] for row in table.rows) == ["C0", "C2", "C3", "C4", "C5"]
+    assert not any(action == "upsert" for action, _, _ in table.calls)
+
+
+def test_ingestion_writes_migrating_version_too(tmp_path):
+    client = seeded_client(count=0)
+    EmbeddingVersionStore(client).start("mpnet-v1", "all-mpnet-base-v2")
+    source = tmp_path / "badge.tsx"
+    source.write_text("export function Badge() { return null }")
+    creator = MagicMock()
+    creator.create_ats_from_file.return_value = ATSModel(
+        componentName="Badge", description="A small status label.", dependencies=[], internalDependencies=[],
+        propsInterface={}, tags=[], rawCode=source.read_text(),
+    )
+
+    def fake_embedding(text, model_name=None):
+        return [1.0, 0.0] if model_name == "all-mpnet-base-v2" else [0.0, 1.0]
+
+    with patch("scripts.ingest_components.generate_embedding", side_effect=fake_embedding):
+        ingest_component_files([str(source)], "kit-1", SupabaseUploader(client), creator)
+
+    [row] = client.table("components").rows
+    assert row["embedding"] == [0.0, 1.0]
+    assert row[STAGING] == [1.0, 0.0]
+
+
+def test_ingestion_follows_a_cutover_during_the_run(tmp_path):
+    client = seeded_client(count=0)
+    versions = EmbeddingVersionStore(client)
+    versions.start("mpnet-v1", "all-mpnet-base-v2")
+    table = client.table("components")
+    write = table.write
+
+    def write_existing_columns(row, **options):
+        # After the cutover the staging column is gone, as in Postgres.
+        if STAGING in row and versions.get("mpnet-v1")["status"] == ACTIVE:
+            error = Exception(f'column "{STAGING}" of relation "components" does not exist')
+            error.code = "42703"
+            raise error
+        return write(row, **options)
+
+    table.write = write_existing_columns
+    paths = []
+    for name in ("Badge", "Chip"):
+        source = tmp_path / f"{name.lower()}.tsx"
+        source.write_text(f"export function {name}() {{ return null }}")
+        paths.append(str(source))
+
+    def create(path):
+        if path == paths[1]:
+            activate(client, "mpnet-v1")
+        return ATSModel(componentName=os.path.basename(path).split(".")[0].title(), description="A label.",
+                        dependencies=[], internalDependencies=[], propsInterface={}, tags=[], rawCode="")
+
+    creator = MagicMock()
+    creator.create_ats_from_file.side_effect = create
+
+    def fake_embedding(text, model_name=None):
+        return [1.0, 0.0] if model_name == "all-mpnet-base-v2" else [0.0, 1.0]
+
+    with patch("scripts.ingest_components.generate_embedding", side_effect=fake_embedding):
+        ingested = ingest_component_files(paths, "kit-1", SupabaseUploader(client), creator, versions=versions)
+
+    assert ingested == paths
+    rows = {row["name"]: row for row in table.rows}
+    # Both rows hold the new version in `embedding`, never the retired model's vector.
+    assert rows["Badge"]["embedding"] == [1.0, 0.0]
+    assert rows["Chip"]["embedding"] == [1.0, 0.0]
+    assert STAGING not in rows["Chip"]
+
+
+def test_write_behind_ingestion_is_refused_during_a_migration(tmp_path):
+    client = seeded_client(count=0)
+    versions = EmbeddingVersionStore(client, cache_seconds=0)
+    paths = []
+    for name in ("Badge", "Chip"):
+        source = tmp_path / f"{name.lower()}.tsx"
+        source.write_text(f"export function {name}() {{ return null }}")
+        paths.append(str(source))
+
+    def create(path):
+        if path == paths[1]:
+            versions.start("mpnet-v1", "all-mpnet-base-v2")
+        return ATSModel(componentName=os.path.basename(path).split(".")[0].title(), description="A label.",
+                        dependencies=[], internalDependencies=[], propsInterface={}, tags=[], rawCode="")
+
+    creator = MagicMock()
+    creator.create_ats_from_file.side_effect = create
+    uploader = SupabaseUploader(client, write_behind=True)
+    with patch("scripts.ingest_components.generate_embedding", return_value=[0.0, 1.0]):
+        # The migration starts while the run is under way: only files before it are buffered.
+        ingested = ingest_component_files(paths, "kit-1", uploader, creator, versions=versions)
+        uploader.flush()
+        assert ingested == paths[:1]
+        assert [row["name"] for row in client.table("components").rows] == ["Badge"]
+
+        # Once the migration is running, nothing is generated or buffered at all.
+        creator.reset_mock()
+        with pytest.raises(ValueError, match="migration"):
+            ingest_component_files(paths, "kit-1", uploader, creator, versions=versions)
+        assert not creator.create_ats_from_file.called
+        assert len(uploader.buffer) == 0
+        with pytest.raises(ValueError, match="Near-duplicate"):
+            ingest_component_files(paths, "kit-1", uploader, creator, duplicates=MagicMock(), versions=versions)
+    uploader.close()
+
+
+def test_activation_refits_the_projection_for_the_new_model(tmp_path, monkeypatch):
+    path = str(tmp_path / "projection.npz")
+    random_projection(2, 1).save(path)
+    monkeypatch.setattr(settings, "EMBEDDING_PROJECTION_PATH", path)
+    load_projection.cache_clear()
+    client = seeded_client()
+
+    def wide_encoder(texts):
+        return np.array([[len(text), 1.0, 0.5] for text in texts], dtype=np.float32)
+
+    try:
+        EmbeddingMigration(client, "mpnet-v1", "all-mpnet-base-v2", encode=wide_encoder, batch_size=4).run()
+        refitted = load_projection("mpnet-v1")
+        assert (refitted.input_dim, refitted.output_dim) == (3, 1)
+        assert load_projection(DEFAULT_VERSION["version"]).input_dim == 2
+    finally:
+        load_projection.cache_clear()
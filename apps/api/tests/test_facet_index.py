@@ -0,0 +1,100 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services.component_search import ComponentSearch, get_component_search
+from services.facet_index import FacetIndex
+from tests.test_component_search import make_row
+
+ROWS = [
+    make_row("1", "Button", "A clickable button.", ["button", "form"], deps=["react", "@radix-ui/react-slot"],
+             kit_id="kit-a"),
+    make_row("2", "Checkbox", "A checkable input.", ["form", "input"], deps=["react", "@radix-ui/react-checkbox"],
+             kit_id="kit-a"),
+    make_row("3", "Slot Button", "A button using a slot.", ["button", "form"], deps=["@radix-ui/react-slot"],
+             kit_id="kit-b"),
+    make_row("4", "Card", "A surface.", ["layout"], deps=["react"], kit_id="kit-a"),
+]
+
+
+@pytest.fixture
+def search():
+    index = ComponentSearch(embed=lambda text: [1.0])
+    index.load(ROWS)
+    return index
+
+
+def test_match_intersects_across_facets():
+    index = FacetIndex()
+    index.upsert("a", {"kit": ["k1"], "tag": ["form"], "dependency": ["x"]})
+    index.upsert("b", {"kit": ["k1"], "tag": ["form"]})
+    index.upsert("c", {"kit": ["k2"], "tag": ["form"], "dependency": ["x"]})
+    assert index.keys(index.match({"kit": ["k1"], "tag": ["form"], "dependency": ["x"]})) == ["a"]
+    assert index.keys(index.match({"tag": ["FORM"]})) == ["a", "b", "c"]
+    assert index.match({"tag": ["missing"]}) == 0
+
+
+def test_match_rejects_unknown_facet():
+    with pytest.raises(ValueError, match="Unknown facet"):
+        FacetIndex().match({"color": ["red"]})
+
+
+def test_incremental_upsert_moves_document_between_values():
+    index = FacetIndex()
+    index.upsert("a", {"tag": ["old"]})
+    index.upsert("a", {"tag": ["new"]})
+    assert index.match({"tag": ["old"]}) == 0
+    assert index.keys(index.match({"tag": ["new"]})) == ["a"]
+    index.remove("a")
+    assert index.counts(index.match()) == {"kit": {}, "tag": {}, "dependency": {}, "internalDependency": {}}
+
+
+def test_writes_between_queries_rebuild_only_the_bitmaps_they_touch():
+    index = FacetIndex()
+    for i in range(1000):
+        index.upsert(f"c{i}", {"kit": ["k1"], "tag": ["even" if i % 2 == 0 else "odd"]})
+    # Nothing is materialised while ingesting.
+    assert index._bitmaps == {facet: {} for facet in index._bitmaps}
+    assert len(index.keys(index.match({"tag": ["even"]}))) == 500
+    odd = index._value_bitmap("tag", "odd")
+
+    index.remove("c0")
+    index.upsert("c2", {"kit": ["k1"], "tag": ["even", "first"]})
+    assert index._bitmaps["tag"].get("odd") == odd
+    assert "even" not in index._bitmaps["tag"]
+    assert len(index.keys(index.match({"tag": ["even"]}))) == 499
+    assert index.keys(index.match({"tag": ["first"]})) == ["c2"]
+    assert index.counts(index.match({"kit": ["k1"]}))["tag"] == {"odd": 500, "even": 499, "first": 1}
+
+
+def test_list_components_with_facet_counts(search):
+    page = search.list_components({"kit": ["kit-a"], "dependency": ["@radix-ui/react-slot"], "tag": ["form"]})
+    assert page.total == 1
+    assert [item.name for item in page.items] == ["Button"]
+
+    page = search.list_components({"kit": ["kit-a"]})
+    assert page.total == 3
+    assert page.facets["tag"] == {"form": 2, "button": 1, "input": 1, "layout": 1}
+    assert page.facets["dependency"]["react"] == 3
+
+
+def test_search_composes_with_filters(search):
+    unfiltered = [r.id for r in search.search("button")]
+    assert set(unfiltered[:2]) == {"1", "3"}
+    filtered = [r.id for r in search.search("button", filters={"kit": ["kit-b"]})]
+    assert filtered == ["3"]
+    assert search.search("button", filters={"tag": ["nothing"]}) == []
+
+
+def test_list_and_search_endpoints(search):
+    app.dependency_overrides[get_component_search] = lambda: search
+    client = TestClient(app)
+    try:
+        listing = client.get("/api/v1/components", params={"tag": ["form"], "dependency": "react"})
+        found = client.get("/api/v1/components/search", params={"q": "button", "kit_id": "kit-a"})
+    finally:
+        app.dependency_overrides.clear()
+    assert listing.status_code == 200
+    assert [item["name"] for item in listing.json()["items"]] == ["Button", "Checkbox"]
+    assert found.status_code == 200
+    assert [hit["id"] for hit in found.json()] == ["1"]
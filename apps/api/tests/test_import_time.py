@@ -0,0 +1,24 @@
+import pytest
+
+from scripts.import_benchmark import IMPORT_BUDGETS_MS, profile_import
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS_MS))
+def test_entry_points_skip_heavy_imports(module):
+    profile = profile_import(module)
+    assert profile.heavy_imports() == []
+
+
+@pytest.mark.parametrize("module", ["agents.ats_creator", "embedding", "scripts.ingest_components"])
+def test_agent_modules_do_not_load_models(module):
+    profile = profile_import(module)
+    assert "torch" not in profile.heavy_imports()
+    assert "sentence_transformers" not in profile.heavy_imports()
+
+
+def test_entry_points_within_budget():
+    # The fastest of a few runs, to keep a cold disk cache from failing the build.
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        best = min(profile_import(module).total_ms for _ in range(3))
+        assert best <= budget, f"{module} took {best:.0f} ms to import (budget {budget:.0f} ms)"
+
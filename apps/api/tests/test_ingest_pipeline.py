@@ -11,7 +11,13 @@ import uuid
 # For testing purposes, we'll ensure the path is correct
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "scripts")))
-from scripts.ingest_components import find_component_files, generate_ats_for_components, validate_and_transform_ats
+from scripts.ingest_components import (
+    find_component_files,
+    generate_ats_for_components,
+    validate_and_transform_ats,
+    validate_and_transform_ats_batch,
+)
+from schemas.ats import ATSModel, dump_ats, validate_ats_batch
 from schemas.component import ComponentCreate
 
 class DummyATSModel:
@@ -168,4 +174,32 @@ def test_validate_and_transform_ats_non_serializable():
     ats = DummyATSModel("Button", serializable=False)
     kit_id = uuid.uuid4()
     with pytest.raises(ValueError, match="serializable"):
-        validate_and_transform_ats(ats, kit_id)
\ No newline at end of file
+        validate_and_transform_ats(ats, kit_id)
+
+def make_ats_model(name):
+    return ATSModel(**DummyATSModel(name).model_dump())
+
+def test_validate_and_transform_ats_dumps_once():
+    ats = DummyATSModel("Button")
+    with patch.object(DummyATSModel, "model_dump", wraps=ats.model_dump) as spy:
+        validate_and_transform_ats(ats, uuid.uuid4())
+    assert spy.call_count == 1
+
+def test_dump_ats_bytes_round_trip_through_batch_validation():
+    payloads = [dump_ats(make_ats_model(f"C{i}")) for i in range(3)]
+    validated = validate_ats_batch([p.body for p in payloads])
+    assert [ats.componentName for ats in validated] == ["C0", "C1", "C2"]
+    assert validate_ats_batch([payloads[0].data, payloads[1].body])[1].componentName == "C1"
+
+def test_validate_and_transform_ats_batch_happy_path():
+    kit_id = uuid.uuid4()
+    comps = validate_and_transform_ats_batch([make_ats_model("A"), make_ats_model("B")], kit_id)
+    assert [c.name for c in comps] == ["A", "B"]
+    assert all(c.kit_id == kit_id for c in comps)
+    assert comps[0].metadata["rawCode"] == "code"
+
+def test_validate_and_transform_ats_batch_rejects_invalid_payload():
+    bad = DummyATSModel("A")
+    bad.tags = "not-a-list"
+    with pytest.raises(ValueError, match="failed validation"):
+        validate_and_transform_ats_batch([bad], uuid.uuid4())
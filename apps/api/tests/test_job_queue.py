@@ -0,0 +1,112 @@
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from routers.kits import get_job_queue
+from scripts.ingest_worker import run_job
+from services.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield JobQueue(os.path.join(tmpdir, "jobs.sqlite3"))
+
+
+@pytest.fixture
+def kit_dir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in ("Button.tsx", "Card.tsx", "Dialog.tsx"):
+            with open(os.path.join(tmpdir, name), "w") as f:
+                f.write(f"// {name}")
+        yield tmpdir
+
+
+def test_claim_is_exclusive_until_lease_expires(queue):
+    job = queue.enqueue("kit-1", "/kits/a")
+    assert job["status"] == "queued"
+    claimed = queue.claim("worker-a", lease_seconds=0.05)
+    assert claimed["id"] == job["id"] and claimed["status"] == "running"
+    assert queue.claim("worker-b") is None
+
+    time.sleep(0.1)
+    resumed = queue.claim("worker-b")
+    assert resumed["worker_id"] == "worker-b" and resumed["attempts"] == 2
+    assert not queue.heartbeat(job["id"], "worker-a")
+    assert queue.heartbeat(job["id"], "worker-b")
+
+
+def test_checkpoints_survive_and_register_keeps_progress(queue):
+    job = queue.enqueue("kit-1", "/kits/a")
+    queue.register_files(job["id"], ["a.tsx", "b.tsx"])
+    queue.checkpoint_file(job["id"], "a.tsx", ok=True)
+    queue.register_files(job["id"], ["a.tsx", "b.tsx"])
+    assert queue.pending_files(job["id"]) == ["b.tsx"]
+    assert queue.get(job["id"])["done_files"] == 1
+
+
+def test_events_are_incremental(queue):
+    job = queue.enqueue("kit-1", "/kits/a")
+    first = queue.events(job["id"])
+    queue.claim("worker-a")
+    later = queue.events(job["id"], after_id=first[-1]["id"])
+    assert [e["data"]["status"] for e in first] == ["queued"]
+    assert [e["data"]["status"] for e in later] == ["running"]
+
+
+def test_run_job_resumes_from_checkpoint(queue, kit_dir):
+    job = queue.enqueue("kit-1", kit_dir)
+    queue.register_files(job["id"], [os.path.join(kit_dir, "Button.tsx")])
+    queue.checkpoint_file(job["id"], os.path.join(kit_dir, "Button.tsx"), ok=True)
+    job = queue.claim("worker-a")
+
+    with patch("scripts.ingest_components.ingest_component_files", side_effect=lambda paths, *a, **kw: paths) as ingest:
+        run_job(queue, job, "worker-a", MagicMock(), MagicMock())
+    processed = [os.path.basename(c.args[0][0]) for c in ingest.call_args_list]
+    assert processed == ["Card.tsx", "Dialog.tsx"]
+    finished = queue.get(job["id"])
+    assert finished["status"] == "succeeded" and finished["done_files"] == 3
+
+
+def test_run_job_reports_failed_files(queue, kit_dir):
+    queue.enqueue("kit-1", kit_dir)
+    job = queue.claim("worker-a")
+    with patch("scripts.ingest_components.ingest_component_files", return_value=[]):
+        run_job(queue, job, "worker-a", MagicMock(), MagicMock())
+    finished = queue.get(job["id"])
+    assert finished["status"] == "failed" and finished["failed_files"] == 3
+
+
+def test_ingest_endpoint_enqueues_and_streams_progress(queue, kit_dir):
+    app.dependency_overrides[get_job_queue] = lambda: queue
+    client = TestClient(app)
+    try:
+        with patch("routers.kits.settings") as settings:
+            settings.KITS_ROOT = os.path.dirname(kit_dir)
+            response = client.post("/api/v1/kits/kit-1/ingest", json={"path": os.path.basename(kit_dir)})
+            escaped = client.post("/api/v1/kits/kit-1/ingest", json={"path": "../../etc"})
+        assert response.status_code == 202
+        assert escaped.status_code == 400
+        job_id = response.json()["id"]
+
+        job = queue.claim("worker-a")
+        queue.register_files(job_id, ["a.tsx"])
+        queue.checkpoint_file(job_id, "a.tsx", ok=True)
+        queue.finish(job_id, ok=True)
+
+        assert client.get(f"/api/v1/jobs/{job_id}").json()["status"] == "succeeded"
+        stream = client.get(f"/api/v1/jobs/{job_id}/events")
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        events = [line[len("event: "):] for line in stream.text.splitlines() if line.startswith("event: ")]
+        assert events == ["status", "status", "files", "file", "status"]
+
+        resumed = client.get(f"/api/v1/jobs/{job_id}/events", headers={"Last-Event-ID": "4"})
+        assert resumed.text.count("event: ") == 1
+        assert client.get("/api/v1/jobs/missing").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,98 @@
+import io
+import os
+import tarfile
+import threading
+import zipfile
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from routers.kits import get_supabase_client
+from services.blob_store import BlobStore
+from services.kit_bundle import TAR_GZ, ZIP, bundle_entries, source_path, stream_bundle
+from services.supabase_uploader import SupabaseUploader
+from tests.factories import make_ats
+from tests.fake_supabase import FakeSupabaseClient
+
+
+@pytest.fixture
+def client():
+    client = FakeSupabaseClient()
+    uploader = SupabaseUploader(client)
+    for name in ("Button", "Card", "Dialog"):
+        uploader.upload_ats(make_ats(name), kit_id="kit-1")
+    uploader.upload_ats(make_ats("Other"), kit_id="kit-2")
+    return client
+
+
+@pytest.fixture
+def api(client):
+    app.dependency_overrides[get_supabase_client] = lambda: client
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def read_manifest(data):
+    return [orjson.loads(line) for line in data.splitlines()]
+
+
+def test_zip_bundle_contains_sources_and_manifest(api):
+    response = api.get("/api/v1/kits/kit-1/bundle")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert 'filename="kit-1.zip"' in response.headers["content-disposition"]
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.read("kit-1/components/Card.tsx").decode() == "export function Card() { return null }\n"
+    manifest = read_manifest(archive.read("kit-1/manifest.jsonl"))
+    assert [entry["name"] for entry in manifest] == ["Button", "Card", "Dialog"]
+    assert manifest[0]["source"] == "components/Button.tsx"
+    assert manifest[0]["ats"]["description"] == "The Button component."
+    assert "rawCode" not in manifest[0]["ats"]
+
+
+def test_tar_gz_bundle(api):
+    response = api.get("/api/v1/kits/kit-1/bundle", params={"format": TAR_GZ})
+    assert response.status_code == 200
+    with tarfile.open(fileobj=io.BytesIO(response.content), mode="r:gz") as archive:
+        names = archive.getnames()
+        assert "kit-1/components/Dialog.tsx" in names
+        manifest = read_manifest(archive.extractfile("kit-1/manifest.jsonl").read())
+    assert len(manifest) == 3
+
+
+def test_bundle_errors(api):
+    assert api.get("/api/v1/kits/kit-1/bundle", params={"format": "rar"}).status_code == 400
+    assert api.get("/api/v1/kits/missing/bundle").status_code == 404
+
+
+def test_unsafe_names_get_safe_unique_paths():
+    assert source_path({"id": "abcdef123456", "name": "Button"}) == "components/Button.tsx"
+    assert source_path({"id": "abcdef123456", "name": "../../etc/passwd"}) == "components/etc_passwd-abcdef12.tsx"
+
+
+def test_stream_stays_bounded_by_the_queue_and_stops_when_closed():
+    pages = []
+
+    def rows():
+        # An endless kit: only a bounded number of rows may ever be read.
+        i = 0
+        while True:
+            pages.append(i)
+            metadata = make_ats(f"C{i}").model_dump()
+            metadata["rawCode"] = os.urandom(2500).hex()
+            yield {"id": f"id-{i}", "name": f"C{i}", "metadata": metadata}
+            i += 1
+
+    stream = stream_bundle(bundle_entries(rows(), BlobStore(FakeSupabaseClient()), page_size=10), ZIP, "kit",
+                           queue_chunks=2)
+    first = next(stream)
+    assert first.startswith(b"PK")
+    stream.close()
+    read = len(pages)
+    assert read < 200
+    assert not any(t.name == "bundle-kit" for t in threading.enumerate())
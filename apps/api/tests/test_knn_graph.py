@@ -0,0 +1,174 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from scripts.build_related_components import maintain_related_graph
+from scripts.ingest_worker import attach_indexes
+from services.change_feed import ChangeFeed
+from services.knn_graph import KnnGraph, NeighborStore, build_knn, get_neighbor_store
+from services.near_duplicates import minhash_signature
+from services.supabase_uploader import SupabaseUploader
+from tests.factories import make_ats
+from tests.fake_supabase import FakeSupabaseClient
+
+K = 5
+
+
+def random_rows(count, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {"id": f"c{i}", "kit_id": "kit-1", "name": f"Component{i}", "embedding": rng.normal(size=dim).tolist()}
+        for i in range(count)
+    ]
+
+
+def brute_force(rows, k=K):
+    keys = [row["id"] for row in rows]
+    matrix = np.array([row["embedding"] for row in rows], dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = matrix @ matrix.T
+    np.fill_diagonal(scores, -np.inf)
+    return {key: [keys[j] for j in np.argsort(-scores[i])[:k]] for i, key in enumerate(keys)}
+
+
+def neighbor_ids(graph):
+    return {key: [other for other, _ in neighbors] for key, neighbors in graph.neighbors.items()}
+
+
+def test_blocked_build_matches_brute_force():
+    rows = random_rows(300)
+    graph = KnnGraph(k=K, block_size=64)
+    graph.build(rows)
+    assert neighbor_ids(graph) == brute_force(rows)
+
+
+def test_build_knn_handles_tiny_inputs():
+    matrix = np.eye(2, dtype=np.float32)
+    assert build_knn(["a"], matrix[:1], K) == {"a": []}
+    assert [key for key, _ in build_knn(["a", "b"], matrix, K)["a"]] == ["b"]
+
+
+def test_incremental_updates_match_full_rebuild():
+    rows = random_rows(200)
+    graph = KnnGraph(k=K)
+    graph.build(rows[:100])
+    for row in rows[100:]:
+        changed = graph.upsert_row(row)
+        assert row["id"] in changed
+        assert len(changed) < len(graph.neighbors)
+    assert neighbor_ids(graph) == brute_force(rows)
+
+    # Move a component to a new embedding, then delete another.
+    moved = dict(rows[7], embedding=random_rows(1, seed=99)[0]["embedding"])
+    rows[7] = moved
+    graph.upsert_row(moved)
+    assert neighbor_ids(graph) == brute_force(rows)
+
+    removed = rows.pop(3)
+    affected = graph.remove(removed["id"])
+    assert all(removed["id"] not in ids for ids in neighbor_ids(graph).values())
+    assert affected and removed["id"] not in affected
+    assert neighbor_ids(graph) == brute_force(rows)
+
+
+def test_unchanged_embedding_writes_nothing_and_rename_updates_listers():
+    rows = random_rows(20)
+    graph = KnnGraph(k=K)
+    graph.build(rows)
+    assert graph.upsert_row(rows[0]) == set()
+    renamed = graph.upsert_row(dict(rows[0], name="Renamed"))
+    listers = {key for key, ids in neighbor_ids(graph).items() if "c0" in ids}
+    assert renamed == {"c0"} | listers
+
+
+def test_uploads_update_stored_lists_and_endpoint_serves_them():
+    client = FakeSupabaseClient(timestamps=True)
+    uploader = SupabaseUploader(client)
+    store = NeighborStore(client)
+    feed = ChangeFeed(client, tables=["components"], reconcile_every=0)
+    feed.prime()
+    maintain_related_graph(client, feed, k=2)
+
+    button = uploader.upload_ats(make_ats("Button"), kit_id="kit-1", embedding=[1.0, 0.0, 0.0])
+    uploader.upload_ats(make_ats("IconButton"), kit_id="kit-1", embedding=[0.9, 0.1, 0.0])
+    uploader.upload_ats(make_ats("Card"), kit_id="kit-1", embedding=[0.0, 1.0, 0.0])
+    feed.poll()
+
+    related = store.get(button["id"])
+    assert [entry["name"] for entry in related] == ["IconButton", "Card"]
+    assert related[0]["score"] > related[1]["score"]
+
+    app.dependency_overrides[get_neighbor_store] = lambda: store
+    try:
+        api = TestClient(app)
+        response = api.get(f"/api/v1/components/{button['id']}/related", params={"limit": 1})
+        missing = api.get("/api/v1/components/unknown/related")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert [entry["name"] for entry in response.json()] == ["IconButton"]
+    assert missing.status_code == 404
+
+
+def test_one_owner_writes_lists_for_every_upload_path():
+    client = FakeSupabaseClient(timestamps=True)
+    store = NeighborStore(client)
+    owner_feed = ChangeFeed(client, tables=["components"], reconcile_every=1)
+    owner_feed.prime()
+    maintain_related_graph(client, owner_feed, k=2)
+    calls = client.table("component_neighbors").calls
+
+    workers = []
+    for _ in range(2):
+        uploader = SupabaseUploader(client)
+        feed = ChangeFeed(client, tables=["components"], reconcile_every=1)
+        feed.prime()
+        workers.append((uploader, feed, attach_indexes(uploader, feed)))
+    (uploader_a, feed_a, duplicates_a), (uploader_b, feed_b, _) = workers
+    cli = SupabaseUploader(client)
+
+    button = uploader_b.upload_ats(make_ats("Button"), kit_id="kit-1", embedding=[1.0, 0.0, 0.0])
+    feed_a.poll()
+    assert [key for key, _ in duplicates_a.query(minhash_signature(make_ats("Button").rawCode))] == [button["id"]]
+    icon = uploader_a.upload_ats(make_ats("IconButton"), kit_id="kit-1", embedding=[0.9, 0.1, 0.0])
+    card = cli.upload_ats(make_ats("Card"), kit_id="kit-1", embedding=[0.0, 1.0, 0.0])
+    feed_a.poll()
+    feed_b.poll()
+    # Workers only follow the feed; they never write neighbor lists.
+    assert calls == []
+
+    owner_feed.poll()
+    assert [entry["name"] for entry in store.get(button["id"])] == ["IconButton", "Card"]
+    assert [entry["name"] for entry in store.get(card["id"])] == ["IconButton", "Button"]
+    # One write per change, each covering every list the change affected.
+    assert [action for action, _, _ in calls if action == "upsert"] == ["upsert"] * 3
+
+    client.table("components").delete().eq("id", icon["id"]).execute()
+    owner_feed.poll()
+    assert [entry["name"] for entry in store.get(button["id"])] == ["Card"]
+
+
+def test_owner_rebuilds_the_lists_when_another_embedding_version_is_activated():
+    client = FakeSupabaseClient(timestamps=True)
+    store = NeighborStore(client)
+    uploader = SupabaseUploader(client)
+    feed = ChangeFeed(client, tables=["components", "embedding_versions"], reconcile_every=0)
+    feed.prime()
+    button = uploader.upload_ats(make_ats("Button"), kit_id="kit-1", embedding=[1.0, 0.0, 0.0])
+    uploader.upload_ats(make_ats("IconButton"), kit_id="kit-1", embedding=[0.9, 0.1, 0.0])
+    uploader.upload_ats(make_ats("Card"), kit_id="kit-1", embedding=[0.0, 1.0, 0.0])
+    follower = maintain_related_graph(client, feed, k=2)
+    assert [entry["name"] for entry in store.get(button["id"])] == ["IconButton", "Card"]
+
+    # The cutover swaps every vector in place; only the version row reports it.
+    new_vectors = {"Button": [0.0, 0.0, 1.0], "IconButton": [1.0, 0.0, 0.0], "Card": [0.1, 0.0, 0.9]}
+    for row in client.table("components").rows:
+        row["embedding"] = new_vectors[row["name"]]
+    client.table("embedding_versions").upsert(
+        {"version": "mpnet-v1", "model": "all-mpnet-base-v2", "status": "active"}, on_conflict="version"
+    ).execute()
+    feed.poll()
+
+    assert follower.version == "mpnet-v1"
+    assert [entry["name"] for entry in store.get(button["id"])] == ["Card", "IconButton"]
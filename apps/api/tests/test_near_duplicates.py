@@ -0,0 +1,172 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from schemas.ats import ATSModel
+from scripts.ingest_components import ingest_component_files
+from services.component_search import ComponentSearch, get_component_search
+from services.near_duplicates import (
+    MINHASH_KEY,
+    NearDuplicateIndex,
+    decode_signature,
+    encode_signature,
+    estimated_similarity,
+    minhash_signature,
+)
+from services.supabase_uploader import SupabaseUploader
+from tests.factories import make_ats
+from tests.fake_supabase import FakeSupabaseClient
+
+BUTTON_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "..", "packages", "ui", "components", "ui", "button.tsx")
+
+with open(BUTTON_PATH) as f:
+    BUTTON = f.read()
+
+# The same component vendored into another kit: a header comment, reformatting and one tweaked class.
+VENDORED_BUTTON = "// Copied from shadcn/ui\n" + BUTTON.replace("  ", "    ").replace("rounded-md", "rounded-lg", 1)
+
+CARD = """import * as React from "react"
+import { cn } from "@/lib/utils"
+
+function Card({ className, ...props }: React.ComponentProps<"div">) {
+  return <div data-slot="card" className={cn("bg-card text-card-foreground flex flex-col gap-6 rounded-xl border py-6 shadow-sm", className)} {...props} />
+}
+
+function CardHeader({ className, ...props }: React.ComponentProps<"div">) {
+  return <div data-slot="card-header" className={cn("grid auto-rows-min items-start gap-1.5 px-6", className)} {...props} />
+}
+
+export { Card, CardHeader }
+"""
+
+
+def test_signature_similarity_tracks_source_similarity():
+    button, vendored, card = (minhash_signature(code) for code in (BUTTON, VENDORED_BUTTON, CARD))
+    assert estimated_similarity(button, vendored) >= 0.9
+    assert estimated_similarity(button, card) < 0.3
+
+
+def test_signature_roundtrip_and_version_check():
+    signature = minhash_signature(BUTTON)
+    encoded = encode_signature(signature)
+    assert (decode_signature(encoded) == signature).all()
+    assert decode_signature("0:" + encoded.partition(":")[2]) is None
+    assert decode_signature(None) is None
+
+
+def test_index_query_and_clusters():
+    index = NearDuplicateIndex(threshold=0.9)
+    index.upsert("a", minhash_signature(BUTTON))
+    index.upsert("b", minhash_signature(VENDORED_BUTTON))
+    index.upsert("c", minhash_signature(CARD))
+
+    assert [key for key, _ in index.query(minhash_signature(BUTTON))] == ["a", "b"]
+    clusters = index.clusters()
+    assert [keys for keys, _ in clusters] == [["a", "b"]]
+    assert clusters[0][1] >= 0.9
+
+    index.remove("b")
+    assert index.clusters() == []
+
+
+def test_upload_stores_signature_in_metadata():
+    client = FakeSupabaseClient()
+    row = SupabaseUploader(client).upload_ats(make_ats("Button", BUTTON), kit_id="kit-1", embedding=[0.1, 0.2])
+
+    assert row["id"]
+    assert (decode_signature(row["metadata"][MINHASH_KEY]) == minhash_signature(BUTTON)).all()
+
+
+def test_ingestion_reuses_ats_and_embedding_of_near_duplicate(tmp_path):
+    client = FakeSupabaseClient()
+    uploader = SupabaseUploader(client)
+    existing = uploader.upload_ats(make_ats("Button", BUTTON), kit_id="kit-1", embedding=[0.1, 0.2, 0.3])
+    duplicates = NearDuplicateIndex(threshold=0.9)
+    duplicates.upsert_row(existing)
+
+    vendored = tmp_path / "button.tsx"
+    vendored.write_text(VENDORED_BUTTON)
+    card = tmp_path / "card.tsx"
+    card.write_text(CARD)
+    creator = MagicMock()
+    creator.create_ats_from_file.side_effect = lambda path: make_ats("Card", CARD)
+
+    with patch("scripts.ingest_components.generate_embedding", return_value=[0.9, 0.9, 0.9]) as embed:
+        ingested = ingest_component_files([str(vendored), str(card)], "kit-2", uploader, creator, duplicates=duplicates)
+
+    assert ingested == [str(vendored), str(card)]
+    creator.create_ats_from_file.assert_called_once_with(str(card))
+    embed.assert_called_once()
+    rows = {(row["kit_id"], row["name"]): row for row in client.table("components").rows}
+    copy = rows[("kit-2", "Button")]
+    assert copy["embedding"] == pytest.approx([0.1, 0.2, 0.3])
+    assert copy["metadata"]["description"] == "The Button component."
+    assert uploader.get_raw_code(copy["metadata"]) == VENDORED_BUTTON
+    # Newly uploaded components join the index for the rest of the run.
+    assert len(duplicates) == 3
+
+
+def test_duplicates_endpoint_lists_clusters():
+    client = FakeSupabaseClient()
+    uploader = SupabaseUploader(client)
+    search = ComponentSearch(embed=lambda text: [0.0])
+    uploader.add_listener(search.upsert)
+    uploader.upload_ats(make_ats("Button", BUTTON), kit_id="kit-1")
+    uploader.upload_ats(make_ats("Button", VENDORED_BUTTON), kit_id="kit-2")
+    uploader.upload_ats(make_ats("Card", CARD), kit_id="kit-2")
+
+    app.dependency_overrides[get_component_search] = lambda: search
+    try:
+        response = TestClient(app).get("/api/v1/components/duplicates", params={"kit_id": "kit-1"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    [cluster] = response.json()
+    assert sorted(c["kit_id"] for c in cluster["components"]) == ["kit-1", "kit-2"]
+    assert cluster["similarity"] >= 0.9
+
+
+def test_edited_file_is_regenerated_not_reused_from_its_own_row(tmp_path):
+    client = FakeSupabaseClient()
+    uploader = SupabaseUploader(client)
+    existing = uploader.upload_ats(make_ats("Button", BUTTON), kit_id="kit-1", embedding=[0.1, 0.2, 0.3])
+    duplicates = NearDuplicateIndex(threshold=0.9)
+    duplicates.upsert_row(existing)
+
+    edited = BUTTON.replace("asChild = false,", "asChild = false,\n  loading = false,")
+    assert estimated_similarity(minhash_signature(BUTTON), minhash_signature(edited)) >= 0.9
+    button = tmp_path / "button.tsx"
+    button.write_text(edited)
+    prop = {"type": "boolean", "isOptional": True, "options": None}
+    regenerated = ATSModel(**{**make_ats("Button", edited).model_dump(), "propsInterface": {"asChild": prop, "loading": prop}})
+    creator = MagicMock()
+    creator.create_ats_from_file.return_value = regenerated
+
+    with patch("scripts.ingest_components.generate_embedding", return_value=[0.9, 0.9, 0.9]):
+        assert ingest_component_files([str(button)], "kit-1", uploader, creator, duplicates=duplicates) == [str(button)]
+
+    creator.create_ats_from_file.assert_called_once_with(str(button))
+    [row] = client.table("components").rows
+    assert sorted(row["metadata"]["propsInterface"]) == ["asChild", "loading"]
+    assert row["embedding"] == pytest.approx([0.9, 0.9, 0.9])
+
+
+def test_unchanged_file_reuses_its_own_row(tmp_path):
+    client = FakeSupabaseClient()
+    uploader = SupabaseUploader(client)
+    existing = uploader.upload_ats(make_ats("Button", BUTTON), kit_id="kit-1", embedding=[0.1, 0.2, 0.3])
+    duplicates = NearDuplicateIndex(threshold=0.9)
+    duplicates.upsert_row(existing)
+    button = tmp_path / "button.tsx"
+    button.write_text(BUTTON)
+    creator = MagicMock()
+
+    with patch("scripts.ingest_components.generate_embedding") as embed:
+        assert ingest_component_files([str(button)], "kit-1", uploader, creator, duplicates=duplicates) == [str(button)]
+
+    creator.create_ats_from_file.assert_not_called()
+    embed.assert_not_called()
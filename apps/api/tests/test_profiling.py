@@ -0,0 +1,81 @@
+import time
+
+from fastapi import APIRouter, FastAPI, Query
+from fastapi.testclient import TestClient
+
+from services import profiling
+from services.profiling import ProfiledRoute, collapse, profile_stage, profiled
+
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def read_folded(path):
+    stacks = {}
+    for line in path.read_text().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        stacks[stack] = stacks.get(stack, 0) + int(count)
+    return stacks
+
+
+def test_profiled_block_writes_collapsed_stacks(tmp_path):
+    with profiled("stage", "embed", interval=0.001, directory=str(tmp_path)):
+        busy_wait(0.1)
+
+    stacks = read_folded(tmp_path / "stage-embed.folded")
+    busy = sum(count for stack, count in stacks.items() if "busy_wait (tests/test_profiling.py" in stack)
+    assert busy >= 10
+    assert all(stack.split(";")[-1] for stack in stacks)
+
+
+def test_collapse_orders_frames_root_first():
+    import sys
+
+    stack = collapse(sys._getframe())
+    assert stack.split(";")[-1].startswith("test_collapse_orders_frames_root_first (tests/test_profiling.py:")
+
+
+def test_stages_are_free_when_disabled():
+    assert profile_stage("embed") is profile_stage("upload")
+    with profile_stage("embed"):
+        pass
+
+
+def test_selected_stages_are_profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILED_STAGES", frozenset({"embed"}))
+    monkeypatch.setattr(profiling.settings, "PROFILE_INTERVAL_MS", 1.0)
+    with profile_stage("embed"):
+        busy_wait(0.05)
+    with profile_stage("upload"):
+        busy_wait(0.05)
+    assert [path.name for path in tmp_path.iterdir()] == ["stage-embed.folded"]
+
+
+def test_sampled_requests_are_profiled_per_route(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "REQUEST_RATE", 1.0)
+    monkeypatch.setattr(profiling.settings, "PROFILE_INTERVAL_MS", 1.0)
+    router = APIRouter(route_class=ProfiledRoute)
+
+    @router.get("/slow")
+    def slow(seconds: float = Query(0.05)):
+        busy_wait(seconds)
+        return {"slept": seconds}
+
+    @router.get("/slow-async")
+    async def slow_async():
+        busy_wait(0.05)
+        return {}
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    assert client.get("/slow", params={"seconds": 0.06}).json() == {"slept": 0.06}
+    assert client.get("/slow-async").status_code == 200
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["route-GET_slow-async.folded", "route-GET_slow.folded"]
+    assert any("slow (tests/test_profiling.py" in stack for stack in read_folded(tmp_path / "route-GET_slow.folded"))
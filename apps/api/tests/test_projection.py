@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from scripts.evaluate_projection import evaluate
+from services.component_search import ComponentSearch
+from services.knn_graph import KnnGraph
+from services.projection import EmbeddingProjection, fit_pca, random_projection
+
+
+def clustered_vectors(count=600, dim=48, latent=8, seed=0):
+    # Embeddings of real components live near a low-dimensional subspace.
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(latent, dim))
+    return (rng.normal(size=(count, latent)) @ basis + 0.05 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def test_pca_preserves_neighbors_and_shrinks_index():
+    vectors = clustered_vectors()
+    report = evaluate(vectors, fit_pca(vectors, 12), k=10, query_count=100)
+    assert report["recall"] > 0.9
+    assert report["reduced_mb"] == pytest.approx(report["full_mb"] * 12 / 48)
+
+
+def test_random_projection_recall_improves_with_dimension():
+    vectors = clustered_vectors()
+    low = evaluate(vectors, random_projection(48, 4), k=10, query_count=100)["recall"]
+    high = evaluate(vectors, random_projection(48, 32), k=10, query_count=100)["recall"]
+    assert high > low
+
+
+def test_save_and_load_keep_version(tmp_path):
+    projection = fit_pca(clustered_vectors(), 16)
+    path = str(tmp_path / "projection.npz")
+    projection.save(path)
+    loaded = EmbeddingProjection.load(path)
+    assert loaded.version == projection.version
+    assert loaded.version.startswith("pca-48x16-")
+    with pytest.raises(ValueError):
+        loaded.apply(np.zeros(10))
+
+
+def test_indexes_store_projected_vectors():
+    vectors = clustered_vectors(count=50)
+    projection = fit_pca(vectors, 8)
+    rows = [{"id": str(i), "kit_id": "kit", "name": f"C{i}", "metadata": {}, "embedding": v.tolist()} for i, v in enumerate(vectors)]
+
+    search = ComponentSearch(embed=lambda text: vectors[3].tolist(), projection=projection)
+    search.load(rows, batch_size=16)
+    assert search.vectors.dim == 8
+    assert search.search("anything", limit=1)[0].id == "3"
+
+    graph = KnnGraph(k=3, projection=projection)
+    graph.build(rows)
+    graph.upsert_row(dict(rows[0], id="new"))
+    assert graph.vectors.dim == 8
+    assert graph.related("new")[0][0] == "0"
+
+
+def test_mismatched_embeddings_stay_lexically_searchable():
+    projection = random_projection(48, 8)
+    search = ComponentSearch(embed=lambda text: [0.0] * 48, projection=projection)
+    search.upsert({"id": "x", "kit_id": "kit", "name": "Button", "metadata": {"componentName": "Button"}, "embedding": [1.0, 0.0]})
+    assert len(search.vectors) == 0
+    assert search.search("button")[0].id == "x"
@@ -0,0 +1,109 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services.component_search import ComponentSearch, get_component_search
+from services.query_cache import KitRevisions, QueryCache, filters_key, normalize_query
+from tests.test_component_search import ROWS, make_row
+
+
+class CountingEmbed:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return [0.0, 1.0, 0.0]
+
+
+def make_search():
+    embed = CountingEmbed()
+    search = ComponentSearch(embed=embed, cache_entries=16, cache_ttl_seconds=60)
+    search.load(ROWS + [make_row("4", "Badge", "A small status label.", ["badge"], kit_id="kit-2",
+                                 embedding=[1.0, 1.0, 0.0])])
+    return search, embed
+
+
+def test_query_cache_evicts_least_recently_used_and_expires():
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    short = QueryCache(max_entries=2, ttl_seconds=0.01)
+    short.put("a", 1)
+    time.sleep(0.02)
+    assert short.get("a") is None
+    assert short.stats()["expirations"] == 1
+
+
+def test_keys_ignore_whitespace_and_filter_order():
+    assert normalize_query("  as   Child ") == "as Child"
+    assert filters_key({"tag": ["b", "a"], "kit": ["k"]}) == filters_key({"kit": ["k"], "tag": ["a", "b", "a"]})
+    revisions = KitRevisions()
+    revisions.bump(["kit-1"])
+    assert revisions.token(["kit-1"]) == (("kit-1", 1),)
+    assert revisions.token() == ("*", 1)
+
+
+def test_repeated_search_is_served_from_cache():
+    search, embed = make_search()
+    first = search.search("clickable button", limit=2)
+    second = search.search("clickable  button ", limit=2)
+
+    assert second == first
+    assert embed.calls == ["clickable button"]
+    assert search.cache_stats()["results"]["hits"] == 1
+
+
+def test_query_embedding_is_reused_across_filters_and_limits():
+    search, embed = make_search()
+    search.search("status", limit=1)
+    search.search("status", limit=5, filters={"kit": ["kit-2"]})
+    assert embed.calls == ["status"]
+    assert search.cache_stats()["query_embeddings"]["hit_rate"] == 0.5
+
+
+def test_write_invalidates_only_queries_over_that_kit():
+    search, _ = make_search()
+    search.search("label", filters={"kit": ["kit-2"]})
+    search.search("label", filters={"kit": ["kit-1"]})
+    search.search("label")
+
+    search.upsert(make_row("5", "Label", "A form label.", kit_id="kit-1"))
+
+    hits_before = search.results.hits
+    assert "Label" not in [r.name for r in search.search("label", filters={"kit": ["kit-2"]})]
+    assert search.results.hits == hits_before + 1
+    assert "Label" in [r.name for r in search.search("label", filters={"kit": ["kit-1"]})]
+    assert "Label" in [r.name for r in search.search("label")]
+    assert search.results.hits == hits_before + 1
+
+    search.remove("5")
+    assert "Label" not in [r.name for r in search.search("label", filters={"kit": ["kit-1"]})]
+
+
+def test_listing_is_cached_until_its_kit_changes():
+    search, _ = make_search()
+    first = search.list_components({"kit": ["kit-1"]})
+    assert search.list_components({"kit": ["kit-1"]}) is first
+    search.upsert(make_row("4", "Badge", "Moved to the first kit.", kit_id="kit-1"))
+    assert search.list_components({"kit": ["kit-1"]}).total == first.total + 1
+
+
+def test_metrics_endpoint_reports_hit_rates():
+    search, _ = make_search()
+    search.search("button")
+    search.search("button")
+    app.dependency_overrides[get_component_search] = lambda: search
+    try:
+        response = TestClient(app).get("/api/v1/components/search/metrics")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.json()["results"]["hit_rate"] == 0.5
+    assert response.json()["query_embeddings"]["misses"] == 1
@@ -0,0 +1,147 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from scripts.build_vector_snapshot import build_snapshot
+from services.component_search import ComponentSearch
+from services.projection import random_projection
+from services.shared_vectors import CURRENT_FILE, SharedVectorIndex, publish_snapshot
+from services.vector_index import VectorIndex
+
+API_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def random_rows(count=200, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{"id": f"c{i:04d}", "embedding": rng.normal(size=dim).tolist()} for i in range(count)]
+
+
+def private_index(rows):
+    index = VectorIndex()
+    for row in rows:
+        index.upsert(row["id"], row["embedding"])
+    return index
+
+
+def test_search_matches_private_index(tmp_path):
+    rows = random_rows()
+    build_snapshot(rows, str(tmp_path))
+    shared = SharedVectorIndex(str(tmp_path))
+    private = private_index(rows)
+    query = np.random.default_rng(1).normal(size=16)
+
+    assert len(shared) == 200
+    assert isinstance(shared._generation.matrix, np.memmap)
+    assert [key for key, _ in shared.search(query, 10)] == [key for key, _ in private.search(query, 10)]
+    allowed = ["c0003", "c0150", "c0042", "missing"]
+    shared_hits, private_hits = shared.search(query, 10, allowed), private.search(query, 10, allowed)
+    assert [key for key, _ in shared_hits] == [key for key, _ in private_hits]
+    assert [score for _, score in shared_hits] == pytest.approx([score for _, score in private_hits])
+    assert shared.get("c0007") == pytest.approx(private.get("c0007"))
+    assert "missing" not in shared
+
+
+def test_readers_swap_to_new_generation_atomically(tmp_path):
+    directory = str(tmp_path)
+    first = publish_snapshot(directory, ["a", "b"], np.eye(2, dtype=np.float32), keep=1)
+    reader = SharedVectorIndex(directory, refresh_seconds=0)
+    old_matrix = reader._generation.matrix
+    assert reader.search([1.0, 0.0], 1)[0][0] == "a"
+
+    second = publish_snapshot(directory, ["a", "b", "c"], np.array([[0, 1], [1, 0], [0.6, 0.8]], dtype=np.float32), keep=1)
+    assert reader.search([1.0, 0.0], 1)[0][0] == "b"
+    assert reader.generation == second
+    # The previous generation was pruned, yet its mapping stays readable.
+    assert not os.path.exists(os.path.join(directory, first))
+    assert old_matrix[0, 0] == 1.0
+    with open(os.path.join(directory, CURRENT_FILE)) as f:
+        assert f.read().strip() == second
+
+
+def test_overlay_takes_precedence_over_snapshot(tmp_path):
+    publish_snapshot(str(tmp_path), ["a", "b"], np.eye(2, dtype=np.float32))
+    index = SharedVectorIndex(str(tmp_path))
+
+    index.upsert("b", [1.0, 0.1])
+    index.upsert("c", [0.0, 1.0])
+    index.remove("a")
+
+    assert len(index) == 2
+    assert [key for key, _ in index.search([1.0, 0.0], 5)] == ["b", "c"]
+    assert index.get("a") is None
+
+
+def test_new_generation_supersedes_older_overrides(tmp_path):
+    directory = str(tmp_path)
+    publish_snapshot(directory, ["a", "b"], np.eye(2, dtype=np.float32))
+    index = SharedVectorIndex(directory, refresh_seconds=0)
+    index.upsert("a", [0.0, 1.0])
+    index.remove("b")
+
+    # A snapshot read before a later write must not drop that write.
+    publish_snapshot(directory, ["a"], np.array([[0.0, 1.0]], dtype=np.float32), as_of=0.0)
+    assert index.refresh()
+    index.upsert("c", [1.0, 0.0])
+    assert sorted(index._written_at) == ["a", "b", "c"]
+
+    publish_snapshot(directory, ["a", "c"], np.array([[1.0, 0.0], [1.0, 0.0]], dtype=np.float32))
+    assert index.refresh()
+    assert index.get("a") == pytest.approx([1.0, 0.0])
+    assert len(index.overlay) == 0 and not index._shadowed
+    assert len(index) == 2
+
+
+def test_snapshot_with_other_projection_is_ignored(tmp_path):
+    projection = random_projection(16, 4)
+    build_snapshot(random_rows(), str(tmp_path), projection)
+
+    assert len(SharedVectorIndex(str(tmp_path), projection=projection.version)) == 200
+    assert len(SharedVectorIndex(str(tmp_path))) == 0
+
+
+def test_component_search_uses_shared_vectors_without_loading_embeddings(tmp_path):
+    publish_snapshot(str(tmp_path), ["1", "2"], np.eye(2, dtype=np.float32))
+    search = ComponentSearch(embed=lambda text: [0.0, 1.0], vectors=SharedVectorIndex(str(tmp_path)))
+    search.load([
+        {"id": "1", "kit_id": "k", "name": "Button", "metadata": {"description": "Clickable."}},
+        {"id": "2", "kit_id": "k", "name": "Card", "metadata": {"description": "A surface."}},
+    ])
+
+    [top, *_] = search.search("surface", limit=2)
+    assert top.id == "2" and top.vector_rank == 1
+
+
+def test_cached_search_results_follow_a_new_snapshot(tmp_path):
+    directory = str(tmp_path)
+    publish_snapshot(directory, ["1", "2"], np.eye(2, dtype=np.float32))
+    search = ComponentSearch(
+        embed=lambda text: [0.0, 1.0], vectors=SharedVectorIndex(directory, refresh_seconds=0), cache_entries=16
+    )
+    search.load([
+        {"id": "1", "kit_id": "kit-1", "name": "Button", "metadata": {"description": "A control."}},
+        {"id": "2", "kit_id": "kit-1", "name": "Card", "metadata": {"description": "A control."}},
+    ])
+    assert [r.name for r in search.search("surface", limit=1)] == ["Card"]
+
+    # No kit revision changes, but the vectors behind the cached ranking do.
+    publish_snapshot(directory, ["1", "2"], np.array([[0.0, 1.0], [1.0, 0.0]], dtype=np.float32))
+    assert [r.name for r in search.search("surface", limit=1)] == ["Button"]
+
+
+def test_other_processes_attach_to_the_same_files(tmp_path):
+    rows = random_rows()
+    build_snapshot(rows, str(tmp_path))
+    query = [float(x) for x in np.random.default_rng(2).normal(size=16)]
+    script = (
+        "import sys; from services.shared_vectors import SharedVectorIndex; "
+        f"print(','.join(k for k, _ in SharedVectorIndex(sys.argv[1]).search({query}, 5)))"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(API_ROOT, "src"), API_ROOT]))
+    output = subprocess.run(
+        [sys.executable, "-c", script, str(tmp_path)], env=env, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+    assert output.split(",") == [key for key, _ in private_index(rows).search(query, 5)]
@@ -0,0 +1,130 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services.theme_css import ThemeCompiler, ThemeStore, get_theme_store, render_css, theme_variables
+from tests.fake_supabase import FakeSupabaseClient
+
+KIT_THEME = {
+    "light": {"background": "oklch(1 0 0)", "primary": "oklch(0.205 0 0)", "radius": "0.625rem"},
+    "dark": {"background": "oklch(0.145 0 0)", "primary": "oklch(0.985 0 0)"},
+}
+
+
+@pytest.fixture
+def store():
+    client = FakeSupabaseClient()
+    client.table("design_kits").write({"id": "kit-1", "name": "Nova", "theme": KIT_THEME})
+    return ThemeStore(client)
+
+
+@pytest.fixture
+def api(store):
+    app.dependency_overrides[get_theme_store] = lambda: store
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_flat_and_mode_configs_render_minified_css():
+    assert render_css(theme_variables({"--primary": "oklch(0.5  0.2 250)", "radius": 4})) == (
+        ":root{--primary:oklch(0.5 0.2 250);--radius:4}"
+    )
+    css = render_css(theme_variables({"cssVars": {"dark": {"primary": "black"}, "light": {"primary": "white"}}}))
+    assert css == ":root{--primary:white}.dark{--primary:black}"
+
+
+@pytest.mark.parametrize("config", [
+    {"primary": "red;} body{display:none"},
+    {"bad name": "red"},
+    {"primary": {"nested": "red"}},
+    {"primary": "red</style>"},
+])
+def test_unsafe_variables_are_rejected(config):
+    with pytest.raises(ValueError):
+        theme_variables(config)
+
+
+def test_compiled_css_is_memoized_by_content_hash():
+    compiler = ThemeCompiler()
+    first = compiler.compile({"primary": "red", "radius": "4px"})
+    second = compiler.compile({"radius": "4px", "--primary": "red"})
+    assert second is first
+    assert compiler.compile({"primary": "blue"}).hash != first.hash
+
+
+def test_theme_is_merged_over_kit_defaults(store):
+    compiled = store.compile({"dark": {"primary": "oklch(0.7 0.2 250)"}}, kit_id="kit-1")
+    assert "--radius:0.625rem" in compiled.css
+    assert ".dark{--background:oklch(0.145 0 0);--primary:oklch(0.7 0.2 250)}" in compiled.css
+
+
+def test_save_precompiles_and_serves_immutable_css(api, store):
+    response = api.put("/api/v1/themes/theme-1", json={
+        "user_id": "user-1", "name": "Ocean", "config": {"primary": "oklch(0.6 0.1 230)"}, "kit_id": "kit-1",
+    })
+    assert response.status_code == 200
+    saved = response.json()
+    row = store.client.table("user_themes").rows[0]
+    assert row["css_hash"] == saved["css_hash"] and "--primary:oklch(0.6 0.1 230)" in row["css"]
+
+    # A fresh worker serves the stored CSS without compiling.
+    store.compiler = ThemeCompiler()
+    css = api.get(saved["css_url"])
+    assert css.status_code == 200
+    assert css.text == row["css"]
+    assert css.headers["content-type"].startswith("text/css")
+    assert css.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert css.headers["etag"] == f'"{saved["css_hash"]}"'
+
+    revalidated = api.get(saved["css_url"], headers={"If-None-Match": css.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+
+def test_theme_id_url_revalidates_and_follows_saves(api):
+    body = {"user_id": "user-1", "name": "Ocean", "config": {"primary": "blue"}}
+    api.put("/api/v1/themes/theme-1", json=body)
+    first = api.get("/api/v1/themes/theme-1.css")
+    assert first.headers["cache-control"] == "no-cache"
+    assert api.get("/api/v1/themes/theme-1.css", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+    api.put("/api/v1/themes/theme-1", json={**body, "config": {"primary": "green"}})
+    second = api.get("/api/v1/themes/theme-1.css", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200
+    assert second.text == ":root{--primary:green}"
+
+
+def test_theme_id_url_follows_changes_to_kit_defaults():
+    client = FakeSupabaseClient(timestamps=True)
+    kits = client.table("design_kits")
+    kits.write({"id": "kit-1", "name": "Nova", "theme": KIT_THEME})
+    store = ThemeStore(client)
+    app.dependency_overrides[get_theme_store] = lambda: store
+    try:
+        api = TestClient(app)
+        saved = api.put("/api/v1/themes/theme-1", json={
+            "user_id": "user-1", "name": "Ocean", "config": {"primary": "blue"}, "kit_id": "kit-1",
+        }).json()
+        first = api.get("/api/v1/themes/theme-1.css")
+        assert "--radius:0.625rem" in first.text
+
+        kits.update({"theme": {"light": {"radius": "1rem"}}}).eq("id", "kit-1").execute()
+        second = api.get("/api/v1/themes/theme-1.css", headers={"If-None-Match": first.headers["etag"]})
+        old_url = api.get(saved["css_url"])
+    finally:
+        app.dependency_overrides.clear()
+
+    assert second.status_code == 200
+    assert second.text == ":root{--primary:blue;--radius:1rem}"
+    assert client.table("user_themes").rows[0]["css_hash"] == second.headers["etag"].strip('"')
+    # The hash URL issued before the change still serves the CSS it named.
+    assert old_url.text == first.text
+
+
+def test_errors(api):
+    assert api.put("/api/v1/themes/t", json={"user_id": "u", "name": "x", "config": {"a": "b;"}}).status_code == 400
+    assert api.post("/api/v1/themes/compile", json={"config": {}, "kit_id": "missing"}).status_code == 404
+    assert api.get("/api/v1/themes/missing.css").status_code == 404
+    assert api.get("/api/v1/themes/css/0000.css").status_code == 404
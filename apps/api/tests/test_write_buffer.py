@@ -0,0 +1,179 @@
+import threading
+import time
+
+import pytest
+
+from services.blob_store import RAW_CODE_HASH_KEY
+from services.supabase_uploader import SupabaseUploader
+from services.write_buffer import WriteBehindBuffer
+from tests.factories import make_ats
+from tests.fake_supabase import FakeSupabaseClient
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+def test_writes_are_coalesced_by_key():
+    batches = []
+    buffer = WriteBehindBuffer(batches.append, max_batch=10, flush_seconds=60)
+    for version in range(3):
+        buffer.put("button", f"button-v{version}")
+    buffer.put("card", "card-v0")
+    buffer.flush()
+
+    assert batches == [["button-v2", "card-v0"]]
+    assert buffer.summary()["coalesced"] == 2
+    buffer.close()
+
+
+def test_batch_size_triggers_background_flush():
+    batches = []
+    buffer = WriteBehindBuffer(batches.append, max_batch=3, flush_seconds=60)
+    for i in range(3):
+        buffer.put(i, i)
+    wait_until(lambda: batches)
+    assert batches == [[0, 1, 2]]
+    buffer.close()
+
+
+def test_time_threshold_flushes_a_partial_batch():
+    batches = []
+    buffer = WriteBehindBuffer(batches.append, max_batch=100, flush_seconds=0.05)
+    buffer.put("a", 1)
+    wait_until(lambda: batches)
+    assert batches == [[1]]
+    buffer.close()
+
+
+def test_full_buffer_blocks_producers():
+    release = threading.Event()
+    batches = []
+
+    def slow_write(items):
+        release.wait()
+        batches.append(items)
+
+    buffer = WriteBehindBuffer(slow_write, max_batch=2, max_pending=2, flush_seconds=60)
+    buffer.put("a", 1)
+    buffer.put("b", 2)  # Taken by the flush thread, which is now stuck writing.
+    wait_until(lambda: len(buffer) == 0)
+    buffer.put("c", 3)
+    buffer.put("d", 4)
+    with pytest.raises(TimeoutError):
+        buffer.put("e", 5, timeout=0.05)
+    # Rewriting a buffered key never blocks.
+    buffer.put("c", 30, timeout=0.05)
+
+    release.set()
+    buffer.close()
+    assert batches == [[1, 2], [30, 4]]
+    assert buffer.summary()["blocked"] == 1
+
+
+def test_failed_batch_is_retried_without_overwriting_newer_writes():
+    attempts = []
+
+    def flaky_write(items):
+        attempts.append(items)
+        if len(attempts) == 1:
+            buffer.put("a", "a-v1")
+            raise ConnectionError("network down")
+
+    buffer = WriteBehindBuffer(flaky_write, max_batch=10, flush_seconds=60)
+    buffer.put("a", "a-v0")
+    buffer.put("b", "b-v0")
+    with pytest.raises(ConnectionError):
+        buffer.flush()
+    buffer.close()
+
+    assert sorted(attempts[-1]) == ["a-v1", "b-v0"]
+    assert buffer.summary()["failures"] == 1
+
+
+def test_batch_failing_repeatedly_is_split_and_bad_items_dropped():
+    written = []
+
+    def write(items):
+        if "bad" in items:
+            raise ValueError("invalid row")
+        written.extend(items)
+
+    buffer = WriteBehindBuffer(write, max_batch=10, flush_seconds=60, max_attempts=2)
+    for key in ("a", "b", "c"):
+        buffer.put(key, "bad" if key == "b" else key)
+    with pytest.raises(ValueError):
+        buffer.flush()
+    assert len(buffer) == 3
+
+    # The second failure splits the batch instead of raising again.
+    buffer.flush()
+    assert len(buffer) == 0
+    assert written == ["a", "c"]
+    assert [(key, item) for key, item, _ in buffer.dead_letters] == [("b", "bad")]
+    assert buffer.summary()["dropped"] == 1
+
+    # A newer write for a dropped key starts over.
+    buffer.put("b", "b-v1")
+    buffer.close()
+    assert written[-1] == "b-v1"
+
+
+def test_background_flush_does_not_stall_on_a_bad_item():
+    written = []
+
+    def write(items):
+        if "bad" in items:
+            raise ValueError("invalid row")
+        written.extend(items)
+
+    buffer = WriteBehindBuffer(write, max_batch=2, flush_seconds=0.01, max_attempts=3)
+    buffer.put("a", "bad")
+    buffer.put("b", "b")
+    wait_until(lambda: written == ["b"])
+    buffer.put("c", "c")
+    wait_until(lambda: written == ["b", "c"])
+    buffer.close()
+    assert buffer.summary()["failures"] == 3
+
+
+def test_closed_buffer_rejects_writes():
+    buffer = WriteBehindBuffer(lambda items: None)
+    buffer.close()
+    with pytest.raises(RuntimeError):
+        buffer.put("a", 1)
+
+
+def test_uploader_write_behind_sends_last_version_in_one_batch():
+    client = FakeSupabaseClient()
+    uploader = SupabaseUploader(client, write_behind=True)
+    uploaded = []
+    uploader.add_listener(uploaded.append)
+
+    draft, final, card = (
+        make_ats(name, f"export function {name}() {{ return null }} // {description}", description=description)
+        for name, description in [("Button", "Draft."), ("Button", "A clickable button."), ("Card", "A surface.")]
+    )
+
+    assert uploader.upload_ats(draft, kit_id="kit-1") is None
+    uploader.upload_ats(final, kit_id="kit-1")
+    uploader.upload_ats(card, kit_id="kit-1")
+    assert client.table("components").rows == []
+
+    uploader.close()
+
+    rows = client.table("components").rows
+    assert sorted(row["name"] for row in rows) == ["Button", "Card"]
+    button = next(row for row in rows if row["name"] == "Button")
+    assert button["metadata"]["description"] == "A clickable button."
+    assert uploader.get_raw_code(button["metadata"]).endswith("A clickable button.")
+    assert len(client.table("components").calls) == 1
+    # Only the blobs of the flushed versions are stored, in one request.
+    assert len(client.table("component_blobs").rows) == 2
+    assert len(client.table("component_blobs").calls) == 1
+    assert sorted(row["name"] for row in uploaded) == ["Button", "Card"]
+    assert all(RAW_CODE_HASH_KEY in row["metadata"] for row in uploaded)